@@ -0,0 +1 @@
+# Benchmarks - chạy offline với fake Google services và Apps Script stub
@@ -0,0 +1,103 @@
+"""
+Apps Script Stub - HTTP server local thay cho Web App của Google Apps Script (email và kho)
+
+    POST /email  -> {"success": true}  (batch {"messages": [...]} -> {"success": true, "results": [...]})
+    POST /kho    -> {"status": "success", ...}
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+class AppScriptStub:
+    """
+    Chạy server trên 127.0.0.1 (port ngẫu nhiên) ở thread nền
+
+    Ví dụ:
+        with AppScriptStub(latency=0.2) as stub:
+            EmailManager(appscript_url=stub.email_url)
+    """
+
+    def __init__(self, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        self.latency = latency
+        self.requests: Dict[str, int] = {}
+        self.emails = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0) or 0)
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                stub._count(self.path)
+                if stub.latency:
+                    time.sleep(stub.latency)
+                self._reply(200, stub.respond(self.path, payload))
+
+            def do_GET(self):
+                self._reply(200, {'status': 'ok'})
+
+            def _reply(self, status: int, body: dict):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def email_url(self) -> str:
+        return f"{self.base_url}/email"
+
+    @property
+    def kho_url(self) -> str:
+        return f"{self.base_url}/kho"
+
+    def respond(self, path: str, payload: dict) -> dict:
+        """Response giả lập theo endpoint"""
+        if path.startswith('/kho'):
+            return {'status': 'success', 'message': 'OK', 'action': payload.get('action')}
+        if isinstance(payload.get('messages'), list):
+            with self._lock:
+                self.emails += len(payload['messages'])
+            results = [{'id': message.get('id'), 'success': True} for message in payload['messages']]
+            return {'success': True, 'results': results, 'sent': len(results), 'failed': 0}
+        with self._lock:
+            self.emails += 1
+        return {'success': True, 'message': 'Email sent'}
+
+    def _count(self, path: str):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def start(self) -> 'AppScriptStub':
+        self._thread = threading.Thread(target=self.server.serve_forever, name='AppScriptStub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> 'AppScriptStub':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,338 @@
+"""
+Fakes - thay thế Google Sheets/Calendar, Discord bot/interaction/context bằng bản in-memory
+có độ trễ cấu hình được, để benchmark chạy offline mà vẫn đi qua code thật của manager/view/cog
+"""
+
+import asyncio
+import itertools
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from google_sheets.manager import GoogleSheetsManager
+
+HEADER = ['Timestamp', 'Name', 'Phone', 'CustomerCount', 'Room', 'Date', 'StartTime', 'EndTime', 'Notes', 'Email', 'Status', 'ProcessedTime']
+ROOMS = ['Phòng họp 1', 'Phòng họp 2', 'Phòng họp 3', 'Workspace']
+STATUSES = ['Chờ xử lý', 'Đã xác nhận', 'Hủy', 'Lịch Lỗi']
+
+_CELL_RE = re.compile(r'!([A-Z]+)(\d+)$')
+
+
+class FakeRequest:
+    """Tương đương HttpRequest của googleapiclient: execute() ngủ `latency` giây rồi trả kết quả"""
+
+    def __init__(self, handler: Callable[[], Any], latency: float):
+        self.handler = handler
+        self.latency = latency
+
+    def execute(self):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.handler()
+
+
+class FakeSheetsService:
+    """In-memory `spreadsheets().values()` với get/batchUpdate/append"""
+
+    def __init__(self, rows: List[List[str]], latency: float = 0.0):
+        self.rows = rows
+        self.latency = latency
+        self.calls: Dict[str, int] = {'get': 0, 'batchUpdate': 0, 'append': 0}
+        self._lock = threading.Lock()
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId=None, range=None, **kwargs):
+        def handler():
+            with self._lock:
+                self.calls['get'] += 1
+                return {'values': [list(row) for row in self.rows]}
+        return FakeRequest(handler, self.latency)
+
+    def batchUpdate(self, spreadsheetId=None, body=None, **kwargs):
+        def handler():
+            with self._lock:
+                self.calls['batchUpdate'] += 1
+                for update in body.get('data', []):
+                    self._set_cell(update['range'], update['values'][0][0])
+                return {'totalUpdatedCells': len(body.get('data', []))}
+        return FakeRequest(handler, self.latency)
+
+    def append(self, spreadsheetId=None, range=None, body=None, **kwargs):
+        def handler():
+            with self._lock:
+                self.calls['append'] += 1
+                self.rows.extend(list(row) for row in body.get('values', []))
+                return {'updates': {'updatedRows': len(body.get('values', []))}}
+        return FakeRequest(handler, self.latency)
+
+    def _set_cell(self, cell_range: str, value):
+        match = _CELL_RE.search(cell_range)
+        if not match:
+            return
+        column = ord(match.group(1)) - ord('A')
+        row_index = int(match.group(2)) - 1
+        while len(self.rows) <= row_index:
+            self.rows.append([])
+        row = self.rows[row_index]
+        while len(row) <= column:
+            row.append('')
+        row[column] = value
+
+
+class FakeBatch:
+    """Tương đương BatchHttpRequest: một round-trip (`latency`) cho cả batch"""
+
+    def __init__(self, service: 'FakeCalendarService', callback: Callable):
+        self.service = service
+        self.callback = callback
+        self.requests: List[tuple] = []
+
+    def add(self, request: FakeRequest, request_id: Optional[str] = None):
+        self.requests.append((request_id or str(len(self.requests)), request))
+
+    def execute(self):
+        with self.service._lock:
+            self.service.calls['batch'] += 1
+        if self.service.latency:
+            time.sleep(self.service.latency)
+        for request_id, request in self.requests:
+            try:
+                response, exception = request.handler(), None
+            except Exception as e:
+                response, exception = None, e
+            self.callback(request_id, response, exception)
+
+
+class FakeCalendarService:
+    """In-memory `events()` với insert/delete/list/get, phân trang, syncToken và batch request"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.store: Dict[str, dict] = {}
+        self.calls: Dict[str, int] = {'insert': 0, 'delete': 0, 'list': 0, 'get': 0, 'batch': 0}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # event_id -> số thứ tự thay đổi (kể cả event đã xóa) cho syncToken
+        self._version = 0
+        self._changes: Dict[str, int] = {}
+
+    def events(self):
+        return self
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+    def _touch(self, event_id: str):
+        self._version += 1
+        self._changes[event_id] = self._version
+
+    def insert(self, calendarId=None, body=None, **kwargs):
+        def handler():
+            with self._lock:
+                self.calls['insert'] += 1
+                event_id = f"evt{next(self._ids)}"
+                event = dict(body, id=event_id, htmlLink=f"https://calendar.example/{event_id}",
+                             status='confirmed', created=f"{self._version:012d}")
+                self.store[event_id] = event
+                self._touch(event_id)
+                return event
+        return FakeRequest(handler, self.latency)
+
+    def delete(self, calendarId=None, eventId=None, **kwargs):
+        def handler():
+            with self._lock:
+                self.calls['delete'] += 1
+                if self.store.pop(eventId, None) is not None:
+                    self._touch(eventId)
+                return ''
+        return FakeRequest(handler, self.latency)
+
+    def get(self, calendarId=None, eventId=None, **kwargs):
+        def handler():
+            with self._lock:
+                self.calls['get'] += 1
+                return dict(self.store[eventId])
+        return FakeRequest(handler, self.latency)
+
+    def list(self, calendarId=None, timeMin=None, timeMax=None, syncToken=None, pageToken=None,
+             maxResults=250, **kwargs):
+        def handler():
+            with self._lock:
+                self.calls['list'] += 1
+                if syncToken is not None:
+                    since = int(syncToken)
+                    items = [
+                        dict(self.store[event_id]) if event_id in self.store
+                        else {'id': event_id, 'status': 'cancelled'}
+                        for event_id, version in self._changes.items() if version > since
+                    ]
+                else:
+                    items = sorted((
+                        event for event in self.store.values()
+                        if (not timeMin or event['start']['dateTime'] >= timeMin[:19])
+                        and (not timeMax or event['start']['dateTime'] < timeMax[:19])
+                    ), key=lambda event: event['start']['dateTime'])
+                offset = int(pageToken or 0)
+                result = {'items': items[offset:offset + maxResults]}
+                if offset + maxResults < len(items):
+                    result['nextPageToken'] = str(offset + maxResults)
+                elif not (timeMin or timeMax):
+                    result['nextSyncToken'] = str(self._version)
+                return result
+        return FakeRequest(handler, self.latency)
+
+
+class BenchSheetsManager(GoogleSheetsManager):
+    """GoogleSheetsManager dùng fake services thay vì credentials thật"""
+
+    def __init__(self, sheets: FakeSheetsService, calendar: FakeCalendarService):
+        self._fake_sheets = sheets
+        self._fake_calendar = calendar
+        super().__init__()
+
+    def _setup_service(self):
+        self.service = self._fake_sheets
+        self.calendar_service = self._fake_calendar
+
+
+def generate_rows(count: int, days: int = 14, seed: int = 42, start: Optional[datetime] = None) -> List[List[str]]:
+    """
+    Sinh dữ liệu sheet ngẫu nhiên (có header), cố định theo seed để kết quả so sánh được giữa các commit
+    """
+    rng = random.Random(seed)
+    start = start or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = [list(HEADER)]
+    for i in range(count):
+        day = start + timedelta(days=rng.randrange(days))
+        begin = rng.randrange(7 * 60, 20 * 60, 30)
+        end = begin + rng.choice([30, 60, 90, 120])
+        rows.append([
+            day.strftime('%d/%m/%Y %H:%M:%S'),
+            f"Khách {i}",
+            f"09{rng.randrange(10 ** 8):08d}",
+            str(rng.randint(1, 8)),
+            rng.choice(ROOMS),
+            day.strftime('%d/%m/%Y'),
+            f"{begin // 60:02d}:{begin % 60:02d}",
+            f"{end // 60:02d}:{end % 60:02d}",
+            '',
+            f"guest{i}@example.com",
+            rng.choices(STATUSES, weights=[4, 4, 1, 1])[0],
+            '',
+        ])
+    return rows
+
+
+def booking_payload(index: int, rng: random.Random, days: int = 14) -> Dict[str, Any]:
+    """Payload webhook giống Apps Script gửi"""
+    day = datetime.now() + timedelta(days=rng.randrange(days))
+    begin = rng.randrange(7 * 60, 20 * 60, 30)
+    end = begin + rng.choice([30, 60, 90])
+    return {
+        'email': f"bench{index}@example.com",
+        'name': f"Bench {index}",
+        'phone': f"09{rng.randrange(10 ** 8):08d}",
+        'customerCount': rng.randint(1, 8),
+        'room': rng.choice(ROOMS),
+        'date': day.strftime('%d/%m/%Y'),
+        'startTime': f"{begin // 60:02d}:{begin % 60:02d}",
+        'endTime': f"{end // 60:02d}:{end % 60:02d}",
+        'notes': '',
+        'rowNumber': index + 2,
+    }
+
+
+class RecordingBot:
+    """
+    Thay cho DiscordBookingBot phía webhook: có event loop chạy trên thread riêng
+    và ghi lại các booking được schedule qua process_new_booking
+    """
+
+    def __init__(self, sheets_manager=None, process_latency: float = 0.0):
+        self.sheets_manager = sheets_manager
+        self.process_latency = process_latency
+        self.received: List[Any] = []
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='RecordingBot', daemon=True)
+        self._thread.start()
+
+    async def process_new_booking(self, booking):
+        if self.process_latency:
+            await asyncio.sleep(self.process_latency)
+        self.received.append(booking)
+
+    def wait_for(self, count: int, timeout: float = 30.0) -> bool:
+        """Chờ tới khi đã nhận đủ `count` booking"""
+        deadline = time.monotonic() + timeout
+        while len(self.received) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return len(self.received) >= count
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+class _Sink:
+    """Ghi nhận các lời gọi send/defer/edit của interaction/context"""
+
+    def __init__(self):
+        self.sent: List[Dict[str, Any]] = []
+
+    async def send(self, *args, **kwargs):
+        self.sent.append({'args': args, **kwargs})
+
+    async def defer(self, *args, **kwargs):
+        pass
+
+    async def send_message(self, *args, **kwargs):
+        self.sent.append({'args': args, **kwargs})
+
+
+class _FakeResponse(_Sink):
+    """InteractionResponse: chỉ được trả lời một lần (defer hoặc send_message)"""
+
+    def __init__(self):
+        super().__init__()
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, *args, **kwargs):
+        self._done = True
+
+    async def send_message(self, *args, **kwargs):
+        self._done = True
+        await super().send_message(*args, **kwargs)
+
+
+class FakeInteraction:
+    """Interaction tối thiểu cho BookingView (defer, followup.send, edit_original_response)"""
+
+    def __init__(self, user_name: str = 'bench-admin', user_id: int = 1):
+        self.user = SimpleNamespace(display_name=user_name, name=user_name, id=user_id)
+        self.response = _FakeResponse()
+        self.followup = _Sink()
+        self.edits = 0
+
+    async def edit_original_response(self, **kwargs):
+        self.edits += 1
+
+
+class FakeContext(_Sink):
+    """commands.Context tối thiểu cho KhoCommands"""
+
+    def __init__(self, channel_name: str, author_name: str = 'bench-user'):
+        super().__init__()
+        self.channel = SimpleNamespace(name=channel_name)
+        self.author = SimpleNamespace(display_name=author_name, name=author_name)
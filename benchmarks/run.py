@@ -0,0 +1,410 @@
+"""
+Benchmark runner - chạy các kịch bản offline và xuất báo cáo throughput/latency
+
+    python -m benchmarks.run                                  # tất cả kịch bản
+    python -m benchmarks.run -s webhook conflicts -n 1000 --latency-ms 50
+    python -m benchmarks.run --output bench.json              # lưu kết quả (kèm git commit)
+    python -m benchmarks.run --compare bench.json             # so sánh với lần chạy trước
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+from .appscript_stub import AppScriptStub
+from .smtp_sink import SMTPSink
+from .fakes import (
+    BenchSheetsManager, FakeCalendarService, FakeContext, FakeInteraction, FakeSheetsService,
+    RecordingBot, booking_payload, generate_rows,
+)
+
+logger = logging.getLogger(__name__)
+
+SCENARIOS = ('conflicts', 'webhook', 'booking_actions', 'kho', 'kho_autocomplete', 'email_render', 'email_send')
+MAIL_TRANSPORTS = ('appscript', 'smtp', 'file')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], wall: float, errors: int = 0, **extra) -> Dict[str, float]:
+    """Thống kê một kịch bản (latency tính bằng ms)"""
+    count = len(latencies)
+    result = {
+        'count': count,
+        'errors': errors,
+        'wallSeconds': round(wall, 3),
+        # Có lỗi thì throughput không còn ý nghĩa (lời gọi lỗi thường trả về ngay)
+        'throughput': round(count / wall, 1) if wall and not errors else None,
+        'meanMs': round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        'p50Ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95Ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99Ms': round(percentile(latencies, 99) * 1000, 2),
+        'maxMs': round(max(latencies) * 1000, 2) if latencies else 0.0,
+    }
+    result.update(extra)
+    return result
+
+
+def run_threaded(func: Callable[[int], bool], count: int, concurrency: int) -> Dict[str, float]:
+    """Gọi func(i) `count` lần trên `concurrency` thread; func trả False nếu lỗi"""
+    def timed_call(i):
+        started = time.perf_counter()
+        ok = func(i)
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed_call, range(count)))
+    wall = time.perf_counter() - started
+    return summarize([r[0] for r in results], wall, errors=sum(1 for r in results if not r[1]))
+
+
+async def run_async(func: Callable[[int], object], count: int, concurrency: int) -> Dict[str, float]:
+    """Chạy coroutine func(i) `count` lần, tối đa `concurrency` cùng lúc trên event loop hiện tại"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if await func(i) is False:
+                    errors += 1
+            except Exception as e:
+                errors += 1
+                logger.debug(f"Benchmark call {i} failed: {e}")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return summarize(latencies, time.perf_counter() - started, errors=errors)
+
+
+def make_manager(args) -> BenchSheetsManager:
+    latency = args.latency_ms / 1000
+    return BenchSheetsManager(
+        FakeSheetsService(generate_rows(args.rows, seed=args.seed), latency),
+        FakeCalendarService(latency),
+    )
+
+
+def bench_conflicts(args, stub: AppScriptStub) -> Dict[str, float]:
+    """check_room_conflicts trên sheet `rows` dòng"""
+    manager = make_manager(args)
+    rng = random.Random(args.seed)
+    payloads = [booking_payload(i, rng) for i in range(args.count)]
+
+    def call(i):
+        p = payloads[i]
+        manager.check_room_conflicts(p['date'], p['startTime'], p['endTime'], p['room'], customer_count=p['customerCount'])
+        return True
+
+    result = run_threaded(call, args.count, args.concurrency)
+    result['sheetReads'] = manager.service.calls['get']
+    return result
+
+
+def bench_webhook(args, stub: AppScriptStub) -> Dict[str, float]:
+    """POST /webhook/booking qua Flask test client, bot ghi nhận booking thay cho Discord"""
+    from web.webhook_server import create_app
+
+    bot = RecordingBot(make_manager(args))
+    app = create_app(bot)
+    rng = random.Random(args.seed)
+    payloads = [booking_payload(i, rng) for i in range(args.count)]
+
+    def call(i):
+        response = app.test_client().post('/webhook/booking', json=payloads[i])
+        return response.status_code == 200
+
+    try:
+        result = run_threaded(call, args.count, args.concurrency)
+        delivered = bot.wait_for(args.count - result['errors'], timeout=30)
+        result['deliveredToBot'] = len(bot.received)
+        result['allDelivered'] = delivered
+        result['sheetReads'] = bot.sheets_manager.service.calls['get']
+    finally:
+        bot.close()
+    return result
+
+
+async def bench_booking_actions(args, stub: AppScriptStub) -> Dict[str, float]:
+    """BookingView confirm/cancel: Sheets update + Calendar + email qua Apps Script stub"""
+    from bot.discord_bot import BookingView
+    from models.booking import Booking
+
+    manager = make_manager(args)
+    email_manager = make_email_manager(args, stub)
+    rows = manager.service.rows
+    count = min(args.count, len(rows) - 1)
+    duplicates = {'clicks': 0, 'extraRuns': 0}
+
+    async def action(i):
+        row_number = i + 2
+        booking = Booking.from_sheet_row(rows[row_number - 1], row_number)
+        view = BookingView(booking, manager, email_manager)
+        interaction = FakeInteraction()
+        # View.__init__ thay method @discord.ui.button bằng Button, click đi qua Button.callback
+        confirm, cancel = view.children[0], view.children[1]
+        click = (cancel if i % 4 == 3 else confirm).callback(interaction)
+        if args.double_click_every and i % args.double_click_every == 0:
+            # Admin thứ hai click cùng lúc: phải được gộp vào lần xử lý đầu (single-flight)
+            second = FakeInteraction('bench-admin-2', 2)
+            await asyncio.gather(click, confirm.callback(second))
+            duplicates['clicks'] += 1
+            # Đúng một lần xử lý: click đầu sửa message, click trùng chỉ nhận thông báo ephemeral
+            if interaction.edits != 1 or second.edits or not (second.response.sent or second.followup.sent):
+                duplicates['extraRuns'] += 1
+                return False
+        else:
+            await click
+        return interaction.edits > 0
+
+    result = await run_async(action, count, args.concurrency)
+    if args.double_click_every:
+        result['doubleClicks'] = duplicates['clicks']
+        result['duplicateRuns'] = duplicates['extraRuns']
+    result['calendarInserts'] = manager.calendar_service.calls['insert']
+    result['calendarLists'] = manager.calendar_service.calls['list']
+    result.update(mail_counters(args, stub))
+    email_manager.transport.close()
+    return result
+
+
+async def bench_kho(args, stub: AppScriptStub) -> Dict[str, float]:
+    """KhoCommands (nhapkho/xuatkho) qua Apps Script stub"""
+    from kho.kho_commands import KhoCommands
+    from kho.kho_manager import KhoManager
+
+    manager = KhoManager(kho_url=stub.kho_url, ledger_path=':memory:' if args.kho_ledger else '')
+    cog = KhoCommands(bot=None, kho_manager=manager)
+    if manager.ledger:
+        # Tồn kho ban đầu, để các lệnh sau được tính tổng từ ledger
+        for item in range(50):
+            manager.ledger.record('nhapkho', f"Nguyên liệu {item}", 'bench', delta=1000, balance=1000)
+        await cog.cog_load()
+    totals = '' if manager.ledger else ' - 20'
+
+    async def command(i):
+        ctx = FakeContext(Config.KHO_CHANNEL_NAME)
+        if i % 2:
+            await cog.xuat_kho.callback(cog, ctx, args=f"Nguyên liệu {i % 50} - 2{totals}")
+        else:
+            await cog.nhap_kho.callback(cog, ctx, args=f"Nguyên liệu {i % 50} - 5{totals}")
+        return bool(ctx.sent)
+
+    result = await run_async(command, args.count, args.concurrency)
+    if manager.ledger:
+        # Thời gian để syncer gửi hết outbox lên Apps Script stub
+        started = time.perf_counter()
+        await manager.syncer.flush()
+        result['syncDrainSeconds'] = round(time.perf_counter() - started, 3)
+        await cog.cog_unload()
+    result['khoRequests'] = stub.requests.get('/kho', 0)
+    return result
+
+
+def bench_kho_autocomplete(args, stub: AppScriptStub) -> Dict[str, float]:
+    """Gợi ý tên nguyên liệu (trie + trigram) cho autocomplete - query là tiền tố hoặc tên gõ sai"""
+    from kho.catalog import IngredientIndex
+
+    rng = random.Random(args.seed)
+    bases = ['Cà phê', 'Sữa', 'Trà', 'Bột', 'Siro', 'Đường', 'Kem', 'Trân châu', 'Thạch', 'Nước ép']
+    flavors = ['dâu', 'đào', 'vải', 'cacao', 'matcha', 'caramel', 'vani', 'bạc hà', 'chanh', 'xoài', 'tươi', 'đặc']
+    names = [f"{rng.choice(bases)} {rng.choice(flavors)} {i}" for i in range(args.catalog_size)]
+
+    build_started = time.perf_counter()
+    index = IngredientIndex(names)
+    build_ms = (time.perf_counter() - build_started) * 1000
+
+    def typo(name):
+        chars = list(name)
+        i = rng.randrange(len(chars) - 1)
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        return ''.join(chars)
+
+    queries = [rng.choice(names)[:rng.randint(1, 8)] if i % 2 else typo(rng.choice(names)) for i in range(args.count)]
+    latencies: List[float] = []
+    empty = 0
+    started = time.perf_counter()
+    for query in queries:
+        call_started = time.perf_counter()
+        empty += not index.suggest(query)
+        latencies.append(time.perf_counter() - call_started)
+    wall = time.perf_counter() - started
+    return summarize(latencies, wall, catalogSize=len(index), buildMs=round(build_ms, 2), emptyResults=empty)
+
+
+def make_email_manager(args, stub: AppScriptStub):
+    """EmailManager với transport chọn bởi --mail-transport (Apps Script stub, SMTP sink hoặc file)"""
+    from mail import EmailManager
+    from mail.transports import AppScriptTransport, FileTransport, SMTPTransport
+
+    if args.mail_transport == 'smtp':
+        transport = SMTPTransport(host=args._smtp_sink.host, port=args._smtp_sink.port, username='',
+                                  use_tls=False, use_ssl=False, from_addr='bench@localhost')
+    elif args.mail_transport == 'file':
+        transport = FileTransport(path=args._mail_path, fmt=args.mail_file_format, from_addr='bench@localhost')
+    else:
+        transport = AppScriptTransport(url=stub.email_url)
+    return EmailManager(transport=transport)
+
+
+def mail_counters(args, stub: AppScriptStub) -> Dict[str, int]:
+    if args.mail_transport == 'smtp':
+        return {'emails': args._smtp_sink.count, 'smtpConnections': args._smtp_sink.connections}
+    if args.mail_transport == 'appscript':
+        return {'emails': stub.emails, 'emailRequests': stub.requests.get('/email', 0)}
+    return {}
+
+
+def bench_email_send(args, stub: AppScriptStub) -> Dict[str, float]:
+    """Gửi email xác nhận từ nhiều thread qua outbox + transport - throughput là emails/giây"""
+    from models.booking import Booking
+
+    email_manager = make_email_manager(args, stub)
+    bookings = [Booking.from_sheet_row(row, i + 2) for i, row in enumerate(generate_rows(100, seed=args.seed)[1:])]
+    result = run_threaded(
+        lambda i: email_manager.send_confirmation_email(bookings[i % len(bookings)]),
+        args.emails, args.concurrency
+    )
+    result.update(mail_counters(args, stub))
+    email_manager.transport.close()
+    return result
+
+
+def bench_email_render(args, stub: AppScriptStub) -> Dict[str, float]:
+    """Render email (subject + HTML + text) từ template đã biên dịch - throughput là renders/giây"""
+    from mail.template_engine import TEMPLATE_TYPES, get_templates
+    from models.booking import Booking
+
+    compile_started = time.perf_counter()
+    templates = get_templates()
+    compile_ms = (time.perf_counter() - compile_started) * 1000
+    bookings = [Booking.from_sheet_row(row, i + 2) for i, row in enumerate(generate_rows(100, seed=args.seed)[1:])]
+
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for i in range(args.renders):
+        call_started = time.perf_counter()
+        templates.render(TEMPLATE_TYPES[i % len(TEMPLATE_TYPES)], bookings[i % len(bookings)])
+        latencies.append(time.perf_counter() - call_started)
+    wall = time.perf_counter() - started
+    return summarize(latencies, wall, compileMs=round(compile_ms, 2))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: Dict[str, Dict[str, float]], baseline: Optional[dict] = None):
+    header = f"{'scenario':<16}{'count':>7}{'err':>5}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        throughput = r['throughput'] if r['throughput'] is not None else '-'
+        print(f"{name:<16}{r['count']:>7}{r['errors']:>5}{throughput:>10}{r['p50Ms']:>10}{r['p95Ms']:>10}{r['p99Ms']:>10}{r['maxMs']:>10}")
+        old = (baseline or {}).get('results', {}).get(name)
+        if old:
+            def delta(key):
+                return f"{(r[key] - old[key]) / old[key] * 100:+.1f}%" if old[key] and r[key] is not None else 'n/a'
+            print(f"{'  vs ' + str(baseline.get('commit')):<28}{delta('throughput'):>10}{delta('p50Ms'):>10}{delta('p95Ms'):>10}{delta('p99Ms'):>10}{delta('maxMs'):>10}")
+
+
+async def run(args) -> Dict[str, Dict[str, float]]:
+    results = {}
+    with AppScriptStub(latency=args.appscript_latency_ms / 1000) as stub, ExitStack() as stack:
+        if args.mail_transport == 'smtp':
+            args._smtp_sink = stack.enter_context(SMTPSink(latency=args.smtp_latency_ms / 1000))
+        elif args.mail_transport == 'file':
+            mail_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix='bench-mail-'))
+            args._mail_path = os.path.join(mail_dir, 'mail.jsonl' if args.mail_file_format == 'jsonl' else 'Maildir')
+        for name in args.scenarios:
+            logger.info(f"Running benchmark {name}")
+            bench = globals()[f"bench_{name}"]
+            if asyncio.iscoroutinefunction(bench):
+                results[name] = await bench(args, stub)
+            else:
+                results[name] = await asyncio.to_thread(bench, args, stub)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Offline benchmarks cho booking system')
+    parser.add_argument('-s', '--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('-n', '--count', type=int, default=200, help='Số thao tác mỗi kịch bản')
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('--rows', type=int, default=2000, help='Số dòng sheet giả lập')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Độ trễ mỗi lời gọi Sheets/Calendar giả')
+    parser.add_argument('--appscript-latency-ms', type=float, default=50, help='Độ trễ Apps Script stub')
+    parser.add_argument('--double-click-every', type=int, default=0,
+                        help='booking_actions: cứ N booking thì có một click trùng đồng thời (0 = tắt)')
+    parser.add_argument('--renders', type=int, default=20000, help='email_render: số lần render')
+    parser.add_argument('--emails', type=int, default=2000, help='email_send: số email')
+    parser.add_argument('--mail-transport', choices=MAIL_TRANSPORTS, default='appscript',
+                        help='Transport email cho booking_actions/email_send')
+    parser.add_argument('--mail-file-format', choices=('maildir', 'jsonl'), default='maildir')
+    parser.add_argument('--smtp-latency-ms', type=float, default=0, help='Độ trễ mỗi email của SMTP sink')
+    parser.add_argument('--catalog-size', type=int, default=2000, help='kho_autocomplete: số nguyên liệu trong danh mục')
+    parser.add_argument('--kho-ledger', action='store_true', help='kho: ghi ledger SQLite local, đồng bộ Apps Script chạy nền')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Ghi kết quả JSON ra file')
+    parser.add_argument('--compare', help='File JSON của lần chạy trước để so sánh')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR, format='%(levelname)s %(name)s: %(message)s')
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = asyncio.run(run(args))
+    print_report(results, baseline)
+
+    if args.output:
+        report = {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'params': {k: v for k, v in vars(args).items()
+                       if k not in ('output', 'compare', 'verbose') and not k.startswith('_')},
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nSaved results to {args.output}")
+
+    failed = [name for name, r in results.items() if r['errors']]
+    if failed:
+        print(f"\nScenario(s) with errors: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+SMTP Sink - SMTP server local tối giản (không TLS, không auth) nhận và đếm email, dùng để
+benchmark SMTPTransport mà không gửi mail thật
+
+    with SMTPSink() as sink:
+        SMTPTransport(host=sink.host, port=sink.port, use_tls=False)
+"""
+
+import socketserver
+import threading
+import time
+from typing import List, Optional
+
+
+class SMTPSink:
+    """Chạy server trên 127.0.0.1 (port ngẫu nhiên) ở thread nền"""
+
+    def __init__(self, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0, keep: bool = False):
+        """
+        Args:
+            latency (float): Độ trễ giả lập cho mỗi email (giây)
+            keep (bool): Giữ nội dung email trong `messages` (tốn bộ nhớ khi load test)
+        """
+        self.latency = latency
+        self.keep = keep
+        self.count = 0
+        self.connections = 0
+        self.messages: List[bytes] = []
+        self._lock = threading.Lock()
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str):
+                self.wfile.write(line.encode('ascii') + b'\r\n')
+                self.wfile.flush()
+
+            def handle(self):
+                with sink._lock:
+                    sink.connections += 1
+                self.reply('220 localhost SMTP sink ready')
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode('utf-8', 'replace').strip().upper()
+                    if command.startswith('EHLO'):
+                        self.reply('250-localhost')
+                        self.reply('250-8BITMIME')
+                        self.reply('250 SMTPUTF8')
+                    elif command.startswith(('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP')):
+                        self.reply('250 OK')
+                    elif command == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        data = []
+                        for data_line in self.rfile:
+                            if data_line in (b'.\r\n', b'.\n'):
+                                break
+                            data.append(data_line)
+                        if sink.latency:
+                            time.sleep(sink.latency)
+                        sink._received(b''.join(data))
+                        self.reply('250 OK queued')
+                    elif command == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        self.reply('502 Command not implemented')
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.server = Server((host, port), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def host(self) -> str:
+        return self.server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def _received(self, data: bytes):
+        with self._lock:
+            self.count += 1
+            if self.keep:
+                self.messages.append(data)
+
+    def start(self) -> 'SMTPSink':
+        self._thread = threading.Thread(target=self.server.serve_forever, name='SMTPSink', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> 'SMTPSink':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
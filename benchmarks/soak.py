@@ -0,0 +1,307 @@
+"""
+Soak test - bắn payload Google Form thực tế vào /webhook/booking với tốc độ cố định trong
+thời gian dài, theo dõi p50/p99, tỉ lệ lỗi và mức tăng bộ nhớ theo từng chu kỳ
+
+    python -m benchmarks.soak --rate 20 --duration 3600                 # server in-process, bot giả
+    python -m benchmarks.soak --target http://localhost:5000 --pid 1234  # server đang chạy
+    python -m benchmarks.soak --duration 600 --max-p99-ms 500 --max-error-rate 0.01 --max-memory-growth-mb 50
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .fakes import (
+    BenchSheetsManager, FakeCalendarService, FakeSheetsService, RecordingBot, ROOMS, generate_rows,
+)
+from .run import percentile
+
+logger = logging.getLogger(__name__)
+
+
+def rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """RSS hiện tại (MB) của process `pid` (mặc định process này), đọc từ /proc"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid is None:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return None
+
+
+class PayloadFactory:
+    """
+    Sinh payload giống Google Form/Apps Script: giờ ở nhiều format (HH:MM, H:MM:SS, ISO 1899, decimal),
+    ngày d/m/yyyy hoặc dd/mm/yyyy, một phần trùng phòng/giờ để tạo xung đột và một phần không hợp lệ
+    """
+
+    def __init__(self, seed: int = 42, conflict_ratio: float = 0.2, invalid_ratio: float = 0.02, days: int = 14):
+        self.rng = random.Random(seed)
+        self.conflict_ratio = conflict_ratio
+        self.invalid_ratio = invalid_ratio
+        self.days = days
+        self._index = 0
+        self._lock = threading.Lock()
+        self._hot_slots = [self._slot() for _ in range(5)]
+
+    def _slot(self):
+        day = datetime.now() + timedelta(days=self.rng.randrange(self.days))
+        begin = self.rng.randrange(7 * 60, 20 * 60, 30)
+        return self.rng.choice(ROOMS), day, begin, begin + self.rng.choice([30, 60, 90])
+
+    def _format_time(self, minutes: int) -> Any:
+        hours, mins = divmod(minutes % (24 * 60), 60)
+        style = self.rng.random()
+        if style < 0.5:
+            return f"{hours:02d}:{mins:02d}"
+        if style < 0.7:
+            return f"{hours}:{mins:02d}:00"
+        if style < 0.85:
+            # Google Sheets cũ: base 1899-12-30, parse_time cộng lại 8 giờ
+            return f"1899-12-30T{(hours - 8) % 24:02d}:{mins:02d}:00.000Z"
+        return round(minutes / (24 * 60), 6)
+
+    def _format_date(self, day: datetime) -> str:
+        if self.rng.random() < 0.5:
+            return f"{day.day}/{day.month}/{day.year}"
+        return day.strftime('%d/%m/%Y')
+
+    def next(self) -> Dict[str, Any]:
+        with self._lock:
+            self._index += 1
+            index = self._index
+            if self.rng.random() < self.conflict_ratio:
+                room, day, begin, end = self.rng.choice(self._hot_slots)
+            else:
+                room, day, begin, end = self._slot()
+            payload = {
+                'email': f"soak{index}@example.com",
+                'name': f"Soak {index}",
+                'phone': f"09{self.rng.randrange(10 ** 8):08d}",
+                'customerCount': self.rng.randint(1, 8),
+                'room': room if self.rng.random() < 0.8 else room.lower(),
+                'date': self._format_date(day),
+                'startTime': self._format_time(begin),
+                'endTime': self._format_time(end),
+                'notes': '',
+                'rowNumber': index + 1,
+            }
+            if self.rng.random() < self.invalid_ratio:
+                # Payload lỗi: thiếu field hoặc email sai -> server phải trả 400
+                if self.rng.random() < 0.5:
+                    payload.pop('room')
+                else:
+                    payload['email'] = 'not-an-email'
+            return payload
+
+
+class CountingManagerFactory:
+    """Thay GoogleSheetsManager trong process để đếm số lần khởi tạo (phát hiện tạo mới mỗi request)"""
+
+    def __init__(self, rows: int, latency: float, seed: int):
+        self.rows = rows
+        self.latency = latency
+        self.seed = seed
+        self.constructed = 0
+
+    def __call__(self):
+        self.constructed += 1
+        return BenchSheetsManager(
+            FakeSheetsService(generate_rows(self.rows, seed=self.seed), self.latency),
+            FakeCalendarService(self.latency),
+        )
+
+
+class SoakStats:
+    """Số liệu theo chu kỳ báo cáo và tổng"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.window: List[float] = []
+        self.all: List[float] = []
+        self.counts = {'ok': 0, 'rejected': 0, 'error': 0}
+        self.window_counts = dict(self.counts)
+
+    def add(self, latency: float, outcome: str):
+        with self._lock:
+            self.window.append(latency)
+            self.all.append(latency)
+            self.counts[outcome] += 1
+            self.window_counts[outcome] += 1
+
+    def take_window(self):
+        with self._lock:
+            window, counts = self.window, self.window_counts
+            self.window, self.window_counts = [], {key: 0 for key in self.counts}
+        return window, counts
+
+
+def send(url: str, payload: Dict[str, Any], timeout: float) -> str:
+    """POST payload, trả về 'ok' | 'rejected' (4xx) | 'error'"""
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode('utf-8'), headers={'Content-Type': 'application/json'}, method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return 'ok' if response.status == 200 else 'error'
+    except urllib.error.HTTPError as e:
+        return 'rejected' if 400 <= e.code < 500 else 'error'
+    except (urllib.error.URLError, OSError):
+        return 'error'
+
+
+def start_local_server(args):
+    """Chạy webhook server thật (Flask + werkzeug) trong process với bot giả và Google services giả"""
+    import google_sheets.manager as manager_module
+    from werkzeug.serving import make_server
+    from web.webhook_server import create_app
+
+    factory = CountingManagerFactory(args.rows, args.latency_ms / 1000, args.seed)
+    manager_module.GoogleSheetsManager = factory
+
+    bot = RecordingBot(sheets_manager=None)
+    server = make_server('127.0.0.1', 0, create_app(bot), threaded=True)
+    threading.Thread(target=server.serve_forever, name='SoakServer', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server, bot, factory
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Soak test cho /webhook/booking')
+    parser.add_argument('--target', help='Base URL server đang chạy (mặc định: chạy server in-process)')
+    parser.add_argument('--pid', type=int, help='PID của server (khi dùng --target) để theo dõi RSS')
+    parser.add_argument('--rate', type=float, default=10, help='Số request mỗi giây')
+    parser.add_argument('--duration', type=float, default=60, help='Thời gian chạy (giây)')
+    parser.add_argument('--report-interval', type=float, default=10, help='Chu kỳ in báo cáo (giây)')
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--conflict-ratio', type=float, default=0.2)
+    parser.add_argument('--invalid-ratio', type=float, default=0.02)
+    parser.add_argument('--rows', type=int, default=2000, help='Số dòng sheet giả (in-process)')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Độ trễ Sheets/Calendar giả (in-process)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-p99-ms', type=float, help='Fail nếu p99 tổng vượt ngưỡng')
+    parser.add_argument('--max-error-rate', type=float, help='Fail nếu tỉ lệ lỗi (5xx/timeout) vượt ngưỡng')
+    parser.add_argument('--max-memory-growth-mb', type=float, help='Fail nếu RSS tăng quá ngưỡng')
+    parser.add_argument('--output', help='Ghi báo cáo JSON ra file')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR, format='%(levelname)s %(name)s: %(message)s')
+    # werkzeug tự đặt INFO cho access log (một dòng mỗi request) nếu logger chưa có level
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    server = bot = factory = None
+    if args.target:
+        base_url, pid = args.target.rstrip('/'), args.pid
+    else:
+        base_url, server, bot, factory = start_local_server(args)
+        pid = None
+    url = f"{base_url}/webhook/booking"
+
+    payloads = PayloadFactory(args.seed, args.conflict_ratio, args.invalid_ratio)
+    stats = SoakStats()
+    intervals = []
+
+    def fire(payload):
+        started = time.perf_counter()
+        outcome = send(url, payload, args.timeout)
+        stats.add(time.perf_counter() - started, outcome)
+
+    memory_start = rss_mb(pid)
+    print(f"Soak test {url}: {args.rate:g} req/s for {args.duration:g}s (RSS start: {memory_start or 0:.1f} MB)")
+    print(f"{'elapsed':>8}{'sent':>8}{'p50 ms':>10}{'p99 ms':>10}{'err %':>8}{'rss MB':>10}")
+
+    started = time.monotonic()
+    next_report = started + args.report_interval
+    sent = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        while True:
+            now = time.monotonic()
+            elapsed = now - started
+            if elapsed >= args.duration:
+                break
+
+            # Open-loop: số request cần gửi tính theo thời gian, không chờ response
+            due = int(elapsed * args.rate) + 1
+            while sent < due:
+                pool.submit(fire, payloads.next())
+                sent += 1
+
+            if now >= next_report:
+                window, counts = stats.take_window()
+                total = sum(counts.values())
+                interval = {
+                    'elapsed': round(elapsed, 1),
+                    'requests': total,
+                    'p50Ms': round(percentile(window, 50) * 1000, 1),
+                    'p99Ms': round(percentile(window, 99) * 1000, 1),
+                    'errorRate': counts['error'] / total if total else 0.0,
+                    'rssMb': rss_mb(pid),
+                }
+                intervals.append(interval)
+                print(f"{interval['elapsed']:>8}{sent:>8}{interval['p50Ms']:>10}{interval['p99Ms']:>10}"
+                      f"{interval['errorRate'] * 100:>8.2f}{interval['rssMb'] or 0:>10.1f}")
+                next_report += args.report_interval
+
+            time.sleep(min(1 / args.rate, 0.05))
+
+    memory_end = rss_mb(pid)
+    total = sum(stats.counts.values())
+    summary = {
+        'target': url,
+        'rate': args.rate,
+        'duration': args.duration,
+        'requests': total,
+        'outcomes': stats.counts,
+        'p50Ms': round(percentile(stats.all, 50) * 1000, 1),
+        'p99Ms': round(percentile(stats.all, 99) * 1000, 1),
+        'maxMs': round(max(stats.all) * 1000, 1) if stats.all else 0.0,
+        'errorRate': stats.counts['error'] / total if total else 0.0,
+        'rssStartMb': memory_start,
+        'rssEndMb': memory_end,
+        'memoryGrowthMb': round(memory_end - memory_start, 1) if memory_start and memory_end else None,
+        'intervals': intervals,
+    }
+    if bot:
+        bot.wait_for(stats.counts['ok'], timeout=10)
+        summary['deliveredToBot'] = len(bot.received)
+        summary['sheetsManagerConstructions'] = factory.constructed
+        server.shutdown()
+        bot.close()
+
+    print(json.dumps({k: v for k, v in summary.items() if k != 'intervals'}, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    failures = []
+    if args.max_p99_ms is not None and summary['p99Ms'] > args.max_p99_ms:
+        failures.append(f"p99 {summary['p99Ms']} ms > {args.max_p99_ms} ms")
+    if args.max_error_rate is not None and summary['errorRate'] > args.max_error_rate:
+        failures.append(f"error rate {summary['errorRate']:.4f} > {args.max_error_rate}")
+    if args.max_memory_growth_mb is not None and (summary['memoryGrowthMb'] or 0) > args.max_memory_growth_mb:
+        failures.append(f"memory growth {summary['memoryGrowthMb']} MB > {args.max_memory_growth_mb} MB")
+    if factory and factory.constructed > 1:
+        failures.append(f"GoogleSheetsManager constructed {factory.constructed} times (expected 1)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+Slash commands tra cứu booking (trạng thái, phòng trống, làm mới từ Google Sheets) và vận hành (/perf, /reconcile_calendar)
+"""
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+import asyncio
+import logging
+from models.booking import Booking, normalize_date, parse_date
+from monitoring.profiling import profiler
+
+logger = logging.getLogger(__name__)
+
+
+class BookingCommands(commands.Cog):
+    """
+    Slash commands cho booking - app_commands chỉ được đăng ký khi nằm trong Cog/Group,
+    method của commands.Bot không được bot.tree thu thập
+    """
+    
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+    
+    @app_commands.command(name="booking_status", description="Kiểm tra trạng thái booking")
+    async def booking_status(self, interaction: discord.Interaction, email: str = None):
+        """
+        Slash command để kiểm tra trạng thái booking
+        """
+        try:
+            await interaction.response.defer()
+            
+            if email:
+                # Tìm booking theo email
+                data = self.bot.sheets_manager.get_sheet_data()
+                bookings = []
+                
+                for i, row in enumerate(data[1:], start=2):
+                    if len(row) >= 2 and row[1].lower() == email.lower():
+                        bookings.append({
+                            'row': i,
+                            'data': row
+                        })
+                
+                if not bookings:
+                    await interaction.followup.send(f"❌ Không tìm thấy booking nào cho email: {email}")
+                    return
+                
+                # Hiển thị danh sách bookings
+                embed = discord.Embed(
+                    title=f"📋 Booking của {email}",
+                    color=0x0099FF
+                )
+                
+                for booking in bookings[-5:]:  # Chỉ hiển thị 5 booking gần nhất
+                    row = booking['data']
+                    status = row[7] if len(row) > 7 else "Chờ xử lý"
+                    
+                    embed.add_field(
+                        name=f"📅 {row[4]} - {row[5]}",
+                        value=f"🏢 {row[6]}\n🔄 {status}",
+                        inline=True
+                    )
+                
+                await interaction.followup.send(embed=embed)
+            
+            else:
+                # Hiển thị thống kê tổng quan
+                data = self.bot.sheets_manager.get_sheet_data()
+                
+                if len(data) < 2:
+                    await interaction.followup.send("❌ Không có dữ liệu booking")
+                    return
+                
+                total = len(data) - 1  # Trừ header
+                confirmed = 0
+                cancelled = 0
+                pending = 0
+                
+                for row in data[1:]:
+                    if len(row) > 7:
+                        status = row[7].lower()
+                        if 'xác nhận' in status:
+                            confirmed += 1
+                        elif 'hủy' in status:
+                            cancelled += 1
+                        else:
+                            pending += 1
+                    else:
+                        pending += 1
+                
+                embed = discord.Embed(
+                    title="📊 Thống kê Booking",
+                    color=0x0099FF
+                )
+                
+                embed.add_field(name="📝 Tổng số", value=str(total), inline=True)
+                embed.add_field(name="✅ Đã xác nhận", value=str(confirmed), inline=True)
+                embed.add_field(name="❌ Đã hủy", value=str(cancelled), inline=True)
+                embed.add_field(name="⏳ Chờ xử lý", value=str(pending), inline=True)
+                
+                await interaction.followup.send(embed=embed)
+                
+        except Exception as e:
+            logger.error("Error in booking_status command: %s", e)
+            await interaction.followup.send(f"❌ Lỗi: {str(e)}")
+    
+    @app_commands.command(name="availability", description="Xem khung giờ trống của các phòng")
+    @app_commands.describe(date="Ngày (dd/mm/yyyy)", room="Tên phòng (tùy chọn)", time="Giờ cần trống HH:MM (tùy chọn)")
+    async def availability(self, interaction: discord.Interaction, date: str, room: str = None, time: str = None):
+        """
+        Slash command xem khung giờ trống theo phòng
+        """
+        try:
+            await interaction.response.defer()
+            
+            if parse_date(date) is None:
+                await interaction.followup.send(f"❌ Ngày không hợp lệ: {date} (định dạng dd/mm/yyyy)")
+                return
+            
+            date = normalize_date(date)
+            rooms = await asyncio.to_thread(self.bot.sheets_manager.get_availability, date, room, time)
+            
+            title = f"🗓️ Phòng trống ngày {date}" + (f" lúc {time}" if time else "")
+            embed = discord.Embed(title=title, color=0x0099FF)
+            
+            if not rooms:
+                embed.description = "❌ Không có phòng nào trống"
+            
+            for name, slots in list(rooms.items())[:25]:
+                value = "\n".join(f"🟢 {start} - {end}" for start, end in slots) or "❌ Kín lịch"
+                embed.add_field(name=f"🏢 {name}", value=value[:1024], inline=True)
+            
+            await interaction.followup.send(embed=embed)
+            
+        except Exception as e:
+            logger.error("Error in availability command: %s", e)
+            await interaction.followup.send(f"❌ Lỗi: {str(e)}")
+    
+    @app_commands.command(name="perf", description="Các lời gọi Sheets/Calendar/Email/Kho chậm nhất trong 1 giờ qua")
+    @app_commands.default_permissions(administrator=True)
+    async def perf(self, interaction: discord.Interaction):
+        """
+        Slash command tổng hợp các thao tác chậm (cần PROFILING_ENABLED=true)
+        """
+        if not profiler.enabled:
+            await interaction.response.send_message("ℹ️ Profiling đang tắt (PROFILING_ENABLED=false)", ephemeral=True)
+            return
+        
+        report = profiler.report(window=3600, top=5)
+        threshold = report['thresholdMs']
+        embed = discord.Embed(title=f"🐢 Thao tác chậm hơn {threshold:g} ms (1 giờ qua)", color=0xFFA500)
+        
+        rows = report['slowOperations'][:15]
+        if not rows:
+            embed.description = "✅ Không có thao tác nào vượt ngưỡng"
+        for row in rows:
+            embed.add_field(
+                name=f"{row['service']}.{row['operation']}",
+                value=f"{row['count']} lần • max {row['maxMs']:.0f} ms • avg {row['avgMs']:.0f} ms",
+                inline=False
+            )
+        
+        if report['topStacks']:
+            leaf = report['topStacks'][0]['stack'].rsplit(';', 1)[-1]
+            embed.set_footer(text=f"{report['samples']} samples • hot: {leaf}"[:2048])
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="reconcile_calendar", description="Đối chiếu booking đã xác nhận với Google Calendar")
+    @app_commands.default_permissions(administrator=True)
+    async def reconcile_calendar(self, interaction: discord.Interaction, apply: bool = False):
+        """
+        Slash command đối chiếu sheet <-> Calendar; mặc định dry-run, apply=True để sửa event thiếu/thừa
+        """
+        await interaction.response.defer(ephemeral=True)
+        try:
+            report = await self.bot.reconcile_calendar_now(dry_run=not apply)
+            icon = "✅" if report.in_sync else ("🛠️" if apply else "⚠️")
+            await interaction.followup.send(f"{icon} ```\n{report.format(limit=10)[:1900]}\n```", ephemeral=True)
+        except Exception as e:
+            logger.error("Error in reconcile_calendar command: %s", e)
+            await interaction.followup.send(f"❌ Lỗi: {str(e)}", ephemeral=True)
+    
+    @app_commands.command(name="refresh_booking", description="Làm mới một booking từ Google Sheets")
+    async def refresh_booking(self, interaction: discord.Interaction, row_number: int):
+        """
+        Slash command để làm mới booking từ Google Sheets
+        """
+        try:
+            await interaction.response.defer()
+            
+            data = self.bot.sheets_manager.get_sheet_data()
+            
+            if row_number < 2 or row_number > len(data):
+                await interaction.followup.send(f"❌ Số dòng không hợp lệ: {row_number}")
+                return
+            
+            row = data[row_number - 1]
+            
+            if len(row) < 8:
+                await interaction.followup.send(f"❌ Dữ liệu dòng {row_number} không đầy đủ")
+                return
+            
+            # Tạo Booking từ dòng sheet (cùng cấu trúc với check_room_conflicts)
+            booking = Booking.from_sheet_row(row, row_number)
+            
+            # Xử lý như booking mới
+            await self.bot.process_new_booking(booking)
+            
+            await interaction.followup.send(f"✅ Đã làm mới booking dòng {row_number}")
+            
+        except Exception as e:
+            logger.error("Error in refresh_booking command: %s", e)
+            await interaction.followup.send(f"❌ Lỗi: {str(e)}")
+
+
+async def setup(bot):
+    await bot.add_cog(BookingCommands(bot))
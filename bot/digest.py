@@ -0,0 +1,72 @@
+"""
+Digest mode - gom các booking không xung đột và post thành một embed tổng hợp định kỳ
+"""
+
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class BookingDigest:
+    """
+    Bộ đệm booking cho digest mode.
+
+    Booking không xung đột được giữ lại và xả ra mỗi `interval_minutes` phút
+    thông qua callback `flush` (thường là BookingPostQueue.enqueue_group).
+    """
+
+    def __init__(self, flush: Callable[[List[object]], None], interval_minutes: Optional[float] = None):
+        """
+        Args:
+            flush: Hàm nhận danh sách booking cần post
+            interval_minutes (float): Chu kỳ post digest (phút)
+        """
+        self.flush = flush
+        self.interval = (interval_minutes or Config.DIGEST_INTERVAL_MINUTES) * 60
+        self._buffer: List[object] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Khởi động vòng lặp digest (gọi trong event loop của bot)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info("Booking digest started (every %g minutes)", self.interval / 60)
+
+    async def stop(self):
+        """Dừng vòng lặp và xả các booking còn lại"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.drain()
+
+    def add(self, booking):
+        """Thêm booking vào digest kế tiếp"""
+        self._buffer.append(booking)
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def drain(self):
+        """Xả toàn bộ booking đang giữ ra callback flush"""
+        if not self._buffer:
+            return
+        bookings, self._buffer = self._buffer, []
+        logger.info("Flushing booking digest with %s booking(s)", len(bookings))
+        self.flush(bookings)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error("Error flushing booking digest: %s", e)
@@ -1,28 +1,129 @@
 import discord
 from discord.ext import commands
-from discord import app_commands
 import logging
 import asyncio
+import functools
+import time
 from datetime import datetime
 import pytz
 from config import Config
 from google_sheets.manager import GoogleSheetsManager
+from google_sheets.reconcile import CalendarReconciler
 from mail import EmailManager
+from models.booking import Booking
+from .posting_queue import BookingPostQueue
+from .digest import BookingDigest
+from .single_flight import booking_flights
+from .reminders import ReminderScheduler
+from .expiry import EXPIRED_NOTE, EXPIRY_ACTIONS, PENDING_STATUSES, PendingExpirySweeper
+from monitoring.metrics import timed, monitor_event_loop_lag, QUEUE_DEPTH
+from monitoring.tracing import record_span, span, use_trace
+from monitoring.profiling import profiler
+from monitoring.startup import startup
 
 logger = logging.getLogger(__name__)
 
+# Thời gian tối đa chờ post nốt booking đang chờ (digest + hàng đợi) khi tắt bot
+SHUTDOWN_DRAIN_SECONDS = 10
+
+
+ACTION_LABELS = {
+    'confirmed': 'xác nhận',
+    'cancelled': 'hủy lịch',
+    'error': 'đánh dấu lỗi',
+}
+
+
+def _action_name(args) -> str:
+    """Action của handler: confirm_booking nhận (button,), _handle_booking_action nhận (status, ...)"""
+    return args[0] if args and isinstance(args[0], str) else 'confirmed'
+
+
+def single_flight_action(func):
+    """
+    Chỉ cho một action chạy trên một booking tại một thời điểm. Admin click sau (double-click,
+    hoặc admin khác click cùng lúc) không chạy lại Sheets/Calendar/email mà được báo action
+    đang được xử lý, rồi nhận kết quả của lần chạy đầu (tin nhắn ephemeral).
+    Handler trả về status khi thành công, None khi thất bại.
+    """
+    @functools.wraps(func)
+    async def wrapper(self, interaction, *args, **kwargs):
+        action = _action_name(args)
+        key = self.booking.row_number or id(self)
+        flight = booking_flights.current(key)
+        if flight is None:
+            result, _ = await booking_flights.run(
+                key, action, interaction.user.display_name,
+                lambda: func(self, interaction, *args, **kwargs)
+            )
+            return result
+
+        label = ACTION_LABELS.get(flight.action, flight.action)
+        logger.info(
+            "Booking row %s: %s clicked %s "
+            "while %s's %s is in flight - joining",
+            key, interaction.user.display_name, action, flight.owner, flight.action
+        )
+        if not flight.future.done():
+            await interaction.response.send_message(
+                f"⏳ Booking #{key} đang được **{flight.owner}** xử lý ({label}), vui lòng chờ...",
+                ephemeral=True
+            )
+        result = await asyncio.shield(flight.future)
+        if result is not None:
+            outcome = f"ℹ️ Booking #{key} đã được **{flight.owner}** {ACTION_LABELS.get(result, result)}."
+        else:
+            outcome = f"⚠️ **{flight.owner}** {label} booking #{key} không thành công - có thể thử lại."
+        if interaction.response.is_done():
+            await interaction.followup.send(outcome, ephemeral=True)
+        else:
+            await interaction.response.send_message(outcome, ephemeral=True)
+        return result
+    return wrapper
+
+
+def traced_action(func):
+    """
+    Gắn trace của booking cho một action của admin: ghi thời gian chờ admin click
+    (từ lúc post tới lúc click) và span cho toàn bộ xử lý action
+    """
+    @functools.wraps(func)
+    async def wrapper(self, interaction, *args, **kwargs):
+        action = _action_name(args)
+        with use_trace(self.booking.trace_id):
+            record_span('discord.await_admin', self.posted_at_ns, action=action)
+            with span('discord.booking_action', action=action, row=self.booking.row_number):
+                return await func(self, interaction, *args, **kwargs)
+    return wrapper
+
 class BookingView(discord.ui.View):
     """
     Discord UI View cho booking buttons
     """
     
-    def __init__(self, booking_data, sheets_manager, email_manager):
+    def __init__(self, booking, sheets_manager, email_manager, reminders=None, expiry=None):
         super().__init__(timeout=None)  # Không timeout
-        self.booking_data = booking_data
+        self.booking = Booking.coerce(booking)
         self.sheets_manager = sheets_manager
         self.email_manager = email_manager
+        self.reminders = reminders
+        self.expiry = expiry
+        self.posted_at_ns = time.time_ns()
+    
+    def _after_status_change(self, status):
+        """Booking đã được admin xử lý: không còn hết hạn, chỉ booking đã xác nhận được nhắc lịch"""
+        if self.expiry:
+            self.expiry.resolve(self.booking.row_number)
+        if self.reminders:
+            if status == 'confirmed':
+                self.reminders.schedule_booking(self.booking)
+            else:
+                self.reminders.cancel_booking(self.booking.row_number)
     
     @discord.ui.button(label='✅ Xác nhận', style=discord.ButtonStyle.success, custom_id='confirm_booking')
+    @single_flight_action
+    @timed('discord', 'confirm_booking')
+    @traced_action
     async def confirm_booking(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Xử lý khi admin click nút xác nhận
@@ -34,11 +135,12 @@ class BookingView(discord.ui.View):
             admin_name = interaction.user.display_name
             admin_id = interaction.user.id
             
-            logger.info(f"Admin {admin_name} ({admin_id}) confirming booking for {self.booking_data.get('email')}")
+            logger.info("Admin %s (%s) confirming booking for %s", admin_name, admin_id, self.booking.email)
             
             # Cập nhật trạng thái trong Google Sheets
-            success = self.sheets_manager.update_booking_status(
-                self.booking_data.get('rowNumber'),  # Sử dụng rowNumber thay vì row_number
+            success = await asyncio.to_thread(
+                self.sheets_manager.update_booking_status,
+                self.booking.row_number,
                 'confirmed',
                 admin_name
             )
@@ -47,30 +149,22 @@ class BookingView(discord.ui.View):
                 await interaction.followup.send("❌ Lỗi khi cập nhật Google Sheets!", ephemeral=True)
                 return
             
+            self._after_status_change('confirmed')
+            
             # Thêm booking vào Google Calendar
-            logger.info(f"Adding booking to Google Calendar:")
-            logger.info(f"  - booking_data keys: {list(self.booking_data.keys())}")
-            logger.info(f"  - name: {self.booking_data.get('name')}")
-            logger.info(f"  - email: {self.booking_data.get('email')}")
-            logger.info(f"  - date: {self.booking_data.get('date')}")
-            logger.info(f"  - startTime: {self.booking_data.get('startTime')}")
-            logger.info(f"  - endTime: {self.booking_data.get('endTime')}")
-            logger.info(f"  - room: {self.booking_data.get('room')}")
-            logger.info(f"  - phone: {self.booking_data.get('phone')}")
-            logger.info(f"  - customerCount: {self.booking_data.get('customerCount')}")
-            logger.info(f"  - notes: {self.booking_data.get('notes')}")
-            
-            event_id = self.sheets_manager.add_to_google_calendar(self.booking_data)
+            logger.debug("Adding booking row %s to Google Calendar", self.booking.row_number)
+            
+            event_id = await asyncio.to_thread(self.sheets_manager.add_to_google_calendar, self.booking)
             calendar_created = event_id is not None
             
             if calendar_created:
-                logger.info(f"✅ Google Calendar event created successfully: {event_id}")
+                logger.info("✅ Google Calendar event created successfully: %s", event_id)
             else:
                 logger.error("❌ Failed to create Google Calendar event")
-                logger.error(f"❌ Full booking_data: {self.booking_data}")
+                logger.error("❌ Full booking: %s", self.booking)
             
             # Gửi email xác nhận
-            email_sent = self.email_manager.send_confirmation_email(self.booking_data)
+            email_sent = await asyncio.to_thread(self.email_manager.send_confirmation_email, self.booking)
             
             # Cập nhật message Discord
             embed = discord.Embed(
@@ -79,18 +173,16 @@ class BookingView(discord.ui.View):
                 timestamp=datetime.now(pytz.timezone(Config.TIMEZONE))
             )
             
-            embed.add_field(name="👤 Khách hàng", value=self.booking_data.get('name'), inline=True)
-            embed.add_field(name="📧 Email", value=self.booking_data.get('email'), inline=True)
-            embed.add_field(name="📞 Điện thoại", value=self.booking_data.get('phone'), inline=True)
-            embed.add_field(name="📅 Ngày", value=self.booking_data.get('date'), inline=True)
+            embed.add_field(name="👤 Khách hàng", value=self.booking.name, inline=True)
+            embed.add_field(name="📧 Email", value=self.booking.email, inline=True)
+            embed.add_field(name="📞 Điện thoại", value=self.booking.phone, inline=True)
+            embed.add_field(name="📅 Ngày", value=self.booking.date, inline=True)
             
             # Format thời gian cho response xác nhận
-            start_time = self.booking_data.get('startTime', '')
-            end_time = self.booking_data.get('endTime', '')
-            time_display = f"({start_time} - {end_time})" if start_time and end_time else self.booking_data.get('time', 'N/A')
+            time_display = self.booking.time_display
             embed.add_field(name="⏰ Thời gian", value=time_display, inline=True)
             
-            embed.add_field(name="🏢 Phòng", value=self.booking_data.get('room'), inline=True)
+            embed.add_field(name="🏢 Phòng", value=self.booking.room, inline=True)
             embed.add_field(name="👨‍💼 Xác nhận bởi", value=f"{admin_name}", inline=True)
             embed.add_field(name="📧 Email gửi", value="✅ Thành công" if email_sent else "❌ Thất bại", inline=True)
             embed.add_field(name="� Calendar", value="✅ Đã tạo" if calendar_created else "❌ Thất bại", inline=True)
@@ -103,20 +195,17 @@ class BookingView(discord.ui.View):
             await interaction.edit_original_response(embed=embed, view=self)
             
             # Gửi log message
-            start_time = self.booking_data.get('startTime', '')
-            end_time = self.booking_data.get('endTime', '')
-            time_display = f"({start_time} - {end_time})" if start_time and end_time else self.booking_data.get('time', 'N/A')
-            
             log_msg = f"✅ **Booking được xác nhận**\n"
-            log_msg += f"👤 Khách: {self.booking_data.get('name')}\n"
-            log_msg += f"📧 Email: {self.booking_data.get('email')}\n"
-            log_msg += f"📅 Lịch: {self.booking_data.get('date')} - {time_display}\n"
+            log_msg += f"👤 Khách: {self.booking.name}\n"
+            log_msg += f"📧 Email: {self.booking.email}\n"
+            log_msg += f"📅 Lịch: {self.booking.date} - {time_display}\n"
             log_msg += f"👨‍💼 Bởi: {admin_name}"
             
             await interaction.followup.send(log_msg)
+            return 'confirmed'
             
         except Exception as e:
-            logger.error(f"Error confirming booking: {e}")
+            logger.error("Error confirming booking: %s", e)
             await interaction.followup.send(f"❌ Lỗi khi xác nhận booking: {str(e)}", ephemeral=True)
     
     @discord.ui.button(label='❌ Hủy lịch', style=discord.ButtonStyle.danger, custom_id='cancel_booking')
@@ -133,6 +222,9 @@ class BookingView(discord.ui.View):
         """
         await self._handle_booking_action(interaction, 'error', "⚠️ Booking đã được đánh dấu lỗi", 0xFFA500)
     
+    @single_flight_action
+    @timed('discord', 'booking_action')
+    @traced_action
     async def _handle_booking_action(self, interaction: discord.Interaction, status: str, title: str, color: int):
         """
         Xử lý chung cho tất cả các action booking
@@ -150,58 +242,61 @@ class BookingView(discord.ui.View):
             admin_name = interaction.user.display_name
             admin_id = interaction.user.id
             
-            logger.info(f"Admin {admin_name} ({admin_id}) setting booking status to {status} for {self.booking_data.get('email')}")
+            logger.info("Admin %s (%s) setting booking status to %s for %s", admin_name, admin_id, status, self.booking.email)
             
             # Validate rowNumber
-            row_number = self.booking_data.get('rowNumber')
+            row_number = self.booking.row_number
             if not row_number:
-                logger.error(f"Missing rowNumber in booking data: {self.booking_data}")
+                logger.error("Missing rowNumber in booking: %s", self.booking)
                 await interaction.followup.send("❌ Lỗi: Không tìm thấy số dòng booking!", ephemeral=True)
                 return
             
-            logger.info(f"Updating row {row_number} to status {status}")
+            logger.debug("Updating row %s to status %s", row_number, status)
             
             # Cập nhật trạng thái trong Google Sheets
-            success = self.sheets_manager.update_booking_status(
+            success = await asyncio.to_thread(
+                self.sheets_manager.update_booking_status,
                 row_number,
                 status,
                 admin_name
             )
             
             if not success:
-                logger.error(f"Failed to update booking status for row {row_number}")
+                logger.error("Failed to update booking status for row %s", row_number)
                 await interaction.followup.send("❌ Lỗi khi cập nhật Google Sheets!", ephemeral=True)
                 return
             
+            self._after_status_change(status)
+            
             # Gửi email tương ứng và xử lý calendar event
             email_sent = False
             calendar_event_handled = True
             
             if status == 'confirmed':
-                email_sent = self.email_manager.send_confirmation_email(self.booking_data)
+                email_sent = await asyncio.to_thread(self.email_manager.send_confirmation_email, self.booking)
                 # Tạo calendar event khi xác nhận
                 try:
-                    event_id = self.sheets_manager.add_to_google_calendar(self.booking_data)
+                    event_id = await asyncio.to_thread(self.sheets_manager.add_to_google_calendar, self.booking)
                     if event_id:
-                        logger.info(f"✅ Created calendar event {event_id} for confirmed booking")
-                        # Lưu event_id vào booking_data để có thể xóa sau này
-                        self.booking_data['calendar_event_id'] = event_id
+                        logger.info("✅ Created calendar event %s for confirmed booking", event_id)
+                        # Lưu event_id vào booking để có thể xóa sau này
+                        self.booking.calendar_event_id = event_id
                     else:
                         logger.warning("❌ Failed to create calendar event for confirmed booking")
                         calendar_event_handled = False
                 except Exception as e:
-                    logger.error(f"Error creating calendar event: {e}")
+                    logger.error("Error creating calendar event: %s", e)
                     calendar_event_handled = False
                     
             elif status == 'cancelled':
-                email_sent = self.email_manager.send_cancellation_email(self.booking_data)
+                email_sent = await asyncio.to_thread(self.email_manager.send_cancellation_email, self.booking)
                 # Note: Calendar event cần được xóa manual bởi admin
                 logger.info("📅 Note: Calendar event (if exists) should be deleted manually")
                     
             elif status == 'error':
                 # Gửi email thông báo lỗi cho khách hàng
-                email_sent = self.email_manager.send_error_email(self.booking_data)
-                logger.info(f"Error email sent to {self.booking_data.get('email')}: {email_sent}")
+                email_sent = await asyncio.to_thread(self.email_manager.send_error_email, self.booking)
+                logger.info("Error email sent to %s: %s", self.booking.email, email_sent)
             
             # Cập nhật message Discord
             embed = discord.Embed(
@@ -210,18 +305,16 @@ class BookingView(discord.ui.View):
                 timestamp=datetime.now(pytz.timezone(Config.TIMEZONE))
             )
             
-            embed.add_field(name="👤 Khách hàng", value=self.booking_data.get('name'), inline=True)
-            embed.add_field(name="📧 Email", value=self.booking_data.get('email'), inline=True)
-            embed.add_field(name="📞 Điện thoại", value=self.booking_data.get('phone'), inline=True)
-            embed.add_field(name="📅 Ngày", value=self.booking_data.get('date'), inline=True)
+            embed.add_field(name="👤 Khách hàng", value=self.booking.name, inline=True)
+            embed.add_field(name="📧 Email", value=self.booking.email, inline=True)
+            embed.add_field(name="📞 Điện thoại", value=self.booking.phone, inline=True)
+            embed.add_field(name="📅 Ngày", value=self.booking.date, inline=True)
             
             # Format thời gian
-            start_time = self.booking_data.get('startTime', '')
-            end_time = self.booking_data.get('endTime', '')
-            time_display = f"({start_time} - {end_time})" if start_time and end_time else self.booking_data.get('time', 'N/A')
+            time_display = self.booking.time_display
             embed.add_field(name="⏰ Thời gian", value=time_display, inline=True)
             
-            embed.add_field(name="🏢 Phòng", value=self.booking_data.get('room'), inline=True)
+            embed.add_field(name="🏢 Phòng", value=self.booking.room, inline=True)
             embed.add_field(name="👨‍💼 Xử lý bởi", value=f"{admin_name}", inline=True)
             
             # Status-specific fields
@@ -244,20 +337,88 @@ class BookingView(discord.ui.View):
             
             # Gửi log message
             log_msg = f"{title}\n"
-            log_msg += f"👤 Khách: {self.booking_data.get('name')}\n"
-            log_msg += f"📧 Email: {self.booking_data.get('email')}\n"
-            log_msg += f"📅 Lịch: {self.booking_data.get('date')} - {time_display}\n"
+            log_msg += f"👤 Khách: {self.booking.name}\n"
+            log_msg += f"📧 Email: {self.booking.email}\n"
+            log_msg += f"📅 Lịch: {self.booking.date} - {time_display}\n"
             log_msg += f"👨‍💼 Bởi: {admin_name}"
             
             await interaction.followup.send(log_msg)
             
-            logger.info(f"Booking {status} processed successfully for {self.booking_data.get('email')}")
+            logger.info("Booking %s processed successfully for %s", status, self.booking.email)
+            return status
             
         except Exception as e:
-            logger.error(f"Error handling booking action {status}: {e}")
+            logger.error("Error handling booking action %s: %s", status, e)
             await interaction.followup.send(f"❌ Lỗi khi xử lý: {str(e)}", ephemeral=True)
 
 
+def build_summary_embed(bookings, title, timezone):
+    """
+    Tạo embed liệt kê nhiều booking trong một message
+    
+    Args:
+        bookings (list): Danh sách Booking
+        title (str): Tiêu đề embed
+        timezone: Timezone hiển thị timestamp
+        
+    Returns:
+        discord.Embed: Embed tổng hợp
+    """
+    embed = discord.Embed(
+        title=title,
+        description=f"**{len(bookings)}** booking đang chờ xử lý. Chọn booking trong menu bên dưới để xử lý.",
+        color=0x0099FF,
+        timestamp=datetime.now(timezone)
+    )
+    
+    for booking in bookings[:25]:  # Discord giới hạn 25 field mỗi embed
+        embed.add_field(
+            name=f"#{booking.row_number or 'N/A'} • {booking.name or 'N/A'}",
+            value=f"📅 {booking.date} {booking.time_display}\n🏢 {booking.room or 'N/A'}",
+            inline=True
+        )
+    
+    return embed
+
+
+class BookingSelectView(discord.ui.View):
+    """
+    View với select menu cho message tổng hợp - chọn booking để mở các nút xử lý
+    """
+    
+    def __init__(self, bookings, bot):
+        super().__init__(timeout=None)
+        self.bookings = list(bookings)[:25]  # Giới hạn option của select menu
+        self.bot = bot
+        
+        options = [
+            discord.SelectOption(
+                label=f"#{booking.row_number or 'N/A'} - {booking.name or 'N/A'}"[:100],
+                description=f"{booking.date} {booking.time_display} • {booking.room}"[:100],
+                value=str(index)
+            )
+            for index, booking in enumerate(self.bookings)
+        ]
+        
+        select = discord.ui.Select(placeholder="Chọn booking để xử lý...", options=options)
+        select.callback = self._on_select
+        self.add_item(select)
+    
+    async def _on_select(self, interaction: discord.Interaction):
+        """
+        Gửi message booking đầy đủ kèm các nút xác nhận/hủy/lỗi
+        """
+        try:
+            booking = self.bookings[int(interaction.data['values'][0])]
+            embed = self.bot.build_booking_embed(booking)
+            view = BookingView(booking, self.bot.sheets_manager, self.bot.email_manager,
+                               self.bot.reminders, self.bot.expiry)
+            await interaction.response.send_message(embed=embed, view=view)
+        except Exception as e:
+            logger.error("Error opening booking from summary: %s", e)
+            await interaction.response.send_message(f"❌ Lỗi: {str(e)}", ephemeral=True)
+
+
 class DiscordBookingBot(commands.Bot):
     """
     Discord Bot chính cho hệ thống booking
@@ -279,223 +440,346 @@ class DiscordBookingBot(commands.Bot):
         self.email_manager = EmailManager()
         self.channel_id = Config.DISCORD_CHANNEL_ID
         self.timezone = pytz.timezone(Config.TIMEZONE)
+        
+        # Hàng đợi post booking mới (một consumer, giãn nhịp theo rate limit channel)
+        self.post_queue = BookingPostQueue(self._post_booking, self._post_booking_summary)
+        
+        # Digest mode: gom booking không xung đột thành embed tổng hợp mỗi N phút
+        self.digest = BookingDigest(self.post_queue.enqueue_group) if Config.DIGEST_MODE else None
+        
+        # Nhắc lịch trước giờ bắt đầu cho booking đã xác nhận (email cho khách, ping trên channel)
+        self.reminders = (
+            ReminderScheduler(self._send_reminder_email, self._send_reminder_ping)
+            if Config.REMINDERS_ENABLED else None
+        )
+        
+        # Đối chiếu booking đã xác nhận với Google Calendar (định kỳ và /reconcile_calendar)
+        self.calendar_reconciler = CalendarReconciler(self.sheets_manager)
+        self._reconcile_lock = asyncio.Lock()
+        
+        # Booking chờ xử lý quá SLA được tự động đánh dấu quá hạn hoặc hủy
+        self.expiry = (
+            PendingExpirySweeper(self._expire_pending_bookings)
+            if Config.PENDING_EXPIRY_HOURS > 0 else None
+        )
+        
+        QUEUE_DEPTH.set_function(lambda: self.post_queue.depth, queue='discord_post')
+        if self.digest:
+            QUEUE_DEPTH.set_function(lambda: self.digest.pending, queue='digest')
+        if self.reminders:
+            QUEUE_DEPTH.set_function(lambda: self.reminders.pending, queue='reminders')
+        if self.expiry:
+            QUEUE_DEPTH.set_function(lambda: self.expiry.pending, queue='pending_expiry')
     
     async def on_ready(self):
         """
         Event khi bot sẵn sàng
         """
-        logger.info(f'{self.user} has connected to Discord!')
-        logger.info(f'Bot is in {len(self.guilds)} guilds')
+        logger.info('%s has connected to Discord!', self.user)
+        logger.info('Bot is in %s guilds', len(self.guilds))
+        if not startup.reported:
+            startup.mark('gateway_ready')
+            startup.report()
         
         # Sync slash commands
         try:
             synced = await self.tree.sync()
-            logger.info(f"Synced {len(synced)} command(s)")
+            logger.info("Synced %s command(s)", len(synced))
         except Exception as e:
-            logger.error(f"Failed to sync commands: {e}")
+            logger.error("Failed to sync commands: %s", e)
+    
+    async def close(self):
+        """
+        Tắt bot: xả digest vào hàng đợi và post nốt booking đang chờ trước khi đóng kết nối Discord
+        """
+        if self.digest:
+            await self.digest.stop()
+        await self.post_queue.join(timeout=SHUTDOWN_DRAIN_SECONDS)
+        await self.post_queue.stop()
+        await super().close()
     
     async def on_error(self, event, *args, **kwargs):
         """
         Xử lý lỗi global
         """
-        logger.error(f"Discord bot error in {event}: {args}", exc_info=True)
+        logger.error("Discord bot error in %s: %s", event, args, exc_info=True)
     
-    async def process_new_booking(self, booking_data):
+    async def process_new_booking(self, booking):
         """
-        Xử lý booking mới từ webhook
+        Xử lý booking mới từ webhook - đưa vào hàng đợi post lên Discord
+        
+        Ở digest mode, booking không xung đột được gom vào embed tổng hợp định kỳ;
+        booking có xung đột luôn được post ngay.
         
         Args:
-            booking_data (dict): Dữ liệu booking từ Google Form
+            booking (Booking): Booking đã chuẩn hóa từ webhook
         """
-        try:
-            channel = self.get_channel(self.channel_id)
-            if not channel:
-                logger.error(f"Cannot find channel with ID: {self.channel_id}")
+        booking = Booking.coerce(booking)
+        if self.expiry:
+            self.expiry.track(booking)
+        
+        with use_trace(booking.trace_id):
+            if self.digest and not booking.conflict_message:
+                with span('discord.enqueue', mode='digest'):
+                    self.digest.add(booking)
+                logger.info("Booking for %s buffered for digest (%s pending)", booking.email, self.digest.pending)
                 return
             
-            # Tạo embed message
-            embed = discord.Embed(
-                title="🆕 Booking mới cần xử lý",
-                color=0x0099FF,
-                timestamp=datetime.now(self.timezone)
-            )
-            
-            embed.add_field(name="👤 Tên khách hàng", value=booking_data.get('name', 'N/A'), inline=True)
-            embed.add_field(name="📧 Email", value=booking_data.get('email', 'N/A'), inline=True)
-            embed.add_field(name="📞 Điện thoại", value=booking_data.get('phone', 'N/A'), inline=True)
-            embed.add_field(name="📅 Ngày đặt", value=booking_data.get('date', 'N/A'), inline=True)
-            
-            # Format thời gian từ startTime và endTime
-            start_time = booking_data.get('startTime', '')
-            end_time = booking_data.get('endTime', '')
-            time_display = f"({start_time} - {end_time})" if start_time and end_time else booking_data.get('time', 'N/A')
-            embed.add_field(name="⏰ Thời gian", value=time_display, inline=True)
-            
-            embed.add_field(name="🏢 Phòng/Địa điểm", value=booking_data.get('room', 'N/A'), inline=True)
-            embed.add_field(name="📝 Ghi chú", value=booking_data.get('notes', 'Không có') or 'Không có', inline=False)
-            embed.add_field(name="🔄 Trạng thái", value="**CHỜ XỬ LÝ**", inline=True)
-            
-            # Hiển thị conflict message từ Apps Script nếu có
-            conflict_message = booking_data.get('conflictMessage', '')
-            if conflict_message:
-                embed.add_field(
-                    name="⚠️ Cảnh báo xung đột",
-                    value=conflict_message,
-                    inline=False
-                )
-                embed.color = 0xFFA500  # Orange color for warning
-            
-            embed.set_footer(text=f"ID: {booking_data.get('rowNumber', 'N/A')}")
+            with span('discord.enqueue', mode='queue', depth=self.post_queue.depth):
+                self.post_queue.enqueue(booking)
+    
+    def build_booking_embed(self, booking):
+        """
+        Tạo embed cho booking mới đang chờ xử lý
+        
+        Args:
+            booking (Booking): Thông tin booking
             
-            # Tạo view với buttons
-            view = BookingView(booking_data, self.sheets_manager, self.email_manager)
+        Returns:
+            discord.Embed: Embed hiển thị booking
+        """
+        embed = discord.Embed(
+            title="🆕 Booking mới cần xử lý",
+            color=0x0099FF,
+            timestamp=datetime.now(self.timezone)
+        )
+        
+        embed.add_field(name="👤 Tên khách hàng", value=booking.name or 'N/A', inline=True)
+        embed.add_field(name="📧 Email", value=booking.email or 'N/A', inline=True)
+        embed.add_field(name="📞 Điện thoại", value=booking.phone or 'N/A', inline=True)
+        embed.add_field(name="📅 Ngày đặt", value=booking.date or 'N/A', inline=True)
+        embed.add_field(name="⏰ Thời gian", value=booking.time_display, inline=True)
+        embed.add_field(name="🏢 Phòng/Địa điểm", value=booking.room or 'N/A', inline=True)
+        embed.add_field(name="📝 Ghi chú", value=booking.notes or 'Không có', inline=False)
+        embed.add_field(name="🔄 Trạng thái", value="**CHỜ XỬ LÝ**", inline=True)
+        
+        # Hiển thị conflict message nếu có
+        if booking.conflict_message:
+            embed.add_field(
+                name="⚠️ Cảnh báo xung đột",
+                value=booking.conflict_message,
+                inline=False
+            )
+            embed.color = 0xFFA500  # Orange color for warning
+        
+        footer = f"ID: {booking.row_number or 'N/A'}"
+        if booking.trace_id:
+            footer += f" • Trace: {booking.trace_id}"
+        embed.set_footer(text=footer)
+        return embed
+    
+    def _get_booking_channel(self):
+        channel = self.get_channel(self.channel_id)
+        if not channel:
+            logger.error("Cannot find channel with ID: %s", self.channel_id)
+        return channel
+    
+    @timed('discord', 'post')
+    async def _post_booking(self, booking):
+        """
+        Gửi một booking lên channel kèm các nút xử lý (consumer của post_queue)
+        """
+        channel = self._get_booking_channel()
+        if not channel:
+            # Để post_queue ghi nhận 'failed' thay vì coi booking là đã post
+            raise RuntimeError(f"Booking channel {self.channel_id} not found")
+        
+        with use_trace(booking.trace_id), span('discord.post', row=booking.row_number):
+            embed = self.build_booking_embed(booking)
+            view = BookingView(booking, self.sheets_manager, self.email_manager, self.reminders, self.expiry)
             
-            # Gửi message với embed và buttons
             message = await channel.send(embed=embed, view=view)
-            
-            logger.info(f"New booking posted to Discord: {booking_data.get('email')}")
-            
-            # Mention role nếu cần (optional)
-            # await channel.send("@here Có booking mới cần xử lý!")
-            
-        except Exception as e:
-            logger.error(f"Error processing new booking: {e}")
-            raise
+        if self.expiry:
+            self.expiry.attach_message(booking.row_number, message)
+        logger.info("New booking posted to Discord: %s", booking.email)
     
-    @app_commands.command(name="booking_status", description="Kiểm tra trạng thái booking")
-    async def booking_status(self, interaction: discord.Interaction, email: str = None):
+    @timed('discord', 'post_summary')
+    async def _post_booking_summary(self, bookings):
         """
-        Slash command để kiểm tra trạng thái booking
+        Gửi một message tổng hợp cho nhiều booking (backlog lớn hoặc digest)
         """
-        try:
-            await interaction.response.defer()
-            
-            if email:
-                # Tìm booking theo email
-                data = self.sheets_manager.get_sheet_data()
-                bookings = []
-                
-                for i, row in enumerate(data[1:], start=2):
-                    if len(row) >= 2 and row[1].lower() == email.lower():
-                        bookings.append({
-                            'row': i,
-                            'data': row
-                        })
-                
-                if not bookings:
-                    await interaction.followup.send(f"❌ Không tìm thấy booking nào cho email: {email}")
-                    return
-                
-                # Hiển thị danh sách bookings
-                embed = discord.Embed(
-                    title=f"📋 Booking của {email}",
-                    color=0x0099FF
-                )
-                
-                for booking in bookings[-5:]:  # Chỉ hiển thị 5 booking gần nhất
-                    row = booking['data']
-                    status = row[7] if len(row) > 7 else "Chờ xử lý"
-                    
-                    embed.add_field(
-                        name=f"📅 {row[4]} - {row[5]}",
-                        value=f"🏢 {row[6]}\n🔄 {status}",
-                        inline=True
-                    )
-                
-                await interaction.followup.send(embed=embed)
-            
+        channel = self._get_booking_channel()
+        if not channel:
+            raise RuntimeError(f"Booking channel {self.channel_id} not found")
+        
+        started_ns = time.time_ns()
+        embed = build_summary_embed(bookings, "📥 Tổng hợp booking mới cần xử lý", self.timezone)
+        view = BookingSelectView(bookings, self)
+        
+        await channel.send(embed=embed, view=view)
+        
+        # Mỗi booking trong summary có trace riêng
+        for booking in bookings:
+            with use_trace(booking.trace_id):
+                record_span('discord.post_summary', started_ns, row=booking.row_number, size=len(bookings))
+        logger.info("Posted summary of %s bookings to Discord", len(bookings))
+    
+    async def _send_reminder_email(self, booking, offset):
+        """Gửi email nhắc lịch cho khách (callback của ReminderScheduler)"""
+        return await asyncio.to_thread(self.email_manager.send_reminder_email, booking)
+    
+    async def _send_reminder_ping(self, booking, offset):
+        """
+        Ping trên channel booking trước giờ bắt đầu (callback của ReminderScheduler)
+        
+        Args:
+            booking (Booking): Booking đã xác nhận
+            offset (int): Số phút trước giờ bắt đầu
+        """
+        channel = self._get_booking_channel()
+        if not channel:
+            return False
+        
+        lead = f"{offset // 60} giờ" if offset % 60 == 0 else f"{offset} phút"
+        await channel.send(
+            f"⏰ **Nhắc lịch** - booking #{booking.row_number} bắt đầu sau {lead}\n"
+            f"👤 Khách: {booking.name}\n"
+            f"📅 Lịch: {booking.date} - {booking.time_display}\n"
+            f"🏢 Phòng: {booking.room}"
+        )
+        return True
+    
+    async def _expire_pending_bookings(self, bookings):
+        """
+        Xử lý các booking chờ quá SLA (callback của PendingExpirySweeper): một batchUpdate lên
+        sheet, sửa embed của từng booking và một message tổng hợp
+        
+        Args:
+            bookings (list): Các Booking đã hết hạn theo index
+        """
+        # Đọc lại sheet một lần: bỏ booking đã được xử lý ngoài bot (sửa tay trên sheet)
+        rows = await asyncio.to_thread(self.sheets_manager.get_sheet_data)
+        if not rows:
+            raise RuntimeError("Google Sheets returned no data")
+        expired = []
+        for booking in bookings:
+            row = rows[booking.row_number - 1] if 1 <= booking.row_number <= len(rows) else []
+            status = str(row[10]).strip() if len(row) > 10 else ''
+            email = str(row[9]).strip() if len(row) > 9 else ''
+            note = str(row[11]) if len(row) > 11 else ''
+            if status in PENDING_STATUSES and email == booking.email and EXPIRED_NOTE not in note:
+                expired.append(booking)
             else:
-                # Hiển thị thống kê tổng quan
-                data = self.sheets_manager.get_sheet_data()
-                
-                if len(data) < 2:
-                    await interaction.followup.send("❌ Không có dữ liệu booking")
-                    return
-                
-                total = len(data) - 1  # Trừ header
-                confirmed = 0
-                cancelled = 0
-                pending = 0
-                
-                for row in data[1:]:
-                    if len(row) > 7:
-                        status = row[7].lower()
-                        if 'xác nhận' in status:
-                            confirmed += 1
-                        elif 'hủy' in status:
-                            cancelled += 1
-                        else:
-                            pending += 1
-                    else:
-                        pending += 1
-                
-                embed = discord.Embed(
-                    title="📊 Thống kê Booking",
-                    color=0x0099FF
-                )
-                
-                embed.add_field(name="📝 Tổng số", value=str(total), inline=True)
-                embed.add_field(name="✅ Đã xác nhận", value=str(confirmed), inline=True)
-                embed.add_field(name="❌ Đã hủy", value=str(cancelled), inline=True)
-                embed.add_field(name="⏳ Chờ xử lý", value=str(pending), inline=True)
-                
-                await interaction.followup.send(embed=embed)
-                
-        except Exception as e:
-            logger.error(f"Error in booking_status command: {e}")
-            await interaction.followup.send(f"❌ Lỗi: {str(e)}")
+                self.expiry.resolve(booking.row_number)
+        if not expired:
+            return
+        
+        action = Config.PENDING_EXPIRY_ACTION if Config.PENDING_EXPIRY_ACTION in EXPIRY_ACTIONS else 'flag'
+        hours = f"{Config.PENDING_EXPIRY_HOURS:g}"
+        row_numbers = [booking.row_number for booking in expired]
+        if action == 'cancel':
+            updated = await asyncio.to_thread(
+                self.sheets_manager.update_booking_statuses, row_numbers, 'cancelled', f"auto-expiry ({hours}h)"
+            )
+        else:
+            updated = await asyncio.to_thread(
+                self.sheets_manager.annotate_bookings, row_numbers, f"{EXPIRED_NOTE} ({hours}h)"
+            )
+        if not updated:
+            raise RuntimeError(f"Failed to {action} {len(row_numbers)} expired booking(s) in Google Sheets")
+        
+        if action == 'cancel':
+            await asyncio.to_thread(
+                self.email_manager.send_booking_emails, [('cancellation', booking) for booking in expired]
+            )
+        logger.info("Expired pending bookings (%s): rows %s", action, row_numbers)
+        
+        # Sửa embed của các booking đã post (tuần tự - cùng bucket rate limit của channel)
+        for booking in expired:
+            message = (self.expiry.messages.pop(booking.row_number, None) if action == 'cancel'
+                       else self.expiry.messages.get(booking.row_number))
+            if not message:
+                continue
+            try:
+                embed = message.embeds[0].copy() if message.embeds else self.build_booking_embed(booking)
+                if action == 'cancel':
+                    embed.title = "⌛ Booking quá hạn - đã tự động hủy"
+                    embed.color = 0x808080
+                    embed.add_field(name="🔄 Trạng thái", value=f"**ĐÃ HỦY** (chờ quá {hours} giờ)", inline=False)
+                    await message.edit(embed=embed, view=None)
+                else:
+                    embed.color = 0xFFA500
+                    embed.add_field(name="⌛ Quá hạn", value=f"Chờ xử lý quá {hours} giờ", inline=False)
+                    await message.edit(embed=embed)
+            except Exception as e:
+                logger.warning("Failed to update Discord message for expired booking row %s: %s", booking.row_number, e)
+        
+        channel = self._get_booking_channel()
+        if not channel:
+            return
+        if action == 'cancel':
+            embed = build_summary_embed(expired, f"⌛ Đã tự động hủy booking chờ quá {hours} giờ", self.timezone)
+            embed.description = f"**{len(expired)}** booking không được xử lý trong {hours} giờ đã bị hủy."
+            await channel.send(embed=embed)
+        else:
+            embed = build_summary_embed(expired, f"⌛ Booking chờ xử lý quá {hours} giờ", self.timezone)
+            await channel.send(embed=embed, view=BookingSelectView(expired, self))
     
-    @app_commands.command(name="refresh_booking", description="Làm mới một booking từ Google Sheets")
-    async def refresh_booking(self, interaction: discord.Interaction, row_number: int):
+    async def _sync_from_sheet(self):
         """
-        Slash command để làm mới booking từ Google Sheets
+        Đồng bộ lịch nhắc (booking đã xác nhận) và index hết hạn (booking chờ xử lý) với
+        Google Sheets - một lần đọc sheet khi khởi động
         """
         try:
-            await interaction.response.defer()
-            
-            data = self.sheets_manager.get_sheet_data()
-            
-            if row_number < 2 or row_number > len(data):
-                await interaction.followup.send(f"❌ Số dòng không hợp lệ: {row_number}")
-                return
-            
-            row = data[row_number - 1]
-            
-            if len(row) < 6:
-                await interaction.followup.send(f"❌ Dữ liệu dòng {row_number} không đầy đủ")
+            rows = await asyncio.to_thread(self.sheets_manager.get_sheet_data)
+            if not rows:
                 return
-            
-            # Tạo booking data
-            booking_data = {
-                'row_number': row_number,
-                'email': row[1] if len(row) > 1 else "",
-                'name': row[2] if len(row) > 2 else "",
-                'phone': row[3] if len(row) > 3 else "",
-                'date': row[4] if len(row) > 4 else "",
-                'time': row[5] if len(row) > 5 else "",
-                'room': row[6] if len(row) > 6 else "",
-                'note': row[8] if len(row) > 8 else ""
-            }
-            
-            # Xử lý như booking mới
-            await self.process_new_booking(booking_data)
-            
-            await interaction.followup.send(f"✅ Đã làm mới booking dòng {row_number}")
-            
+            if self.reminders:
+                self.reminders.sync_from_sheet(rows)
+            if self.expiry:
+                self.expiry.sync_from_sheet(rows)
         except Exception as e:
-            logger.error(f"Error in refresh_booking command: {e}")
-            await interaction.followup.send(f"❌ Lỗi: {str(e)}")
-
+            logger.error("Failed to sync reminders/pending bookings from Google Sheets: %s", e)
+    
+    async def reconcile_calendar_now(self, dry_run=True):
+        """
+        Đối chiếu sheet <-> Calendar (một lần chạy tại một thời điểm)
+        
+        Returns:
+            ReconcileReport: Báo cáo chênh lệch
+        """
+        async with self._reconcile_lock:
+            return await asyncio.to_thread(self.calendar_reconciler.reconcile, dry_run=dry_run)
+    
+    async def _reconcile_calendar_loop(self):
+        """Đối chiếu định kỳ mỗi CALENDAR_RECONCILE_INTERVAL_MINUTES phút"""
+        interval = Config.CALENDAR_RECONCILE_INTERVAL_MINUTES * 60
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                report = await self.reconcile_calendar_now(dry_run=Config.CALENDAR_RECONCILE_DRY_RUN)
+                if not report.in_sync:
+                    logger.warning(report.format())
+            except Exception as e:
+                logger.error("Calendar reconciliation failed: %s", e)
+    
     async def load_extensions(self):
         """Load các extensions/cogs"""
-        try:
-            # Load kho commands
-            await self.load_extension('kho.kho_commands')
-            logger.info("Loaded kho.kho_commands extension")
-        except Exception as e:
-            logger.error(f"Failed to load kho.kho_commands extension: {e}")
+        # Slash commands booking và lệnh kho
+        for extension in ('bot.booking_commands', 'kho.kho_commands'):
+            try:
+                await self.load_extension(extension)
+                logger.info("Loaded %s extension", extension)
+            except Exception as e:
+                logger.error("Failed to load %s extension: %s", extension, e)
 
     async def setup_hook(self):
         """Setup hook được gọi khi bot khởi động"""
         await self.load_extensions()
+        self.post_queue.start()
+        if self.digest:
+            self.digest.start()
+        if self.reminders:
+            self.reminders.start()
+        if self.expiry:
+            self.expiry.start()
+        if self.reminders or self.expiry:
+            self._sheet_sync_task = self.loop.create_task(self._sync_from_sheet())
+        if Config.CALENDAR_RECONCILE_INTERVAL_MINUTES > 0:
+            self._reconcile_task = self.loop.create_task(self._reconcile_calendar_loop())
+        self._loop_lag_task = self.loop.create_task(monitor_event_loop_lag())
+        if profiler.enabled:
+            profiler.start()
+            self._watchdog_task = self.loop.create_task(profiler.watchdog.run())
+        startup.mark('setup_hook')
         logger.info("Bot setup completed")
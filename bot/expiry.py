@@ -0,0 +1,213 @@
+"""
+Pending Expiry Sweeper - booking "Chờ xử lý" quá SLA mà chưa admin nào xử lý được tự động
+đánh dấu quá hạn hoặc hủy (để không giữ chỗ mãi trong kiểm tra xung đột)
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import pytz
+
+from config import Config
+from google_sheets.availability import HOLDING_STATUSES
+from models.booking import Booking, parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = tuple(status for status in HOLDING_STATUSES if status != 'Đã xác nhận')
+EXPIRY_ACTIONS = ('flag', 'cancel')
+# Ghi chú cột L (ProcessedTime) khi booking bị đánh dấu quá hạn (action 'flag', trạng thái giữ nguyên)
+EXPIRED_NOTE = 'quá hạn xử lý'
+
+# Thức dậy ít nhất mỗi giờ để bắt kịp nếu đồng hồ hệ thống bị chỉnh (xem bot/reminders.py)
+MAX_SLEEP = 3600.0
+RETRY_SECONDS = 300.0
+
+
+class PendingExpirySweeper:
+    """
+    Min-heap các booking đang chờ xử lý theo thời điểm hết hạn (timestamp tạo + SLA).
+
+    - Chỉ thức dậy khi booking sớm nhất hết hạn, không quét lại toàn bộ sheet định kỳ.
+    - Các booking hết hạn cách nhau không quá `batch_window` giây được xử lý cùng một lần
+      (một batchUpdate lên sheet, một message tổng hợp trên Discord).
+    - Booking được admin xử lý thì bị gỡ khỏi index (lazy deletion trong heap).
+    """
+
+    def __init__(
+        self,
+        expire: Callable[[List[Booking]], Awaitable[None]],
+        sla_hours: Optional[float] = None,
+        batch_window: Optional[float] = None
+    ):
+        """
+        Args:
+            expire: Coroutine xử lý danh sách booking đã hết hạn
+            sla_hours (float): Thời gian tối đa một booking được ở trạng thái chờ (giờ)
+            batch_window (float): Thời gian gom các booking hết hạn gần nhau (giây)
+        """
+        self.expire = expire
+        self.sla = (sla_hours if sla_hours is not None else Config.PENDING_EXPIRY_HOURS) * 3600
+        self.batch_window = batch_window if batch_window is not None else Config.PENDING_EXPIRY_BATCH_SECONDS
+        self.timezone = pytz.timezone(Config.TIMEZONE)
+
+        self._heap: List[Tuple[float, int]] = []
+        self._pending: Dict[int, Tuple[float, Booking]] = {}
+        # row_number -> message booking trên Discord (để sửa embed khi hết hạn)
+        self.messages: Dict[int, object] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.expired = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def next_expiry(self) -> Optional[float]:
+        """Thời điểm (Unix timestamp) booking sớm nhất hết hạn"""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def start(self):
+        """Khởi động vòng lặp (gọi trong event loop của bot)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info("Pending expiry sweeper started (SLA %gh)", self.sla / 3600)
+
+    async def stop(self):
+        """Dừng vòng lặp"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def created_at(self, booking: Booking, default: Optional[float] = None) -> Optional[float]:
+        """Timestamp tạo booking (cột A) dạng Unix timestamp, `default` nếu không parse được"""
+        submitted = parse_timestamp(booking.submitted_at)
+        if submitted is None:
+            return default
+        if submitted.tzinfo is None:
+            submitted = self.timezone.localize(submitted)
+        return submitted.timestamp()
+
+    def track(self, booking, now: Optional[float] = None, expires_at: Optional[float] = None):
+        """
+        Theo dõi booking đang chờ xử lý (booking mới từ webhook, hoặc đọc từ sheet)
+
+        Booking không có timestamp hợp lệ được tính từ lúc bot nhận.
+
+        Args:
+            booking (Booking): Booking đang chờ xử lý
+            now (float): Thời điểm hiện tại (Unix timestamp), mặc định time.time()
+            expires_at (float): Thời điểm hết hạn cụ thể (khi xử lý lại sau lỗi)
+        """
+        booking = Booking.coerce(booking)
+        if not booking.row_number:
+            return
+        now = time.time() if now is None else now
+        if expires_at is None:
+            expires_at = self.created_at(booking, default=now) + self.sla
+        current = self._pending.get(booking.row_number)
+        if current is not None and current[0] == expires_at:
+            self._pending[booking.row_number] = (expires_at, booking)
+            return
+        self._pending[booking.row_number] = (expires_at, booking)
+        heapq.heappush(self._heap, (expires_at, booking.row_number))
+        if self._heap[0][1] == booking.row_number:
+            self._wakeup.set()
+
+    def attach_message(self, row_number: int, message):
+        """Ghi nhớ message Discord của booking đang chờ"""
+        if row_number in self._pending:
+            self.messages[row_number] = message
+
+    def resolve(self, row_number: int) -> bool:
+        """Gỡ booking đã được xử lý (xác nhận/hủy/lỗi) khỏi index"""
+        self.messages.pop(row_number, None)
+        return self._pending.pop(row_number, None) is not None
+
+    def sync_from_sheet(self, rows: List[list], now: Optional[float] = None) -> int:
+        """
+        Build lại index từ dữ liệu Google Sheet (bao gồm header) - một lần khi khởi động
+
+        Returns:
+            int: Số booking đang chờ xử lý
+        """
+        self._pending.clear()
+        self._heap.clear()
+        for row_number, row in enumerate(rows[1:], start=2):
+            if len(row) < 8:
+                continue
+            status = str(row[10]).strip() if len(row) > 10 else ''
+            note = str(row[11]) if len(row) > 11 else ''
+            # Booking đã được đánh dấu quá hạn trước đó (vẫn "Chờ xử lý") không bị đánh dấu lại sau restart
+            if status in PENDING_STATUSES and EXPIRED_NOTE not in note:
+                self.track(Booking.from_sheet_row(row, row_number), now=now)
+        self._wakeup.set()
+        logger.info("Pending expiry index loaded: %s pending booking(s)", self.pending)
+        return self.pending
+
+    def _discard_stale(self):
+        heap = self._heap
+        while heap:
+            expires_at, row_number = heap[0]
+            current = self._pending.get(row_number)
+            if current is not None and current[0] == expires_at:
+                return
+            heapq.heappop(heap)
+
+    def pop_expired(self, now: Optional[float] = None) -> List[Booking]:
+        """Lấy (và gỡ khỏi index) các booking đã hết hạn"""
+        now = time.time() if now is None else now
+        expired = []
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return expired
+            _, row_number = heapq.heappop(self._heap)
+            expired.append(self._pending.pop(row_number)[1])
+
+    async def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Xử lý các booking đã hết hạn
+
+        Returns:
+            int: Số booking hết hạn
+        """
+        expired = self.pop_expired(now)
+        if not expired:
+            return 0
+        logger.info("%s pending booking(s) exceeded %gh SLA", len(expired), self.sla / 3600)
+        try:
+            await self.expire(expired)
+        except Exception as e:
+            # Trả lại index, thử lại sau (VD: Google Sheets lỗi tạm thời)
+            retry_at = time.time() + max(self.batch_window, RETRY_SECONDS)
+            logger.error("Error expiring %s pending booking(s), retrying in %.0fs: %s", len(expired), retry_at - time.time(), e)
+            for booking in expired:
+                if booking.row_number not in self._pending:
+                    self.track(booking, expires_at=retry_at)
+            return 0
+        self.expired += len(expired)
+        return len(expired)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            next_expiry = self.next_expiry
+            # Chờ thêm batch_window sau booking sớm nhất để gom các booking hết hạn ngay sau đó
+            delay = None if next_expiry is None else next_expiry + self.batch_window - time.time()
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay or MAX_SLEEP, MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.sweep()
@@ -0,0 +1,157 @@
+"""
+Hàng đợi gửi booking mới lên Discord - một consumer duy nhất, giãn nhịp theo rate limit của channel
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, List, Optional
+
+from config import Config
+from monitoring.metrics import QUEUE_PROCESSED, QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+class BookingPostQueue:
+    """
+    Hàng đợi có thứ tự cho các booking cần post lên channel.
+
+    - Chỉ một consumer gửi message nên booking được post đúng thứ tự nhận.
+    - Nhịp gửi được giới hạn theo bucket của channel (mặc định 5 message / 5 giây)
+      thay vì để discord.py tự sleep khi bị 429.
+    - Khi backlog vượt ngưỡng, các booking đang chờ được gộp thành một message tổng hợp.
+    """
+
+    def __init__(
+        self,
+        post_single: Callable[[object], Awaitable[None]],
+        post_summary: Callable[[List[object]], Awaitable[None]],
+        rate: Optional[int] = None,
+        per: Optional[float] = None,
+        burst_threshold: Optional[int] = None,
+        max_summary: int = 25
+    ):
+        """
+        Args:
+            post_single: Coroutine gửi một booking
+            post_summary: Coroutine gửi message tổng hợp cho nhiều booking
+            rate (int): Số message tối đa trong mỗi cửa sổ `per` giây
+            per (float): Độ dài cửa sổ rate limit (giây)
+            burst_threshold (int): Backlog vượt ngưỡng này sẽ được gộp thành message tổng hợp
+            max_summary (int): Số booking tối đa trong một message tổng hợp (giới hạn select menu là 25)
+        """
+        self.post_single = post_single
+        self.post_summary = post_summary
+        self.rate = rate or Config.DISCORD_POST_RATE
+        self.per = per or Config.DISCORD_POST_PER
+        self.burst_threshold = burst_threshold or Config.DISCORD_POST_BURST_THRESHOLD
+        self.max_summary = max_summary
+
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._sent_at: deque = deque(maxlen=self.rate)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Khởi động consumer (gọi trong event loop của bot)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._consume())
+            logger.info("Booking post queue started (%s msg/%ss, burst threshold %s)", self.rate, self.per, self.burst_threshold)
+
+    async def stop(self):
+        """Dừng consumer"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def join(self, timeout: float) -> bool:
+        """
+        Chờ các booking đang chờ được post hết (VD: trước khi tắt bot)
+
+        Args:
+            timeout (float): Thời gian chờ tối đa (giây)
+
+        Returns:
+            bool: True nếu hàng đợi đã trống
+        """
+        if self._task is None or self._task.done():
+            return self.depth == 0
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("Booking post queue not drained after %gs, %s booking(s) dropped", timeout, self.depth)
+            return False
+
+    def enqueue(self, booking):
+        """Thêm booking vào hàng đợi (không block)"""
+        self._queue.put_nowait((time.monotonic(), booking))
+        logger.debug("Booking queued for Discord, depth=%s", self._queue.qsize())
+
+    def enqueue_group(self, bookings: List[object]):
+        """Thêm một nhóm booking đã gộp sẵn (VD: digest) - sẽ được post thành một message tổng hợp"""
+        if bookings:
+            self._queue.put_nowait((time.monotonic(), list(bookings)))
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def _wait_for_slot(self):
+        """Chờ tới khi bucket của channel còn chỗ"""
+        if len(self._sent_at) >= self.rate:
+            wait = self._sent_at[0] + self.per - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        self._sent_at.append(time.monotonic())
+
+    async def _consume(self):
+        while True:
+            enqueued_at, item = await self._queue.get()
+            items = [(enqueued_at, item)]
+
+            if isinstance(item, list):
+                # Nhóm đã gộp sẵn
+                bookings = item
+            else:
+                # Backlog lớn: gộp các booking đơn lẻ đang chờ thành một message tổng hợp
+                if self._queue.qsize() >= self.burst_threshold:
+                    while len(items) < self.max_summary and not self._queue.empty():
+                        next_item = self._queue.get_nowait()
+                        items.append(next_item)
+                        if isinstance(next_item[1], list):
+                            break
+                bookings = []
+                for _, queued in items:
+                    bookings.extend(queued if isinstance(queued, list) else [queued])
+
+            outcome = 'failed'
+            try:
+                if len(items) == 1 and not isinstance(item, list):
+                    await self._wait_for_slot()
+                    await self.post_single(item)
+                    outcome = 'posted'
+                else:
+                    for start in range(0, len(bookings), self.max_summary):
+                        await self._wait_for_slot()
+                        await self.post_summary(bookings[start:start + self.max_summary])
+                    outcome = 'merged'
+            except Exception as e:
+                logger.error("Error posting %s booking(s) to Discord: %s", len(bookings), e)
+            finally:
+                # Time-to-post tính cho từng booking, kể cả booking trong message tổng hợp
+                now = time.monotonic()
+                for queued_at, queued in items:
+                    for _ in range(len(queued) if isinstance(queued, list) else 1):
+                        QUEUE_WAIT.observe(now - queued_at, queue='discord_post')
+                    self._queue.task_done()
+                QUEUE_PROCESSED.inc(len(bookings), queue='discord_post', outcome=outcome)
+
+            if len(bookings) > 1:
+                logger.info("Posted summary of %s bookings, remaining depth=%s", len(bookings), self.depth)
+            logger.debug("Booking time-to-post %.2fs, depth=%s", now - enqueued_at, self.depth)
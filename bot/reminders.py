@@ -0,0 +1,408 @@
+"""
+Reminder Scheduler - nhắc lịch (email cho khách, ping trên Discord) trước giờ bắt đầu của các
+booking đã xác nhận
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, time as time_cls
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pytz
+
+from config import Config
+from models.booking import Booking
+from monitoring.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_SENT = registry.counter('booking_reminders_total', 'Số nhắc lịch đã xử lý theo kênh và kết quả')
+
+CONFIRMED_STATUS = 'Đã xác nhận'
+STATE_VERSION = 1
+
+# asyncio ngủ theo đồng hồ monotonic còn lịch nhắc theo giờ thực - thức dậy ít nhất mỗi giờ
+# để bắt kịp nếu đồng hồ hệ thống bị chỉnh (NTP, VPS suspend)
+MAX_SLEEP = 3600.0
+
+
+def parse_offsets(value: str) -> List[int]:
+    """'1440,60' -> [1440, 60] (phút trước giờ bắt đầu, bỏ giá trị không hợp lệ)"""
+    offsets = set()
+    for part in str(value or '').split(','):
+        try:
+            minutes = int(part.strip())
+        except ValueError:
+            continue
+        if minutes > 0:
+            offsets.add(minutes)
+    return sorted(offsets, reverse=True)
+
+
+@dataclass
+class Reminder:
+    """Một lần nhắc: booking `row_number` qua `channel`, `offset` phút trước giờ bắt đầu"""
+    row_number: int
+    channel: str
+    offset: int
+    due: float          # Unix timestamp cần gửi
+    starts_at: float    # Unix timestamp giờ bắt đầu booking
+    booking: dict       # Booking.to_dict() - đủ để gửi lại sau khi restart
+    attempts: int = 0
+
+    @property
+    def key(self) -> Tuple[int, str, int]:
+        return (self.row_number, self.channel, self.offset)
+
+
+class ReminderScheduler:
+    """
+    Lịch nhắc dạng min-heap theo thời điểm cần gửi, chạy trong event loop của bot.
+
+    - Vòng lặp chỉ thức dậy khi lần nhắc sớm nhất tới hạn (hoặc khi có lịch mới sớm hơn),
+      không poll Google Sheets.
+    - Lịch được ghi ra file JSON sau mỗi thay đổi để sống sót qua restart; lần nhắc tới hạn
+      trong lúc bot tắt được gửi ngay khi khởi động nếu booking chưa bắt đầu.
+    - Hủy/đổi lịch dùng lazy deletion: entry cũ vẫn nằm trong heap nhưng bị bỏ qua khi pop.
+    """
+
+    def __init__(
+        self,
+        send_email: Callable[[Booking], Awaitable[bool]],
+        send_discord: Callable[[Booking, int], Awaitable[bool]],
+        offsets: Optional[Iterable[int]] = None,
+        channels: Optional[Iterable[str]] = None,
+        state_path: Optional[str] = None,
+        retry_delay: Optional[float] = None,
+        max_attempts: int = 3
+    ):
+        """
+        Args:
+            send_email: Coroutine gửi email nhắc lịch cho khách
+            send_discord: Coroutine ping trên Discord (booking, số phút trước giờ bắt đầu)
+            offsets: Các mốc nhắc (phút trước giờ bắt đầu)
+            channels: Kênh nhắc ('email', 'discord')
+            state_path (str): File JSON lưu lịch nhắc
+            retry_delay (float): Thời gian chờ trước khi gửi lại lần nhắc bị lỗi (giây)
+            max_attempts (int): Số lần gửi tối đa cho mỗi lần nhắc
+        """
+        self.senders = {'email': send_email, 'discord': send_discord}
+        self.offsets = list(offsets) if offsets is not None else parse_offsets(Config.REMINDER_OFFSETS_MINUTES)
+        if channels is None:
+            channels = [c.strip() for c in Config.REMINDER_CHANNELS.split(',') if c.strip()]
+        self.channels = [c for c in channels if c in self.senders]
+        self.state_path = Path(state_path or Config.REMINDER_STATE_PATH)
+        self.retry_delay = retry_delay if retry_delay is not None else Config.REMINDER_RETRY_SECONDS
+        self.max_attempts = max(1, max_attempts)
+        self.timezone = pytz.timezone(Config.TIMEZONE)
+
+        self._heap: List[Tuple[float, Tuple[int, str, int]]] = []
+        self._entries: Dict[Tuple[int, str, int], Reminder] = {}
+        self._inflight: Dict[Tuple[int, str, int], Reminder] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._entries)
+
+    @property
+    def next_due(self) -> Optional[float]:
+        """Thời điểm (Unix timestamp) của lần nhắc sớm nhất còn hiệu lực"""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def start(self):
+        """Load lịch đã lưu và khởi động vòng lặp (gọi trong event loop của bot)"""
+        if self._task is None or self._task.done():
+            self.load()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(
+                "Reminder scheduler started (%s pending, offsets %s min, "
+                "channels %s)",
+                self.pending, self.offsets, self.channels
+            )
+
+    async def stop(self):
+        """Dừng vòng lặp (lịch đã được lưu sau mỗi thay đổi)"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ----- Lên lịch -----
+
+    def booking_start(self, booking: Booking) -> Optional[float]:
+        """Giờ bắt đầu booking theo timezone cấu hình (Unix timestamp), None nếu không parse được"""
+        if booking.booking_date is None or booking.start_minutes < 0:
+            return None
+        start = datetime.combine(
+            booking.booking_date,
+            time_cls(booking.start_minutes // 60, booking.start_minutes % 60)
+        )
+        return self.timezone.localize(start).timestamp()
+
+    def schedule_booking(self, booking, now: Optional[float] = None, save: bool = True) -> int:
+        """
+        Lên lịch (hoặc cập nhật lịch) nhắc cho một booking đã xác nhận
+
+        Mốc nhắc đã qua lúc xác nhận bị bỏ qua (khách vừa nhận email xác nhận). Lần nhắc
+        đã lên lịch trước đó nhưng chưa gửi được giữ nguyên nếu giờ booking không đổi.
+
+        Args:
+            booking (Booking): Booking đã xác nhận (cần row_number, ngày và giờ bắt đầu)
+            now (float): Thời điểm hiện tại (Unix timestamp), mặc định time.time()
+
+        Returns:
+            int: Số lần nhắc đang chờ của booking
+        """
+        booking = Booking.coerce(booking)
+        if not booking.row_number:
+            return 0
+        now = time.time() if now is None else now
+        starts_at = self.booking_start(booking)
+        if starts_at is None or starts_at <= now:
+            self._remove_row(booking.row_number)
+            if save:
+                self.save()
+            return 0
+
+        wanted = set()
+        for channel in self.channels:
+            for offset in self.offsets:
+                key = (booking.row_number, channel, offset)
+                current = self._entries.get(key)
+                if current is not None and current.starts_at == starts_at:
+                    current.booking = booking.to_dict()
+                    wanted.add(key)
+                    continue
+                due = starts_at - offset * 60
+                if due <= now:
+                    continue
+                self._push(Reminder(booking.row_number, channel, offset, due, starts_at, booking.to_dict()))
+                wanted.add(key)
+
+        for key in [k for k in self._entries if k[0] == booking.row_number and k not in wanted]:
+            del self._entries[key]
+        if save:
+            self.save()
+        return len(wanted)
+
+    def cancel_booking(self, row_number: int, save: bool = True) -> int:
+        """
+        Hủy mọi lần nhắc của booking (booking bị hủy hoặc đánh dấu lỗi)
+
+        Returns:
+            int: Số lần nhắc đã hủy
+        """
+        removed = self._remove_row(row_number)
+        if removed:
+            logger.info("Cancelled %s reminder(s) for booking row %s", removed, row_number)
+            if save:
+                self.save()
+        return removed
+
+    def sync_confirmed(self, bookings: Iterable[Booking], now: Optional[float] = None) -> int:
+        """
+        Đồng bộ với danh sách booking đã xác nhận (khi khởi động): lên lịch cho booking
+        mới/đổi giờ, bỏ lịch của booking không còn ở trạng thái xác nhận
+
+        Returns:
+            int: Số lần nhắc đang chờ sau khi đồng bộ
+        """
+        rows = set()
+        for booking in bookings:
+            booking = Booking.coerce(booking)
+            rows.add(booking.row_number)
+            self.schedule_booking(booking, now=now, save=False)
+        for row_number in {key[0] for key in self._entries} - rows:
+            self._remove_row(row_number)
+        self.save()
+        logger.info("Reminders synced with %s confirmed booking(s): %s pending", len(rows), self.pending)
+        return self.pending
+
+    def sync_from_sheet(self, rows: List[list], now: Optional[float] = None) -> int:
+        """Đồng bộ từ dữ liệu Google Sheet (bao gồm header), xem sync_confirmed"""
+        confirmed = [
+            Booking.from_sheet_row(row, row_number)
+            for row_number, row in enumerate(rows[1:], start=2)
+            if len(row) > 10 and str(row[10]).strip() == CONFIRMED_STATUS
+        ]
+        return self.sync_confirmed(confirmed, now=now)
+
+    def _push(self, reminder: Reminder):
+        self._entries[reminder.key] = reminder
+        heapq.heappush(self._heap, (reminder.due, reminder.key))
+        if self._heap[0][1] == reminder.key:
+            # Lịch mới sớm hơn lần thức dậy đang chờ
+            self._wakeup.set()
+
+    def _remove_row(self, row_number: int) -> int:
+        keys = [key for key in self._entries if key[0] == row_number]
+        for key in keys:
+            del self._entries[key]
+        # Lần nhắc đang gửi dở sẽ không được retry
+        for key in [key for key in self._inflight if key[0] == row_number]:
+            del self._inflight[key]
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            # Quá nhiều entry đã hủy còn nằm trong heap -> build lại
+            self._heap = [(entry.due, key) for key, entry in self._entries.items()]
+            heapq.heapify(self._heap)
+        return len(keys)
+
+    def _discard_stale(self):
+        """Bỏ các entry trên đỉnh heap đã bị hủy hoặc thay thế"""
+        heap = self._heap
+        while heap:
+            due, key = heap[0]
+            entry = self._entries.get(key)
+            if entry is not None and entry.due == due:
+                return
+            heapq.heappop(heap)
+
+    # ----- Gửi -----
+
+    def pop_due(self, now: Optional[float] = None) -> List[Reminder]:
+        """
+        Lấy các lần nhắc đã tới hạn. Nếu nhiều mốc của cùng booking/kênh cùng tới hạn
+        (bot tắt qua nhiều mốc) chỉ gửi mốc gần giờ bắt đầu nhất; booking đã bắt đầu bị bỏ qua.
+        """
+        now = time.time() if now is None else now
+        due: Dict[Tuple[int, str], Reminder] = {}
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, key = heapq.heappop(self._heap)
+            reminder = self._entries.pop(key)
+            if reminder.starts_at <= now:
+                REMINDERS_SENT.inc(channel=reminder.channel, result='expired')
+                logger.info("Skipping reminder for booking row %s: booking already started", reminder.row_number)
+                continue
+            slot = (reminder.row_number, reminder.channel)
+            kept = due.get(slot)
+            if kept is None or reminder.offset < kept.offset:
+                if kept is not None:
+                    REMINDERS_SENT.inc(channel=kept.channel, result='superseded')
+                due[slot] = reminder
+                self._inflight[key] = reminder
+            else:
+                REMINDERS_SENT.inc(channel=reminder.channel, result='superseded')
+        return list(due.values())
+
+    async def _deliver(self, reminder: Reminder) -> bool:
+        booking = Booking.coerce(reminder.booking)
+        try:
+            sent = await self.senders[reminder.channel](booking, reminder.offset)
+        except Exception as e:
+            logger.error("Error sending %s reminder for booking row %s: %s", reminder.channel, reminder.row_number, e)
+            sent = False
+        # Bị hủy hoặc lên lịch lại trong lúc gửi -> không retry
+        current = self._inflight.pop(reminder.key, None)
+
+        if sent:
+            REMINDERS_SENT.inc(channel=reminder.channel, result='sent')
+            logger.info(
+                "Sent %s reminder for booking row %s "
+                "(%s min before start)",
+                reminder.channel, reminder.row_number, reminder.offset
+            )
+            return True
+
+        reminder.attempts += 1
+        retry_at = time.time() + self.retry_delay
+        if current is not reminder or reminder.key in self._entries:
+            return False
+        if reminder.attempts < self.max_attempts and retry_at < reminder.starts_at:
+            reminder.due = retry_at
+            self._push(reminder)
+            REMINDERS_SENT.inc(channel=reminder.channel, result='retry')
+        else:
+            REMINDERS_SENT.inc(channel=reminder.channel, result='failed')
+            logger.warning("Giving up %s reminder for booking row %s", reminder.channel, reminder.row_number)
+        return False
+
+    async def run_due(self, now: Optional[float] = None) -> int:
+        """
+        Gửi các lần nhắc đã tới hạn (đồng thời - email được outbox gom batch)
+
+        Returns:
+            int: Số lần nhắc gửi thành công
+        """
+        reminders = self.pop_due(now)
+        if not reminders:
+            return 0
+        results = await asyncio.gather(*(self._deliver(reminder) for reminder in reminders))
+        self.save()
+        return sum(results)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            next_due = self.next_due
+            delay = None if next_due is None else next_due - time.time()
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay or MAX_SLEEP, MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self.run_due()
+            except Exception as e:
+                logger.error("Error running due reminders: %s", e)
+
+    # ----- Lưu trữ -----
+
+    def save(self):
+        """Ghi lịch nhắc ra file (ghi file tạm rồi rename để không hỏng file khi bị kill giữa chừng)"""
+        state = {
+            'version': STATE_VERSION,
+            'reminders': [asdict(reminder) for reminder in sorted(self._entries.values(), key=lambda r: r.due)],
+        }
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.error("Failed to save reminder schedule to %s: %s", self.state_path, e)
+
+    def load(self) -> int:
+        """
+        Load lịch nhắc đã lưu (lần nhắc của kênh không còn bật bị bỏ)
+
+        Returns:
+            int: Số lần nhắc đã load
+        """
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.error("Failed to load reminder schedule from %s: %s", self.state_path, e)
+            return 0
+
+        loaded = 0
+        for item in state.get('reminders', []):
+            try:
+                reminder = Reminder(**item)
+            except TypeError as e:
+                logger.warning("Skipping invalid reminder entry %s: %s", item, e)
+                continue
+            if reminder.channel in self.channels:
+                self._push(reminder)
+                loaded += 1
+        logger.info("Loaded %s reminder(s) from %s", loaded, self.state_path)
+        return loaded
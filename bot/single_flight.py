@@ -0,0 +1,92 @@
+"""
+Single-flight theo booking - các action đồng thời trên cùng một dòng booking chỉ chạy một lần,
+những lần click đến sau chờ và nhận chung kết quả
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Flight:
+    """Một action đang chạy (hoặc vừa xong) trên một booking"""
+    owner: str
+    action: str
+    future: asyncio.Future
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+
+
+class SingleFlight:
+    """
+    Registry khóa theo key (số dòng booking), chạy trên event loop của bot.
+
+    - Lần gọi đầu tiên (leader) thực thi action; trong lúc đó mọi lần gọi khác cùng key
+      (kể cả action khác, VD một admin xác nhận và một admin hủy cùng lúc) không chạy lại
+      mà chờ kết quả của leader.
+    - Kết quả được giữ thêm `linger` giây sau khi xong để chặn các click tới trong lúc
+      Discord chưa kịp cập nhật message (buttons chưa bị disable).
+    - Kết quả None (action thất bại) không được giữ lại để admin có thể thử lại ngay.
+    """
+
+    def __init__(self, linger: float = 30.0):
+        self.linger = linger
+        self._flights: Dict[Hashable, Flight] = {}
+
+    def current(self, key: Hashable) -> Optional[Flight]:
+        """Flight đang chạy hoặc vừa xong (còn trong thời gian linger) cho key"""
+        flight = self._flights.get(key)
+        if flight is None:
+            return None
+        if flight.finished is not None and time.monotonic() - flight.finished > self.linger:
+            del self._flights[key]
+            return None
+        return flight
+
+    async def run(
+        self,
+        key: Hashable,
+        action: str,
+        owner: str,
+        func: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """
+        Chạy `func` nếu chưa có flight cho key, ngược lại chờ flight hiện tại
+
+        Args:
+            key: Khóa (số dòng booking)
+            action (str): Tên action (confirmed, cancelled, error)
+            owner (str): Người thực hiện (hiển thị cho người click sau)
+            func: Coroutine factory thực thi action
+
+        Returns:
+            Tuple[Any, bool]: (kết quả, True nếu lần gọi này là leader)
+        """
+        flight = self.current(key)
+        if flight is not None:
+            return await asyncio.shield(flight.future), False
+
+        loop = asyncio.get_running_loop()
+        flight = Flight(owner=owner, action=action, future=loop.create_future())
+        self._flights[key] = flight
+        result = None
+        try:
+            result = await func()
+            return result, True
+        finally:
+            # Không set_exception: follower chỉ cần biết action không thành công
+            flight.future.set_result(result)
+            flight.finished = time.monotonic()
+            if result is None and self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def __len__(self) -> int:
+        return sum(1 for flight in self._flights.values() if flight.finished is None)
+
+
+booking_flights = SingleFlight()
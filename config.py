@@ -9,6 +9,27 @@ class Config:
     DISCORD_BOT_TOKEN = os.getenv('DISCORD_BOT_TOKEN')
     DISCORD_CHANNEL_ID = int(os.getenv('DISCORD_CHANNEL_ID', '0'))
     
+    # Discord Posting Queue (rate limit mỗi channel: 5 message / 5 giây)
+    DISCORD_POST_RATE = int(os.getenv('DISCORD_POST_RATE', '5'))
+    DISCORD_POST_PER = float(os.getenv('DISCORD_POST_PER', '5'))
+    DISCORD_POST_BURST_THRESHOLD = int(os.getenv('DISCORD_POST_BURST_THRESHOLD', '10'))
+    
+    # Digest mode: gom booking không xung đột thành embed tổng hợp định kỳ
+    DIGEST_MODE = os.getenv('DIGEST_MODE', 'false').lower() == 'true'
+    DIGEST_INTERVAL_MINUTES = float(os.getenv('DIGEST_INTERVAL_MINUTES', '15'))
+    
+    # Nhắc lịch cho booking đã xác nhận (mặc định tắt): mốc nhắc (phút trước giờ bắt đầu), kênh email|discord
+    REMINDERS_ENABLED = os.getenv('REMINDERS_ENABLED', 'false').lower() == 'true'
+    REMINDER_OFFSETS_MINUTES = os.getenv('REMINDER_OFFSETS_MINUTES', '1440,60')
+    REMINDER_CHANNELS = os.getenv('REMINDER_CHANNELS', 'email,discord')
+    REMINDER_STATE_PATH = os.getenv('REMINDER_STATE_PATH', 'logs/reminders.json')
+    REMINDER_RETRY_SECONDS = float(os.getenv('REMINDER_RETRY_SECONDS', '300'))
+    
+    # Booking "Chờ xử lý" quá SLA (giờ, 0 = tắt - mặc định): 'flag' = đánh dấu quá hạn, 'cancel' = tự động hủy
+    PENDING_EXPIRY_HOURS = float(os.getenv('PENDING_EXPIRY_HOURS', '0'))
+    PENDING_EXPIRY_ACTION = os.getenv('PENDING_EXPIRY_ACTION', 'flag').lower()
+    PENDING_EXPIRY_BATCH_SECONDS = float(os.getenv('PENDING_EXPIRY_BATCH_SECONDS', '60'))
+    
     # Flask Webhook Configuration
     FLASK_HOST = os.getenv('FLASK_HOST', '0.0.0.0')
     FLASK_PORT = int(os.getenv('FLASK_PORT', '5000'))
@@ -22,6 +43,57 @@ class Config:
     # Google Calendar Configuration
     GOOGLE_CALENDAR_ID = os.getenv('GOOGLE_CALENDAR_ID', 'primary')
     
+    # Room Catalog: file JSON danh mục phòng; 'flag' = cảnh báo, 'reject' = từ chối booking vi phạm
+    ROOM_CATALOG_PATH = os.getenv('ROOM_CATALOG_PATH', 'rooms.json')
+    ROOM_RULES_MODE = os.getenv('ROOM_RULES_MODE', 'flag').lower()
+    
+    # Đối chiếu sheet <-> Calendar định kỳ (phút, 0 = tắt - mặc định, operator tự bật); dry-run chỉ log báo cáo, không sửa calendar
+    CALENDAR_RECONCILE_INTERVAL_MINUTES = float(os.getenv('CALENDAR_RECONCILE_INTERVAL_MINUTES', '0'))
+    CALENDAR_RECONCILE_DRY_RUN = os.getenv('CALENDAR_RECONCILE_DRY_RUN', 'true').lower() == 'true'
+    CALENDAR_RECONCILE_DAYS_BACK = int(os.getenv('CALENDAR_RECONCILE_DAYS_BACK', '1'))
+    CALENDAR_RECONCILE_DAYS_AHEAD = int(os.getenv('CALENDAR_RECONCILE_DAYS_AHEAD', '30'))
+    
+    # Calendar mirror: tra event theo booking trong bộ nhớ, incremental sync (syncToken) khi mirror cũ hơn MAX_AGE giây
+    CALENDAR_MIRROR_MAX_AGE = float(os.getenv('CALENDAR_MIRROR_MAX_AGE', '300'))
+    # Push notification (tùy chọn): URL HTTPS công khai tới /webhook/calendar, token xác thực, TTL channel (giây, 0 = mặc định Google)
+    CALENDAR_PUSH_URL = os.getenv('CALENDAR_PUSH_URL', '')
+    CALENDAR_PUSH_TOKEN = os.getenv('CALENDAR_PUSH_TOKEN', '')
+    CALENDAR_PUSH_TTL = int(os.getenv('CALENDAR_PUSH_TTL', '0'))
+    
+    # Availability Configuration
+    OPENING_HOURS = os.getenv('OPENING_HOURS', '07:00-22:00')
+    AVAILABILITY_TTL = int(os.getenv('AVAILABILITY_TTL', '300'))
+    
+    # Tracing (none | jsonl | otlp)
+    TRACE_EXPORTER = os.getenv('TRACE_EXPORTER', 'none').lower()
+    TRACE_JSONL_PATH = os.getenv('TRACE_JSONL_PATH', 'traces.jsonl')
+    TRACE_OTLP_ENDPOINT = os.getenv('TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+    
+    # Logging: format text|json, rotation size|time, level theo module (VD: google_sheets=WARNING,werkzeug=WARNING)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+    LOG_FILE = os.getenv('LOG_FILE', 'booking_system.log')
+    LOG_ROTATION = os.getenv('LOG_ROTATION', 'size').lower()
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+    LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', 'midnight')
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    LOG_LEVELS = os.getenv('LOG_LEVELS', 'werkzeug=WARNING,googleapiclient.discovery_cache=ERROR')
+    
+    # Profiling (opt-in): sampler thống kê + ghi các lời gọi/bước event loop chậm hơn PROFILING_SLOW_MS
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_SLOW_MS = float(os.getenv('PROFILING_SLOW_MS', '100'))
+    PROFILING_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILING_SAMPLE_INTERVAL_MS', '10'))
+    # Token (header X-Debug-Token) cho /debug/profile; để trống thì chỉ client loopback được truy cập
+    PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+    
+    # Warm-up khi khởi động: thời gian tối đa chờ preload trước khi báo ready (degraded)
+    WARMUP_TIMEOUT = float(os.getenv('WARMUP_TIMEOUT', '30'))
+    
+    # Health probes (/health/ready): chu kỳ probe và ngưỡng (giây)
+    HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', '5'))
+    HEALTH_MAX_LOOP_LAG = float(os.getenv('HEALTH_MAX_LOOP_LAG', '1.0'))
+    HEALTH_MAX_DISCORD_LATENCY = float(os.getenv('HEALTH_MAX_DISCORD_LATENCY', '5.0'))
+    
     # Timezone Configuration
     TIMEZONE = os.getenv('TIMEZONE', 'Asia/Ho_Chi_Minh')
     
@@ -30,16 +102,43 @@ class Config:
     COMPANY_EMAIL = os.getenv('COMPANY_EMAIL', 'contact@company.com')
     COMPANY_PHONE = os.getenv('COMPANY_PHONE', '+84 123 456 789')
     
+    # Locale của template email (thư mục mail/templates/<locale>)
+    EMAIL_LOCALE = os.getenv('EMAIL_LOCALE', 'vi')
+    
     # Apps Script Email Configuration
     APPSCRIPT_WEBHOOK_URL = os.getenv('APPSCRIPT_WEBHOOK_URL', None)
     APPSCRIPT_TIMEOUT = int(os.getenv('APPSCRIPT_TIMEOUT', '30'))
     APPSCRIPT_MAX_RETRIES = int(os.getenv('APPSCRIPT_MAX_RETRIES', '3'))
+    # Batch email: số email tối đa mỗi POST; outbox gom các email gửi đồng thời (linger: chờ thêm để gom)
+    EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', '25'))
+    EMAIL_OUTBOX = os.getenv('EMAIL_OUTBOX', 'true').lower() == 'true'
+    EMAIL_BATCH_LINGER_MS = float(os.getenv('EMAIL_BATCH_LINGER_MS', '0'))
+    
+    # Mail transport: appscript (mặc định), smtp hoặc file; EMAIL_FALLBACK_PROVIDER dùng khi transport chính lỗi
+    EMAIL_PROVIDER = os.getenv('EMAIL_PROVIDER', 'appscript').lower()
+    EMAIL_FALLBACK_PROVIDER = os.getenv('EMAIL_FALLBACK_PROVIDER', '').lower()
+    SMTP_HOST = os.getenv('SMTP_HOST', 'localhost')
+    SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+    SMTP_USERNAME = os.getenv('SMTP_USERNAME', '')
+    SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', '')
+    SMTP_USE_TLS = os.getenv('SMTP_USE_TLS', 'true').lower() == 'true'
+    SMTP_USE_SSL = os.getenv('SMTP_USE_SSL', 'false').lower() == 'true'
+    SMTP_FROM = os.getenv('SMTP_FROM', '')
+    SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '2'))
+    # File transport: thư mục Maildir hoặc file .jsonl
+    EMAIL_FILE_PATH = os.getenv('EMAIL_FILE_PATH', 'logs/mail')
+    EMAIL_FILE_FORMAT = os.getenv('EMAIL_FILE_FORMAT', 'maildir').lower()
     
     # Kho Management Configuration
     KHO_WEB_APP_URL = os.getenv('KHO_WEB_APP_URL', None)
     KHO_TIMEOUT = int(os.getenv('KHO_TIMEOUT', '30'))
     KHO_MAX_RETRIES = int(os.getenv('KHO_MAX_RETRIES', '3'))
     KHO_CHANNEL_NAME = os.getenv('KHO_CHANNEL_NAME', 'report-kho')
+    # Ledger kho local (SQLite); để trống = gửi thẳng Apps Script như cũ, người dùng tự nhập tổng/còn lại
+    KHO_LEDGER_PATH = os.getenv('KHO_LEDGER_PATH', 'logs/kho_ledger.db')
+    KHO_SYNC_MAX_ATTEMPTS = int(os.getenv('KHO_SYNC_MAX_ATTEMPTS', '10'))
+    # Danh mục nguyên liệu cho autocomplete (phút, 0 = chỉ tải khi khởi động)
+    KHO_CATALOG_REFRESH_MINUTES = float(os.getenv('KHO_CATALOG_REFRESH_MINUTES', '30'))
     
     # Disable email entirely if needed
     DISABLE_EMAIL = os.getenv('DISABLE_EMAIL', 'false').lower() == 'true'
@@ -49,9 +148,10 @@ def validate_config():
     required_vars = [
         'DISCORD_BOT_TOKEN',
         'DISCORD_CHANNEL_ID',
-        'GOOGLE_SHEETS_ID',
-        'APPSCRIPT_WEBHOOK_URL'
+        'GOOGLE_SHEETS_ID'
     ]
+    if Config.EMAIL_PROVIDER == 'appscript':
+        required_vars.append('APPSCRIPT_WEBHOOK_URL')
     
     missing_vars = []
     for var in required_vars:
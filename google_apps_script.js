@@ -43,7 +43,8 @@ function sendBookingToWebhook() {
     "endTime": endTime.getHours() + ":" + (endTime.getMinutes() < 10 ? '0' + endTime.getMinutes() : endTime.getMinutes()),
     "notes": notes,
     "email": email,
-    "rowNumber": lastRow
+    "rowNumber": lastRow,
+    "timestamp": formatTimestamp(data[0])
   };
 
   Logger.log("Final payload: " + JSON.stringify(payload));
@@ -59,7 +60,21 @@ function sendBookingToWebhook() {
 
   try {
     var response = UrlFetchApp.fetch(url, options);
-    Logger.log(response.getContentText());
+    var code = response.getResponseCode();
+    Logger.log(code + " " + response.getContentText());
+    
+    if (code === 422) {
+      // Server từ chối booking vi phạm quy định phòng (ROOM_RULES_MODE=reject): không có message
+      // Discord nào để admin xử lý nên đóng booking ngay thay vì để "Chờ xử lý"
+      var issues = [];
+      try {
+        issues = JSON.parse(response.getContentText()).issues || [];
+      } catch (parseError) {
+        Logger.log("Không đọc được lý do từ chối: " + parseError);
+      }
+      setRejectedBookingStatus(lastRow, issues);
+      return;
+    }
     
     // Set trạng thái ban đầu sau khi gửi webhook thành công
     setInitialBookingStatus(lastRow);
@@ -69,6 +84,12 @@ function sendBookingToWebhook() {
   }
 }
 
+// Timestamp tạo booking (cột A) theo timezone của script, cùng format với sheet
+function formatTimestamp(value) {
+  if (!(value instanceof Date)) return value ? String(value) : "";
+  return Utilities.formatDate(value, Session.getScriptTimeZone(), "dd/MM/yyyy HH:mm:ss");
+}
+
 function formatDate(dateValue) {
   if (!dateValue) return "Chưa chọn ngày";
   var date = new Date(dateValue);
@@ -95,3 +116,23 @@ function setInitialBookingStatus(rowNumber) {
     Logger.log("Error setting initial status: " + error);
   }
 }
+
+// Booking bị server từ chối: trạng thái "Hủy" (cột K), lý do ghi vào cột L
+function setRejectedBookingStatus(rowNumber, issues) {
+  try {
+    var sheet = SpreadsheetApp.getActiveSpreadsheet().getSheetByName("Form1");
+    if (!sheet) {
+      Logger.log("Sheet không tồn tại");
+      return;
+    }
+    
+    var timestamp = Utilities.formatDate(new Date(), Session.getScriptTimeZone(), "yyyy-MM-dd HH:mm:ss");
+    var reason = issues.length ? issues.join("; ") : "vi phạm quy định phòng";
+    sheet.getRange(rowNumber, 11).setValue("Hủy");
+    sheet.getRange(rowNumber, 12).setValue(timestamp + " Từ chối tự động: " + reason);
+    Logger.log("Booking row " + rowNumber + " rejected: " + reason);
+    
+  } catch (error) {
+    Logger.log("Error setting rejected status: " + error);
+  }
+}
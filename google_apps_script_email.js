@@ -3,80 +3,142 @@
  * Deploy script này dưới dạng Web App với quyền "Execute as: Me" và "Who has access: Anyone"
  */
 
+// Thời gian giữ id của message đã gửi (giây) - Python retry cùng batch sẽ không gửi trùng
+const SENT_ID_TTL_SECONDS = 6 * 60 * 60;
+
 /**
  * Hàm chính xử lý POST requests từ Python server
+ *
+ * Hai dạng request:
+ *   - Một email:  { to, subject, body, htmlBody?, senderName? }
+ *   - Batch:      { messages: [{ id, to, subject, body, htmlBody?, senderName? }, ...] }
+ *                 -> { success: true, results: [{ id, success, error?, duplicate? }], sent, failed }
  */
 function doPost(e) {
   try {
     // Parse request body
     const requestBody = JSON.parse(e.postData.contents);
     
+    if (Array.isArray(requestBody.messages)) {
+      return jsonResponse_(sendBatch_(requestBody.messages));
+    }
+    
     // Log request để debug
     console.log('Received email request:', requestBody);
     
     // Validate required fields
     if (!requestBody.to || !requestBody.subject || !requestBody.body) {
-      return ContentService
-        .createTextOutput(JSON.stringify({
-          success: false,
-          error: 'Missing required fields: to, subject, body'
-        }))
-        .setMimeType(ContentService.MimeType.JSON);
+      return jsonResponse_({
+        success: false,
+        error: 'Missing required fields: to, subject, body'
+      });
     }
     
     // Check if this is a test request
     if (requestBody.test === true) {
       console.log('Test request received, not sending actual email');
-      return ContentService
-        .createTextOutput(JSON.stringify({
-          success: true,
-          message: 'Test request successful - Apps Script is working'
-        }))
-        .setMimeType(ContentService.MimeType.JSON);
-    }
-    
-    // Extract email parameters
-    const to = requestBody.to;
-    const subject = requestBody.subject;
-    const body = requestBody.body;
-    const htmlBody = requestBody.htmlBody || null;
-    const senderName = requestBody.senderName || 'Discord Booking System';
-    
-    // Send email using MailApp
-    const emailOptions = {
-      name: senderName
-    };
-    
-    if (htmlBody) {
-      emailOptions.htmlBody = htmlBody;
+      return jsonResponse_({
+        success: true,
+        message: 'Test request successful - Apps Script is working'
+      });
     }
     
-    // Send the email
-    MailApp.sendEmail(to, subject, body, emailOptions);
+    sendOne_(requestBody);
     
-    console.log(`Email sent successfully to ${to}`);
+    console.log(`Email sent successfully to ${requestBody.to}`);
     
     // Return success response
-    return ContentService
-      .createTextOutput(JSON.stringify({
-        success: true,
-        message: `Email sent successfully to ${to}`,
-        timestamp: new Date().toISOString()
-      }))
-      .setMimeType(ContentService.MimeType.JSON);
+    return jsonResponse_({
+      success: true,
+      message: `Email sent successfully to ${requestBody.to}`,
+      timestamp: new Date().toISOString()
+    });
       
   } catch (error) {
     console.error('Error sending email:', error);
     
     // Return error response
-    return ContentService
-      .createTextOutput(JSON.stringify({
-        success: false,
-        error: error.toString(),
-        timestamp: new Date().toISOString()
-      }))
-      .setMimeType(ContentService.MimeType.JSON);
+    return jsonResponse_({
+      success: false,
+      error: error.toString(),
+      timestamp: new Date().toISOString()
+    });
+  }
+}
+
+/**
+ * Gửi một email bằng MailApp
+ */
+function sendOne_(message) {
+  const emailOptions = {
+    name: message.senderName || 'Discord Booking System'
+  };
+  
+  if (message.htmlBody) {
+    emailOptions.htmlBody = message.htmlBody;
   }
+  
+  MailApp.sendEmail(message.to, message.subject, message.body, emailOptions);
+}
+
+/**
+ * Gửi nhiều email trong một request, trả kết quả theo từng message (cùng thứ tự).
+ * Message có id đã gửi gần đây (retry từ Python) được bỏ qua và báo duplicate.
+ */
+function sendBatch_(messages) {
+  const cache = CacheService.getScriptCache();
+  let quota = MailApp.getRemainingDailyQuota();
+  const results = [];
+  let sent = 0;
+  let failed = 0;
+  
+  messages.forEach(function (message) {
+    const result = { id: message.id || null, success: false };
+    try {
+      if (!message.to || !message.subject || !message.body) {
+        result.error = 'Missing required fields: to, subject, body';
+      } else if (message.id && cache.get('sent:' + message.id)) {
+        result.success = true;
+        result.duplicate = true;
+      } else if (quota <= 0) {
+        result.error = 'Daily email quota exceeded';
+      } else {
+        sendOne_(message);
+        quota -= 1;
+        result.success = true;
+        if (message.id) {
+          cache.put('sent:' + message.id, '1', SENT_ID_TTL_SECONDS);
+        }
+      }
+    } catch (error) {
+      result.error = error.toString();
+    }
+    if (result.success) {
+      sent += 1;
+    } else {
+      failed += 1;
+    }
+    results.push(result);
+  });
+  
+  console.log(`Batch of ${messages.length} emails: ${sent} sent, ${failed} failed`);
+  
+  return {
+    success: true,
+    results: results,
+    sent: sent,
+    failed: failed,
+    timestamp: new Date().toISOString()
+  };
+}
+
+/**
+ * JSON response
+ */
+function jsonResponse_(body) {
+  return ContentService
+    .createTextOutput(JSON.stringify(body))
+    .setMimeType(ContentService.MimeType.JSON);
 }
 
 /**
@@ -0,0 +1,193 @@
+"""
+Availability Index - tính khung giờ trống của từng phòng từ các booking đang giữ chỗ
+"""
+
+import bisect
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from models.booking import Booking, parse_time_to_minutes
+from models.rooms import RoomCatalog, get_room_catalog
+
+logger = logging.getLogger(__name__)
+
+# Các trạng thái đang giữ chỗ (giống check_room_conflicts). Dòng mới chưa có trạng thái
+# cũng được tính vì Apps Script chỉ ghi "Chờ xử lý" sau khi gửi webhook.
+HOLDING_STATUSES = ('Chờ xử lý', 'Đã xác nhận', '')
+
+Interval = Tuple[int, int, int]  # (start_minutes, end_minutes, row_number)
+
+
+def format_minutes(minutes: int) -> str:
+    """Minutes since midnight -> HH:MM (24:00 cho cuối ngày)"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class AvailabilityIndex:
+    """
+    Index các booking giữ chỗ theo ngày -> phòng -> danh sách interval đã sort.
+
+    Kết quả free slots được cache theo (date, room) và chỉ bị invalidate khi
+    booking của (date, room) đó thay đổi (booking mới, đổi trạng thái) hoặc khi
+    snapshot sheet được load lại.
+    """
+
+    def __init__(self, catalog: Optional[RoomCatalog] = None, ttl: Optional[float] = None):
+        self.catalog = catalog or get_room_catalog()
+        self.ttl = ttl if ttl is not None else Config.AVAILABILITY_TTL
+        self._lock = threading.RLock()
+        self._by_date: Dict[str, Dict[str, List[Interval]]] = {}
+        self._row_keys: Dict[int, Tuple[str, str]] = {}
+        self._room_names: Dict[str, str] = {}
+        self._cache: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or (time.monotonic() - self.loaded_at) > self.ttl
+
+    def load(self, rows: List[list]):
+        """
+        Build lại index từ dữ liệu sheet (bao gồm header)
+
+        Cấu trúc sheet: [Timestamp, Name, Phone, CustomerCount, Room, Date, StartTime, EndTime, Notes, Email, Status, ProcessedTime]
+        """
+        by_date: Dict[str, Dict[str, List[Interval]]] = {}
+        row_keys: Dict[int, Tuple[str, str]] = {}
+        room_names: Dict[str, str] = {}
+
+        for row_number, row in enumerate(rows[1:], start=2):
+            if len(row) < 8:
+                continue
+            status = str(row[10]).strip() if len(row) > 10 else ''
+            room = str(row[4]).strip()
+            if room:
+                room_names.setdefault(self.catalog.key_for(room), self.catalog.display_name(room))
+            if status not in HOLDING_STATUSES:
+                continue
+
+            booking = Booking.from_sheet_row(row, row_number)
+            if not booking.has_valid_times or not booking.date:
+                continue
+
+            key = self.catalog.key_for(booking.room)
+            by_date.setdefault(booking.date, {}).setdefault(key, []).append(
+                (booking.start_minutes, booking.end_minutes, row_number)
+            )
+            row_keys[row_number] = (booking.date, key)
+
+        for rooms in by_date.values():
+            for intervals in rooms.values():
+                intervals.sort()
+
+        with self._lock:
+            self._by_date = by_date
+            self._row_keys = row_keys
+            self._room_names = room_names
+            self._cache.clear()
+            self.loaded_at = time.monotonic()
+
+        logger.info("Availability index loaded: %s holding bookings over %s days", len(row_keys), len(by_date))
+
+    def add(self, booking: Booking):
+        """Thêm booking mới (đang chờ xử lý) vào index"""
+        if not booking.has_valid_times or not booking.date:
+            return
+        key = self.catalog.key_for(booking.room)
+        with self._lock:
+            if booking.row_number:
+                self._remove_row_locked(booking.row_number)
+                self._row_keys[booking.row_number] = (booking.date, key)
+            intervals = self._by_date.setdefault(booking.date, {}).setdefault(key, [])
+            bisect.insort(intervals, (booking.start_minutes, booking.end_minutes, booking.row_number))
+            self._room_names.setdefault(key, self.catalog.display_name(booking.room))
+            self._cache.pop((booking.date, key), None)
+
+    def update_status(self, row_number: int, status_text: str):
+        """
+        Cập nhật index khi trạng thái booking thay đổi - booking không còn giữ chỗ sẽ bị gỡ ra
+        """
+        if status_text in HOLDING_STATUSES:
+            return
+        with self._lock:
+            self._remove_row_locked(row_number)
+
+    def _remove_row_locked(self, row_number: int):
+        location = self._row_keys.pop(row_number, None)
+        if not location:
+            return
+        date, key = location
+        intervals = self._by_date.get(date, {}).get(key, [])
+        self._by_date.get(date, {})[key] = [i for i in intervals if i[2] != row_number]
+        self._cache.pop(location, None)
+
+    def rooms(self) -> List[str]:
+        """Danh sách tên phòng đã biết (catalog + các phòng xuất hiện trong sheet)"""
+        with self._lock:
+            names = dict(self._room_names)
+        for room in self.catalog.rooms.values():
+            names.setdefault(room.id, room.name)
+        return sorted(names.values())
+
+    def free_slots(self, date: str, room: str) -> List[Tuple[int, int]]:
+        """
+        Tính các khung giờ trống của một phòng trong ngày (trong giờ mở cửa)
+
+        Args:
+            date (str): Ngày (dd/mm/yyyy)
+            room (str): Tên phòng
+
+        Returns:
+            list: Danh sách (start_minutes, end_minutes)
+        """
+        key = self.catalog.key_for(room)
+        open_minutes, close_minutes = self.catalog.hours_for(room)
+        with self._lock:
+            cached = self._cache.get((date, key))
+            if cached is not None:
+                return cached
+
+            slots = []
+            cursor = open_minutes
+            for start, end, _ in self._by_date.get(date, {}).get(key, []):
+                if end <= start:
+                    end = close_minutes  # Booking qua đêm chiếm tới cuối ngày
+                if start > cursor:
+                    slots.append((cursor, min(start, close_minutes)))
+                cursor = max(cursor, end)
+                if cursor >= close_minutes:
+                    break
+            if cursor < close_minutes:
+                slots.append((cursor, close_minutes))
+
+            slots = [(s, e) for s, e in slots if e > s]
+            self._cache[(date, key)] = slots
+            return slots
+
+    def availability(self, date: str, room: Optional[str] = None, at: Optional[str] = None) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Khung giờ trống theo phòng
+
+        Args:
+            date (str): Ngày (dd/mm/yyyy)
+            room (str, optional): Chỉ tính cho phòng này
+            at (str, optional): Chỉ trả về các phòng còn trống tại giờ HH:MM
+
+        Returns:
+            dict: {room_name: [(HH:MM, HH:MM), ...]}
+        """
+        rooms = [room] if room else self.rooms()
+        at_minutes = parse_time_to_minutes(at) if at else -1
+
+        result = {}
+        for name in rooms:
+            slots = self.free_slots(date, name)
+            if at_minutes >= 0 and not any(s <= at_minutes < e for s, e in slots):
+                continue
+            result[self.catalog.display_name(name)] = [
+                (format_minutes(s), format_minutes(e)) for s, e in slots
+            ]
+        return result
@@ -0,0 +1,279 @@
+"""
+Calendar Mirror - bản sao local các event của calendar booking, đồng bộ bằng syncToken
+(lần đầu list toàn bộ, các lần sau chỉ lấy event đã thay đổi), có index theo booking
+để tìm event không cần gọi Calendar API
+"""
+
+import logging
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import pytz
+
+from config import Config
+from monitoring.metrics import timed
+from monitoring.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Private extended properties của event Calendar trỏ về booking trên sheet
+BOOKING_ROW_PROPERTY = 'bookingRow'
+BOOKING_EMAIL_PROPERTY = 'bookingEmail'
+
+
+def event_start(event: dict) -> Optional[datetime]:
+    """Thời điểm bắt đầu của event (aware datetime), None nếu không có/không parse được"""
+    start = event.get('start') or {}
+    value = start.get('dateTime') or start.get('date')
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        # Event cả ngày ('date') - tính theo timezone cấu hình
+        parsed = pytz.timezone(Config.TIMEZONE).localize(parsed)
+    return parsed
+
+
+def event_booking_ref(event: dict) -> Tuple[Optional[int], str]:
+    """(row_number, email) từ extendedProperties; (None, '') với event cũ/không phải booking"""
+    private = (event.get('extendedProperties') or {}).get('private') or {}
+    try:
+        row_number = int(private.get(BOOKING_ROW_PROPERTY, ''))
+    except ValueError:
+        return None, ''
+    return row_number, str(private.get(BOOKING_EMAIL_PROPERTY, '')).lower()
+
+
+def _is_gone(error: Exception) -> bool:
+    """HttpError 410: syncToken hết hạn, phải full sync lại"""
+    resp = getattr(error, 'resp', None)
+    return getattr(resp, 'status', None) == 410
+
+
+class CalendarMirror:
+    """
+    Mirror các event của một calendar trong bộ nhớ.
+
+    Calendar API không cho dùng syncToken cùng timeMin/timeMax, nên lần đồng bộ đầu list toàn
+    bộ calendar (phân trang) để lấy nextSyncToken; lọc theo khoảng thời gian được làm trong bộ nhớ.
+
+    Index theo dòng sheet (extendedProperties) và theo ngày (event cũ) giúp tìm event của một
+    booking bằng tra dict. Mirror được coi là cũ sau `max_age` giây hoặc khi nhận push
+    notification (invalidate); khi đó lần tra cứu kế tiếp chỉ gọi một incremental sync.
+    """
+
+    def __init__(self, manager, calendar_id: Optional[str] = None, page_size: int = 2500,
+                 max_age: Optional[float] = None):
+        """
+        Args:
+            manager (GoogleSheetsManager): Cung cấp calendar_service
+            calendar_id (str): Calendar cần mirror, mặc định Config.GOOGLE_CALENDAR_ID
+            page_size (int): maxResults mỗi trang (tối đa 2500)
+            max_age (float): Số giây mirror được dùng mà không sync lại, mặc định Config.CALENDAR_MIRROR_MAX_AGE
+        """
+        self.manager = manager
+        self.calendar_id = calendar_id or Config.GOOGLE_CALENDAR_ID
+        self.page_size = page_size
+        self.max_age = Config.CALENDAR_MIRROR_MAX_AGE if max_age is None else max_age
+        self.timezone = pytz.timezone(Config.TIMEZONE)
+        self.events: Dict[str, dict] = {}
+        self.sync_token: Optional[str] = None
+        self.synced_at: Optional[float] = None
+        self.channel: Optional[dict] = None
+        self._stale = False
+        self._by_row: Dict[int, Set[str]] = {}
+        self._by_date: Dict[date, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def is_fresh(self) -> bool:
+        return (self.synced_at is not None and not self._stale
+                and time.time() - self.synced_at < self.max_age)
+
+    @timed('calendar', 'list')
+    @traced('calendar.sync_page')
+    def _list_page(self, **params) -> dict:
+        return self.manager.calendar_service.events().list(calendarId=self.calendar_id, **params).execute()
+
+    def _list_all(self, **params) -> Tuple[List[dict], Optional[str]]:
+        items: List[dict] = []
+        page_token = None
+        while True:
+            result = self._list_page(maxResults=self.page_size, pageToken=page_token, **params)
+            items.extend(result.get('items', []))
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return items, result.get('nextSyncToken')
+
+    def sync(self) -> Tuple[str, int]:
+        """
+        Đồng bộ mirror với Calendar (thread-safe, blocking - gọi qua asyncio.to_thread trong bot)
+
+        Returns:
+            tuple: ('full' | 'incremental', số event đã thay đổi)
+        """
+        with self._lock:
+            # Đánh dấu trước khi gọi API: notification đến trong lúc sync sẽ làm mirror cũ lại
+            self._stale = False
+            if self.sync_token:
+                try:
+                    items, token = self._list_all(syncToken=self.sync_token)
+                except Exception as e:
+                    if not _is_gone(e):
+                        self._stale = True
+                        raise
+                    logger.info("Calendar sync token expired - running full sync")
+                else:
+                    for event in items:
+                        self._apply(event)
+                    self.sync_token = token or self.sync_token
+                    self.synced_at = time.time()
+                    logger.debug("Calendar incremental sync: %s change(s)", len(items))
+                    return 'incremental', len(items)
+
+            try:
+                items, token = self._list_all(showDeleted=False)
+            except Exception:
+                self._stale = True
+                raise
+            self.events = {}
+            self._by_row = {}
+            self._by_date = {}
+            for event in items:
+                self._apply(event)
+            self.sync_token = token
+            self.synced_at = time.time()
+            logger.info("Calendar full sync: %s event(s)", len(self.events))
+            return 'full', len(items)
+
+    def ensure_fresh(self) -> bool:
+        """
+        Sync nếu mirror đã cũ (quá max_age hoặc đã nhận push notification)
+
+        Returns:
+            bool: True nếu vừa gọi Calendar API
+        """
+        if self.is_fresh:
+            return False
+        self.sync()
+        return True
+
+    def invalidate(self):
+        """Đánh dấu mirror cũ (push notification từ Calendar); lần tra cứu sau sẽ incremental sync"""
+        self._stale = True
+
+    def _start_date(self, event: dict) -> Optional[date]:
+        start = event_start(event)
+        return start.astimezone(self.timezone).date() if start else None
+
+    def _unindex(self, event: dict):
+        event_id = event.get('id')
+        row_number, _ = event_booking_ref(event)
+        for index, key in ((self._by_row, row_number), (self._by_date, self._start_date(event))):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(event_id)
+                if not ids:
+                    del index[key]
+
+    def _apply(self, event: dict):
+        event_id = event.get('id')
+        if not event_id:
+            return
+        previous = self.events.pop(event_id, None)
+        if previous is not None:
+            self._unindex(previous)
+        if event.get('status') == 'cancelled':
+            return
+        self.events[event_id] = event
+        row_number, _ = event_booking_ref(event)
+        if row_number is not None:
+            self._by_row.setdefault(row_number, set()).add(event_id)
+        start_date = self._start_date(event)
+        if start_date is not None:
+            self._by_date.setdefault(start_date, set()).add(event_id)
+
+    def record(self, event: dict):
+        """Ghi nhận event vừa tạo/xóa bởi chính bot (trước lần sync kế tiếp)"""
+        with self._lock:
+            self._apply(event)
+
+    def events_between(self, start: datetime, end: datetime) -> List[dict]:
+        """Các event bắt đầu trong [start, end)"""
+        with self._lock:
+            events = list(self.events.values())
+        result = []
+        for event in events:
+            begin = event_start(event)
+            if begin is not None and start <= begin < end:
+                result.append(event)
+        return result
+
+    def find_booking_event(self, booking) -> Optional[dict]:
+        """
+        Tìm event của booking trong mirror (không gọi API)
+
+        Event mới khớp theo dòng sheet + email + ngày; event tạo trước khi có extendedProperties
+        khớp khi có ít nhất 2 trong 3: tên (summary), email, phòng (description).
+
+        Args:
+            booking (Booking): Booking đã chuẩn hóa
+
+        Returns:
+            dict: Event, None nếu không tìm thấy
+        """
+        if booking.booking_date is None:
+            return None
+        email = booking.email.lower()
+        with self._lock:
+            for event_id in sorted(self._by_row.get(booking.row_number, ())):
+                event = self.events[event_id]
+                if event_booking_ref(event)[1] in ('', email) and self._start_date(event) == booking.booking_date:
+                    return event
+
+            name, room = booking.name.lower(), booking.room.lower()
+            for event_id in sorted(self._by_date.get(booking.booking_date, ())):
+                event = self.events[event_id]
+                if event_booking_ref(event)[0] is not None:
+                    continue
+                summary = event.get('summary', '').lower()
+                description = event.get('description', '').lower()
+                matches = sum([
+                    bool(name and name in summary),
+                    bool(email and email in description),
+                    bool(room and room in description),
+                ])
+                if matches >= 2:
+                    return event
+        return None
+
+    @timed('calendar', 'watch')
+    def watch(self, address: str, token: str = '', ttl: Optional[int] = None) -> dict:
+        """
+        Đăng ký push notification (events.watch) về `address` - Calendar gửi POST mỗi khi có thay đổi,
+        webhook gọi invalidate() thay vì phải chờ hết max_age
+
+        Args:
+            address (str): URL HTTPS nhận notification (VD: https://.../webhook/calendar)
+            token (str): Chuỗi gửi kèm header X-Goog-Channel-Token để xác thực
+            ttl (int): Thời gian sống của channel (giây), None = mặc định của Google
+
+        Returns:
+            dict: Channel (id, resourceId, expiration)
+        """
+        body = {'id': str(uuid.uuid4()), 'type': 'web_hook', 'address': address}
+        if token:
+            body['token'] = token
+        if ttl:
+            body['params'] = {'ttl': str(int(ttl))}
+        self.channel = self.manager.calendar_service.events().watch(
+            calendarId=self.calendar_id, body=body
+        ).execute()
+        logger.info("Calendar push channel registered: %s (expires %s)", self.channel.get('id'), self.channel.get('expiration'))
+        return self.channel
@@ -1,31 +1,101 @@
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import logging
+import threading
+import time
 from config import Config
 from datetime import datetime, timedelta
 import pytz
+from models.booking import Booking, parse_time_to_minutes
+from models.rooms import get_room_catalog
+from monitoring.metrics import timed, is_falsy, SHEET_ROWS
+from monitoring.tracing import traced
+from monitoring.startup import startup
+from .availability import AvailabilityIndex
+from .calendar_mirror import BOOKING_EMAIL_PROPERTY, BOOKING_ROW_PROPERTY, CalendarMirror
 
 logger = logging.getLogger(__name__)
 
+# Trạng thái booking -> text trong cột K
+STATUS_TEXT = {
+    'pending': 'Chờ xử lý',
+    'confirmed': 'Đã xác nhận',  # Sửa để match với logic conflict
+    'cancelled': 'Hủy',
+    'error': 'Lịch Lỗi'
+}
+
 class GoogleSheetsManager:
     """
     Class quản lý kết nối và thao tác với Google Sheets
     """
     
     def __init__(self):
-        self.service = None
-        self.calendar_service = None
+        self._service = None
+        self._calendar_service = None
+        self._build_lock = threading.Lock()
         self.spreadsheet_id = Config.GOOGLE_SHEETS_ID
         self.sheet_name = Config.SHEET_NAME
         self.timezone = pytz.timezone(Config.TIMEZONE)
-        self._setup_service()
+        self.availability = AvailabilityIndex()
+        self.calendar_mirror = CalendarMirror(self)
+        self.upcoming_events = []
+    
+    @property
+    def service(self):
+        """Sheets client - được build ở lần dùng đầu tiên (hoặc sẵn từ start_background_build)"""
+        if self._service is None:
+            self._ensure_services()
+        return self._service
+    
+    @service.setter
+    def service(self, value):
+        self._service = value
+    
+    @property
+    def calendar_service(self):
+        if self._calendar_service is None:
+            self._ensure_services()
+        return self._calendar_service
+    
+    @calendar_service.setter
+    def calendar_service(self, value):
+        self._calendar_service = value
+    
+    @property
+    def services_ready(self) -> bool:
+        return self._service is not None and self._calendar_service is not None
+    
+    def start_background_build(self) -> threading.Thread:
+        """
+        Build Google clients trên thread nền để không chặn khởi động (webhook/gateway lên trước)
+        """
+        def run():
+            try:
+                self._ensure_services()
+            except Exception:
+                pass  # Đã log trong _setup_service; lần dùng sau sẽ thử build lại
+        
+        thread = threading.Thread(target=run, name='GoogleClientBuild', daemon=True)
+        thread.start()
+        return thread
+    
+    def _ensure_services(self):
+        with self._build_lock:
+            if self._service is None or self._calendar_service is None:
+                started = time.perf_counter()
+                self._setup_service()
+                startup.record('google_clients', time.perf_counter() - started)
     
     def _setup_service(self):
         """
         Thiết lập kết nối với Google Sheets API và Calendar API
+        
+        Import googleapiclient.discovery được hoãn tới đây và dùng discovery document
+        đóng gói sẵn trong thư viện (static_discovery) nên không cần gọi mạng để lấy schema.
         """
         try:
+            from google.oauth2.service_account import Credentials
+            from googleapiclient.discovery import build
+            
             # Đọc credentials từ file JSON
             scopes = [
                 'https://www.googleapis.com/auth/spreadsheets',
@@ -36,14 +106,16 @@ class GoogleSheetsManager:
             )
             
             # Tạo service objects
-            self.service = build('sheets', 'v4', credentials=creds)
-            self.calendar_service = build('calendar', 'v3', credentials=creds)
+            self._service = build('sheets', 'v4', credentials=creds, static_discovery=True, cache_discovery=False)
+            self._calendar_service = build('calendar', 'v3', credentials=creds, static_discovery=True, cache_discovery=False)
             logger.info("Google Sheets and Calendar services initialized successfully")
             
         except Exception as e:
-            logger.error(f"Failed to initialize Google services: {e}")
+            logger.error("Failed to initialize Google services: %s", e)
             raise
     
+    @timed('sheets', 'get', failure=is_falsy)
+    @traced('sheets.get')
     def get_sheet_data(self, range_name=None):
         """
         Lấy dữ liệu từ Google Sheet
@@ -64,13 +136,16 @@ class GoogleSheetsManager:
             ).execute()
             
             values = result.get('values', [])
-            logger.info(f"Retrieved {len(values)} rows from sheet")
+            SHEET_ROWS.observe(len(values))
+            logger.debug("Retrieved %s rows from sheet", len(values))
             return values
             
         except HttpError as e:
-            logger.error(f"Error getting sheet data: {e}")
+            logger.error("Error getting sheet data: %s", e)
             return []
     
+    @timed('sheets', 'update', failure=is_falsy)
+    @traced('sheets.update')
     def update_booking_status(self, row_number, status, admin_name=None):
         """
         Cập nhật trạng thái booking trong Google Sheet
@@ -84,29 +159,21 @@ class GoogleSheetsManager:
             bool: True nếu cập nhật thành công
         """
         try:
-            logger.info(f"Updating booking status: row={row_number}, status={status}, admin={admin_name}")
+            logger.debug("Updating booking status: row=%s, status=%s, admin=%s", row_number, status, admin_name)
             
             # Validate input
             if not row_number or row_number < 2:
-                logger.error(f"Invalid row number: {row_number}")
+                logger.error("Invalid row number: %s", row_number)
                 return False
             
             # Lấy thời gian hiện tại
             now = datetime.now(self.timezone)
             timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
             
-            # Mapping trạng thái
-            status_mapping = {
-                'pending': 'Chờ xử lý',
-                'confirmed': 'Đã xác nhận',  # Sửa để match với logic conflict
-                'cancelled': 'Hủy',
-                'error': 'Lịch Lỗi'
-            }
-            
-            status_text = status_mapping.get(status, status)
+            status_text = STATUS_TEXT.get(status, status)
             admin_info = f"by {admin_name}" if admin_name else ""
             
-            logger.info(f"Mapped status '{status}' to '{status_text}'")
+            logger.debug("Mapped status '%s' to '%s'", status, status_text)
             
             # Cập nhật cột trạng thái (cột K) và thời gian xử lý (cột L)
             updates = [
@@ -131,12 +198,85 @@ class GoogleSheetsManager:
                 body=body
             ).execute()
             
-            logger.info(f"Updated booking status for row {row_number}: {status_text}")
+            logger.info("Updated booking status for row %s: %s", row_number, status_text)
+            
+            # Booking không còn giữ chỗ -> invalidate cache khung giờ trống
+            self.availability.update_status(row_number, status_text)
             return True
             
         except HttpError as e:
-            logger.error(f"Error updating booking status: {e}")
+            logger.error("Error updating booking status: %s", e)
+            return False
+    
+    @timed('sheets', 'update_many', failure=is_falsy)
+    @traced('sheets.update_many')
+    def update_booking_statuses(self, row_numbers, status, admin_name=None):
+        """
+        Cập nhật trạng thái cho nhiều booking trong một request batchUpdate
+        
+        Args:
+            row_numbers (list): Các dòng cần cập nhật
+            status (str): Trạng thái mới ('confirmed', 'cancelled', 'error', 'pending')
+            admin_name (str): Tên admin (hoặc tác vụ tự động) thực hiện
+        
+        Returns:
+            bool: True nếu cập nhật thành công
+        """
+        row_numbers = [row for row in row_numbers if row and row >= 2]
+        if not row_numbers:
+            return False
+        
+        timestamp = datetime.now(self.timezone).strftime("%Y-%m-%d %H:%M:%S")
+        status_text = STATUS_TEXT.get(status, status)
+        processed = f"{timestamp} by {admin_name}" if admin_name else timestamp
+        updates = []
+        for row_number in row_numbers:
+            updates.append({'range': f"{self.sheet_name}!K{row_number}", 'values': [[status_text]]})
+            updates.append({'range': f"{self.sheet_name}!L{row_number}", 'values': [[processed]]})
+        
+        try:
+            self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'valueInputOption': 'RAW', 'data': updates}
+            ).execute()
+        except HttpError as e:
+            logger.error("Error updating %s booking statuses: %s", len(row_numbers), e)
             return False
+        
+        for row_number in row_numbers:
+            self.availability.update_status(row_number, status_text)
+        logger.info("Updated %s booking(s) to %s: rows %s", len(row_numbers), status_text, row_numbers)
+        return True
+    
+    @timed('sheets', 'annotate', failure=is_falsy)
+    @traced('sheets.annotate')
+    def annotate_bookings(self, row_numbers, note):
+        """
+        Ghi chú vào cột ProcessedTime (cột L) của nhiều booking mà không đổi trạng thái
+        
+        Args:
+            row_numbers (list): Các dòng cần ghi chú
+            note (str): Nội dung ghi chú
+        
+        Returns:
+            bool: True nếu cập nhật thành công
+        """
+        row_numbers = [row for row in row_numbers if row and row >= 2]
+        if not row_numbers:
+            return False
+        
+        timestamp = datetime.now(self.timezone).strftime("%Y-%m-%d %H:%M:%S")
+        updates = [{'range': f"{self.sheet_name}!L{row_number}", 'values': [[f"{timestamp} {note}"]]}
+                   for row_number in row_numbers]
+        try:
+            self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'valueInputOption': 'RAW', 'data': updates}
+            ).execute()
+        except HttpError as e:
+            logger.error("Error annotating %s bookings: %s", len(row_numbers), e)
+            return False
+        return True
     
     def find_booking_by_data(self, email, date, time):
         """
@@ -181,14 +321,18 @@ class GoogleSheetsManager:
             return None
             
         except Exception as e:
-            logger.error(f"Error finding booking: {e}")
+            logger.error("Error finding booking: %s", e)
             return None
     
-    def check_room_conflicts(self, date, start_time, end_time, room, exclude_row=None, limit_rows=30):
+    def check_room_conflicts(self, date, start_time, end_time, room, exclude_row=None, limit_rows=30, customer_count=None):
         """
         Kiểm tra xung đột lịch phòng với thời gian bắt đầu và kết thúc
         Chỉ check với các booking có trạng thái "Chờ xử lý" hoặc "Đã xác nhận"
         
+        Phòng được so khớp theo room catalog (ID chuẩn/alias). Với phòng dùng chung
+        (shared), các booking trùng giờ chỉ bị tính là xung đột khi tổng số khách
+        vượt sức chứa.
+        
         Args:
             date (str): Ngày booking (format: dd/mm/yyyy)
             start_time (str): Giờ bắt đầu (format: HH:MM)  
@@ -196,6 +340,7 @@ class GoogleSheetsManager:
             room (str): Phòng booking
             exclude_row (int): Dòng cần loại trừ khỏi kiểm tra
             limit_rows (int): Số hàng mới nhất cần check (default: 15)
+            customer_count (int): Số khách của booking mới (dùng cho phòng shared)
         
         Returns:
             list: Danh sách booking xung đột với thông tin chi tiết
@@ -207,44 +352,27 @@ class GoogleSheetsManager:
             if not data or len(data) < 2:
                 return conflicts
             
-            # Parse thời gian input
-            def parse_time_to_minutes(time_str):
-                """Convert HH:MM or HH:MM:SS to minutes since midnight"""
-                try:
-                    time_str = str(time_str).strip()
-                    # Handle HH:MM:SS format
-                    if time_str.count(':') == 2:
-                        time_parts = time_str.split(':')
-                        hours, minutes = int(time_parts[0]), int(time_parts[1])
-                    # Handle HH:MM format  
-                    elif time_str.count(':') == 1:
-                        hours, minutes = map(int, time_str.split(':'))
-                    else:
-                        # Invalid format
-                        return -1
-                    
-                    # Validate time range
-                    if 0 <= hours <= 23 and 0 <= minutes <= 59:
-                        return hours * 60 + minutes
-                    else:
-                        return -1
-                except:
-                    return -1
+            # Tận dụng dữ liệu vừa tải để làm mới availability index
+            if self.availability.is_stale:
+                self.availability.load(data)
             
             new_start_minutes = parse_time_to_minutes(start_time)
             new_end_minutes = parse_time_to_minutes(end_time)
             
             # Validate input times
             if new_start_minutes == -1 or new_end_minutes == -1:
-                logger.error(f"Invalid time format: {start_time} - {end_time}")
+                logger.error("Invalid time format: %s - %s", start_time, end_time)
                 return conflicts
             
+            catalog = get_room_catalog()
+            room_id = catalog.key_for(room)
+            
             # Chỉ check limit_rows hàng mới nhất (bỏ qua header)
             total_rows = len(data)
             start_row = max(2, total_rows - limit_rows + 1)  # Bắt đầu từ row 2 (skip header)
             end_row = total_rows + 1
             
-            logger.info(f"Checking conflicts in rows {start_row} to {end_row-1} (latest {limit_rows} rows)")
+            logger.debug("Checking conflicts in rows %s to %s (latest %s rows)", start_row, end_row-1, limit_rows)
             
             # Cấu trúc sheet: [Timestamp, Name, Phone, CustomerCount, Room, Date, StartTime, EndTime, Notes, Email, Status, ProcessedTime]
             for i in range(start_row, end_row):
@@ -255,7 +383,7 @@ class GoogleSheetsManager:
                 row = data[row_index]
                 
                 if exclude_row and i == exclude_row:
-                    logger.debug(f"Skipping excluded row {i}")
+                    logger.debug("Skipping excluded row %s", i)
                     continue
                 
                 if len(row) >= 8:  # Đảm bảo có đủ cột
@@ -270,7 +398,7 @@ class GoogleSheetsManager:
                     valid_statuses = ["Chờ xử lý", "Đã xác nhận"]
                     if (row_status in valid_statuses and
                         row_date == date and 
-                        row_room.strip() == room.strip()):
+                        catalog.key_for(row_room) == room_id):
                         
                         # Kiểm tra overlap thời gian - chỉ khi cả start và end time đều hợp lệ
                         existing_start_minutes = parse_time_to_minutes(str(row_start_time))
@@ -278,14 +406,14 @@ class GoogleSheetsManager:
                         
                         # Skip nếu thời gian không hợp lệ
                         if existing_start_minutes == -1 or existing_end_minutes == -1:
-                            logger.warning(f"Invalid time format in row {i}: {row_start_time} - {row_end_time}")
+                            logger.warning("Invalid time format in row %s: %s - %s", i, row_start_time, row_end_time)
                             continue
                         
                         # Check if times overlap
                         if (new_start_minutes < existing_end_minutes and 
                             new_end_minutes > existing_start_minutes):
                             
-                            logger.debug(f"Conflict found at row {i}: {row[1]} ({row_start_time}-{row_end_time})")
+                            logger.debug("Conflict found at row %s: %s (%s-%s)", i, row[1], row_start_time, row_end_time)
                             
                             conflicts.append({
                                 'row_number': i,
@@ -295,16 +423,109 @@ class GoogleSheetsManager:
                                 'start_time': row_start_time,
                                 'end_time': row_end_time,
                                 'room': row_room,
-                                'status': row_status or "Chờ xử lý"
+                                'status': row_status or "Chờ xử lý",
+                                'customer_count': row[3] if len(row) > 3 else ""
                             })
             
-            logger.info(f"Checked {limit_rows} latest rows, found {len(conflicts)} conflicts")
+            # Phòng dùng chung: chỉ xung đột khi tổng số khách vượt sức chứa
+            catalog_room = catalog.resolve(room)
+            if conflicts and catalog_room and catalog_room.shared and catalog_room.capacity and customer_count:
+                total_guests = int(customer_count) + sum(
+                    int(c['customer_count']) if str(c['customer_count']).strip().isdigit() else 1
+                    for c in conflicts
+                )
+                if total_guests <= catalog_room.capacity:
+                    logger.debug("Shared room %s: %s/%s guests, no conflict", catalog_room.id, total_guests, catalog_room.capacity)
+                    conflicts = []
+            
+            logger.debug("Checked %s latest rows, found %s conflicts", limit_rows, len(conflicts))
             return conflicts
             
         except Exception as e:
-            logger.error(f"Error checking room conflicts: {e}")
+            logger.error("Error checking room conflicts: %s", e)
             return []
     
+    def get_availability(self, date, room=None, at=None):
+        """
+        Lấy khung giờ trống theo phòng trong một ngày
+        
+        Args:
+            date (str): Ngày (format: dd/mm/yyyy)
+            room (str): Chỉ tính cho phòng này (optional)
+            at (str): Chỉ lấy các phòng còn trống tại giờ HH:MM (optional)
+        
+        Returns:
+            dict: {room: [(start, end), ...]}
+        """
+        if self.availability.is_stale:
+            data = self.get_sheet_data()
+            if data:
+                self.availability.load(data)
+        
+        return self.availability.availability(date, room=room, at=at)
+    
+    def preload_sheet(self) -> int:
+        """
+        Tải snapshot sheet vào availability index (warm-up khi khởi động)
+        
+        Returns:
+            int: Số dòng đã tải
+        """
+        data = self.get_sheet_data()
+        if data:
+            self.availability.load(data)
+        return len(data)
+    
+    @timed('calendar', 'list')
+    @traced('calendar.list_upcoming')
+    def list_upcoming_events(self, days=14):
+        """
+        Lấy các event sắp tới trên calendar (warm-up: làm nóng token/kết nối Calendar API)
+        
+        Args:
+            days (int): Số ngày tính từ hiện tại
+        
+        Returns:
+            list: Danh sách event
+        """
+        now = datetime.now(self.timezone)
+        events = []
+        page_token = None
+        while True:
+            result = self.calendar_service.events().list(
+                calendarId=Config.GOOGLE_CALENDAR_ID,
+                timeMin=now.isoformat(),
+                timeMax=(now + timedelta(days=days)).isoformat(),
+                singleEvents=True,
+                orderBy='startTime',
+                maxResults=250,
+                pageToken=page_token
+            ).execute()
+            events.extend(result.get('items', []))
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                break
+        
+        self.upcoming_events = events
+        return events
+    
+    def warm_calendar_mirror(self):
+        """
+        Full sync calendar mirror khi khởi động và đăng ký push notification nếu có CALENDAR_PUSH_URL
+        
+        Returns:
+            int: Số event trong mirror
+        """
+        self.calendar_mirror.sync()
+        if Config.CALENDAR_PUSH_URL:
+            try:
+                self.calendar_mirror.watch(Config.CALENDAR_PUSH_URL, Config.CALENDAR_PUSH_TOKEN,
+                                           ttl=Config.CALENDAR_PUSH_TTL or None)
+            except Exception as e:
+                # Không có push thì mirror vẫn tự sync lại sau CALENDAR_MIRROR_MAX_AGE
+                logger.warning("Could not register calendar push channel: %s", e)
+        return len(self.calendar_mirror.events)
+    
     def generate_conflict_message(self, conflicts):
         """
         Tạo message hiển thị conflict cho Discord
@@ -329,12 +550,90 @@ class GoogleSheetsManager:
         
         return f"🚨 **Lịch bị trùng!**\n\n" + "\n\n".join(messages)
 
-    def add_to_google_calendar(self, booking_data):
+    def build_calendar_event(self, booking):
+        """
+        Tạo body event Google Calendar cho booking (dùng khi thêm event và khi reconcile)
+        
+        Args:
+            booking (Booking): Booking đã xác nhận
+        
+        Returns:
+            dict: Event body, None nếu ngày/giờ của booking không hợp lệ
+        """
+        booking = Booking.coerce(booking)
+        
+        # Ngày và giờ đã được parse sẵn trong Booking
+        if booking.booking_date is None:
+            logger.error("Invalid date format: %s", booking.date)
+            return None
+        
+        if booking.start_minutes < 0:
+            logger.error("Invalid start time format: %s", booking.start_time)
+            return None
+        
+        if booking.end_minutes < 0:
+            logger.error("Invalid end time format: %s", booking.end_time)
+            return None
+        
+        # Tạo datetime objects với timezone Việt Nam
+        vn_tz = pytz.timezone('Asia/Ho_Chi_Minh')
+        base_date = datetime.combine(booking.booking_date, datetime.min.time())
+        start_datetime = vn_tz.localize(base_date + timedelta(minutes=booking.start_minutes))
+        end_datetime = vn_tz.localize(base_date + timedelta(minutes=booking.end_minutes))
+        
+        # Nếu end time < start time, assume next day
+        if end_datetime <= start_datetime:
+            end_datetime = end_datetime + timedelta(days=1)
+            logger.debug("End time is next day (overnight booking)")
+        
+        # Tạo event data
+        event = {
+            'summary': f"📅 Lịch Họp - {booking.room or 'Phòng họp'} ({booking.name or 'Khách hàng'})",
+            'description': (
+                f"👤 Khách hàng: {booking.name}\n"
+                f"📧 Email: {booking.email}\n"
+                f"📞 Điện thoại: {booking.phone}\n"
+                f"🏠 Phòng họp: {booking.room}\n"
+                f"📅 Ngày: {booking.date}\n"
+                f"⏰ Giờ: {booking.start_time} - {booking.end_time}\n"
+                f"👥 Số khách: {booking.customer_count}\n"
+                f"📝 Ghi chú: {booking.notes}"
+            ),
+            'location': 'Coffee Workspace',
+            'start': {
+                'dateTime': start_datetime.isoformat(),
+                'timeZone': 'Asia/Ho_Chi_Minh'
+            },
+            'end': {
+                'dateTime': end_datetime.isoformat(),
+                'timeZone': 'Asia/Ho_Chi_Minh'
+            },
+            'reminders': {
+                'useDefault': False,
+                'overrides': [
+                    {'method': 'email', 'minutes': 60},  # Email reminder 1 hour before
+                    {'method': 'popup', 'minutes': 15}   # Popup reminder 15 minutes before
+                ]
+            },
+            # Liên kết event với dòng sheet (dùng khi reconcile sheet <-> calendar)
+            'extendedProperties': {
+                'private': {
+                    BOOKING_ROW_PROPERTY: str(booking.row_number or ''),
+                    BOOKING_EMAIL_PROPERTY: booking.email,
+                }
+            }
+        }
+        
+        return event
+    
+    @timed('calendar', 'insert', failure=is_falsy)
+    @traced('calendar.insert')
+    def add_to_google_calendar(self, booking):
         """
         Thêm booking đã xác nhận vào Google Calendar
         
         Args:
-            booking_data (dict): Thông tin booking {name, room, date, startTime, endTime, notes, email}
+            booking (Booking): Booking đã xác nhận (dict cũ vẫn được chấp nhận)
         
         Returns:
             str: Event ID nếu thành công, None nếu thất bại
@@ -344,81 +643,9 @@ class GoogleSheetsManager:
                 logger.error("Calendar service not initialized")
                 return None
             
-            # Parse date và time
-            date_str = booking_data.get('date', '')  # Format: dd/mm/yyyy
-            start_time_str = booking_data.get('startTime', '')  # Format: HH:MM
-            end_time_str = booking_data.get('endTime', '')  # Format: HH:MM
-            
-            # Convert date format from dd/mm/yyyy to yyyy-mm-dd
-            date_parts = date_str.split('/')
-            if len(date_parts) != 3:
-                logger.error(f"Invalid date format: {date_str}")
-                return None
-            
-            day, month, year = date_parts
-            iso_date = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-            
-            # Tạo datetime objects với timezone Việt Nam
-            vn_tz = pytz.timezone('Asia/Ho_Chi_Minh')
-            
-            # Parse start time
-            if not start_time_str or ':' not in start_time_str:
-                logger.error(f"Invalid start time format: {start_time_str}")
-                return None
-                
-            start_parts = start_time_str.split(':')
-            start_hour = int(start_parts[0])
-            start_minute = int(start_parts[1]) if len(start_parts) > 1 else 0
-            
-            # Parse end time
-            if not end_time_str or ':' not in end_time_str:
-                logger.error(f"Invalid end time format: {end_time_str}")
+            event = self.build_calendar_event(booking)
+            if event is None:
                 return None
-                
-            end_parts = end_time_str.split(':')
-            end_hour = int(end_parts[0])
-            end_minute = int(end_parts[1]) if len(end_parts) > 1 else 0
-            
-            # Tạo datetime objects
-            base_date = datetime.strptime(iso_date, '%Y-%m-%d')
-            start_datetime = vn_tz.localize(base_date.replace(hour=start_hour, minute=start_minute))
-            end_datetime = vn_tz.localize(base_date.replace(hour=end_hour, minute=end_minute))
-            
-            # Nếu end time < start time, assume next day
-            if end_datetime <= start_datetime:
-                end_datetime = end_datetime + timedelta(days=1)
-                logger.info("End time is next day (overnight booking)")
-            
-            # Tạo event data
-            event = {
-                'summary': f"📅 Lịch Họp - {booking_data.get('room', 'Phòng họp')} ({booking_data.get('name', 'Khách hàng')})",
-                'description': (
-                    f"👤 Khách hàng: {booking_data.get('name', '')}\n"
-                    f"📧 Email: {booking_data.get('email', '')}\n"
-                    f"📞 Điện thoại: {booking_data.get('phone', '')}\n"
-                    f"🏠 Phòng họp: {booking_data.get('room', '')}\n"
-                    f"📅 Ngày: {date_str}\n"
-                    f"⏰ Giờ: {start_time_str} - {end_time_str}\n"
-                    f"👥 Số khách: {booking_data.get('customerCount', '')}\n"
-                    f"📝 Ghi chú: {booking_data.get('notes', '')}"
-                ),
-                'location': 'Coffee Workspace',
-                'start': {
-                    'dateTime': start_datetime.isoformat(),
-                    'timeZone': 'Asia/Ho_Chi_Minh'
-                },
-                'end': {
-                    'dateTime': end_datetime.isoformat(),
-                    'timeZone': 'Asia/Ho_Chi_Minh'
-                },
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'email', 'minutes': 60},  # Email reminder 1 hour before
-                        {'method': 'popup', 'minutes': 15}   # Popup reminder 15 minutes before
-                    ]
-                }
-            }
             
             # Tạo event trên Google Calendar
             created_event = self.calendar_service.events().insert(
@@ -426,24 +653,27 @@ class GoogleSheetsManager:
                 body=event
             ).execute()
             
+            self.calendar_mirror.record(created_event)
             event_id = created_event.get('id')
             event_link = created_event.get('htmlLink')
             
-            logger.info(f"✅ Created Google Calendar event: {event_id}")
-            logger.info(f"📅 Event link: {event_link}")
+            logger.info("✅ Created Google Calendar event: %s", event_id)
+            logger.debug("📅 Event link: %s", event_link)
             
             return event_id
             
         except Exception as e:
-            logger.error(f"Error creating Google Calendar event: {e}")
+            logger.error("Error creating Google Calendar event: %s", e)
             return None
         
-    def delete_calendar_event_by_booking(self, booking_data):
+    @timed('calendar', 'delete', failure=is_falsy)
+    @traced('calendar.delete')
+    def delete_calendar_event_by_booking(self, booking):
         """
         Xóa calendar event dựa trên thông tin booking
         
         Args:
-            booking_data (dict): Thông tin booking
+            booking (Booking): Thông tin booking
             
         Returns:
             bool: True nếu xóa thành công hoặc không tìm thấy event, False nếu có lỗi
@@ -454,91 +684,65 @@ class GoogleSheetsManager:
                 return False
             
             # Tìm event dựa trên thông tin booking
-            event_id = self._find_calendar_event_by_booking(booking_data)
+            event_id = self._find_calendar_event_by_booking(booking)
             
             if not event_id:
                 logger.warning("No calendar event found for this booking")
                 return True  # Không có event để xóa cũng coi như thành công
             
             # Xóa event
-            self.calendar_service.events().delete(
-                calendarId=Config.GOOGLE_CALENDAR_ID,
-                eventId=event_id
-            ).execute()
-            
-            logger.info(f"✅ Deleted calendar event: {event_id}")
+            try:
+                self.calendar_service.events().delete(
+                    calendarId=Config.GOOGLE_CALENDAR_ID,
+                    eventId=event_id
+                ).execute()
+            except HttpError as e:
+                # 404/410: event đã bị xóa ở nơi khác (mirror chưa kịp sync)
+                if getattr(e.resp, 'status', None) not in (404, 410):
+                    raise
+            self.calendar_mirror.record({'id': event_id, 'status': 'cancelled'})
+            
+            logger.info("✅ Deleted calendar event: %s", event_id)
             return True
             
         except Exception as e:
-            logger.error(f"Error deleting calendar event: {e}")
+            logger.error("Error deleting calendar event: %s", e)
             return False
     
-    def _find_calendar_event_by_booking(self, booking_data):
+    @traced('calendar.find')
+    def _find_calendar_event_by_booking(self, booking):
         """
-        Tìm calendar event dựa trên thông tin booking
+        Tìm calendar event dựa trên thông tin booking - tra trong CalendarMirror
+        
+        Chỉ gọi Calendar API (incremental sync, chỉ trả về thay đổi) khi mirror đã cũ,
+        hoặc khi không tìm thấy mà mirror chưa được sync ngay trước đó.
         
         Args:
-            booking_data (dict): Thông tin booking
+            booking (Booking): Thông tin booking
             
         Returns:
             str: Event ID nếu tìm thấy, None nếu không tìm thấy
         """
         try:
-            # Parse date để tạo time range tìm kiếm
-            date_str = booking_data.get('date', '')
-            if not date_str:
-                return None
-            
-            # Chuyển date format từ dd/mm/yyyy sang yyyy-mm-dd
-            parts = date_str.split('/')
-            if len(parts) != 3:
+            booking = Booking.coerce(booking)
+            if booking.booking_date is None:
                 return None
             
-            day, month, year = parts
-            iso_date = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-            
-            # Tạo time range để search (cả ngày)
-            vn_tz = pytz.timezone('Asia/Ho_Chi_Minh')
-            search_date = datetime.strptime(iso_date, '%Y-%m-%d')
-            
-            time_min = vn_tz.localize(search_date).isoformat()
-            time_max = vn_tz.localize(search_date + timedelta(days=1)).isoformat()
-            
-            # Tìm events trong ngày
-            events_result = self.calendar_service.events().list(
-                calendarId=Config.GOOGLE_CALENDAR_ID,
-                timeMin=time_min,
-                timeMax=time_max,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
+            mirror = self.calendar_mirror
+            synced = mirror.ensure_fresh()
+            event = mirror.find_booking_event(booking)
+            if event is None and not synced:
+                # Event có thể vừa được tạo ở nơi khác - lấy delta rồi tra lại
+                mirror.sync()
+                event = mirror.find_booking_event(booking)
             
-            # Tìm event match với booking info
-            customer_name = booking_data.get('name', '').strip().lower()
-            customer_email = booking_data.get('email', '').strip().lower()
-            room = booking_data.get('room', '').strip().lower()
-            
-            for event in events:
-                event_summary = event.get('summary', '').lower()
-                event_description = event.get('description', '').lower()
-                
-                # Check nếu event chứa thông tin của booking
-                name_match = customer_name and customer_name in event_summary
-                email_match = customer_email and customer_email in event_description
-                room_match = room and room in event_description
-                
-                # Cần ít nhất 2 trong 3 điều kiện match
-                matches = sum([name_match, email_match, room_match])
-                
-                if matches >= 2:
-                    logger.info(f"Found matching calendar event: {event.get('id')}")
-                    return event.get('id')
+            if event is not None:
+                logger.debug("Found matching calendar event: %s", event.get('id'))
+                return event.get('id')
             
             logger.warning("No matching calendar event found")
             return None
             
         except Exception as e:
-            logger.error(f"Error finding calendar event: {e}")
+            logger.error("Error finding calendar event: %s", e)
             return None
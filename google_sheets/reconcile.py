@@ -0,0 +1,298 @@
+"""
+Calendar Reconciliation - đối chiếu booking đã xác nhận trên sheet với event trên Google Calendar
+và sửa chênh lệch (event thiếu, event mồ côi/trùng) theo batch
+
+    python -m google_sheets.reconcile                  # dry-run: chỉ in báo cáo
+    python -m google_sheets.reconcile --apply --days-ahead 60
+"""
+
+import argparse
+import json
+import logging
+import sys
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+
+from config import Config
+from models.booking import Booking
+from .calendar_mirror import CalendarMirror, event_booking_ref, event_start
+from .manager import GoogleSheetsManager
+
+logger = logging.getLogger(__name__)
+
+CONFIRMED_STATUS = 'Đã xác nhận'
+# Event do add_to_google_calendar tạo trước khi có extendedProperties
+LEGACY_SUMMARY_PREFIX = '📅 Lịch Họp'
+# Google API batch: tối đa 50 request mỗi batch cho Calendar
+MAX_BATCH_SIZE = 50
+
+
+@dataclass
+class ReconcileReport:
+    """Kết quả một lần reconcile (dry-run thì created/deleted luôn bằng 0)"""
+    window_start: str
+    window_end: str
+    dry_run: bool
+    sync: str = ''
+    confirmed: int = 0
+    events: int = 0
+    missing: List[Dict[str, str]] = field(default_factory=list)
+    orphaned: List[Dict[str, str]] = field(default_factory=list)
+    duplicates: List[Dict[str, str]] = field(default_factory=list)
+    created: int = 0
+    deleted: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def in_sync(self) -> bool:
+        return not (self.missing or self.orphaned or self.duplicates)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def format(self, limit: int = 20) -> str:
+        """Báo cáo dạng text (log, CLI, Discord)"""
+        mode = 'DRY-RUN' if self.dry_run else 'APPLY'
+        lines = [
+            f"Calendar reconcile [{mode}] {self.window_start} → {self.window_end} ({self.sync} sync)",
+            f"Confirmed bookings: {self.confirmed} | Booking events: {self.events}",
+            f"Missing: {len(self.missing)} | Orphaned: {len(self.orphaned)} | Duplicates: {len(self.duplicates)}",
+        ]
+        if not self.dry_run:
+            lines.append(f"Created: {self.created} | Deleted: {self.deleted}")
+        for title, items in (('Missing', self.missing), ('Orphaned', self.orphaned), ('Duplicates', self.duplicates)):
+            for item in items[:limit]:
+                lines.append(f"  - {title.lower()}: " + ', '.join(f"{k}={v}" for k, v in item.items()))
+            if len(items) > limit:
+                lines.append(f"  ... {len(items) - limit} more {title.lower()}")
+        for error in self.errors[:limit]:
+            lines.append(f"  ! {error}")
+        return '\n'.join(lines)
+
+
+def _booking_item(booking: Booking) -> Dict[str, str]:
+    return {'row': str(booking.row_number), 'name': booking.name, 'date': booking.date,
+            'time': booking.time_display, 'room': booking.room}
+
+
+def _event_item(event: dict, reason: str) -> Dict[str, str]:
+    start = event_start(event)
+    return {'id': event.get('id', ''), 'summary': event.get('summary', ''),
+            'start': start.isoformat() if start else '', 'reason': reason}
+
+
+class CalendarReconciler:
+    """
+    Đối chiếu sheet <-> calendar trong một khoảng ngày:
+
+    - Sheet: một lần get_sheet_data, lấy booking "Đã xác nhận" trong khoảng ngày.
+    - Calendar: CalendarMirror (lần đầu list toàn bộ có phân trang, sau đó syncToken).
+    - Diff trong bộ nhớ: booking không có event (missing), event booking không ứng với booking
+      đã xác nhận nào (orphaned), nhiều event cho cùng một booking (duplicates).
+    - Sửa bằng Google API batch request (insert/delete, tối đa 50 request mỗi batch).
+    """
+
+    def __init__(self, manager, mirror: Optional[CalendarMirror] = None, batch_size: int = MAX_BATCH_SIZE):
+        """
+        Args:
+            manager (GoogleSheetsManager): Đọc sheet, tạo event body và calendar service
+            mirror (CalendarMirror): Mirror calendar, mặc định dùng chung manager.calendar_mirror
+            batch_size (int): Số request mỗi batch
+        """
+        self.manager = manager
+        self.mirror = mirror or manager.calendar_mirror
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.timezone = pytz.timezone(Config.TIMEZONE)
+
+    def window(self, days_back: int, days_ahead: int, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+        """Khoảng [đầu ngày hôm nay - days_back, cuối ngày hôm nay + days_ahead) theo timezone cấu hình"""
+        now = now or datetime.now(self.timezone)
+        today = self.timezone.localize(datetime.combine(now.date(), datetime.min.time()))
+        return today - timedelta(days=days_back), today + timedelta(days=days_ahead + 1)
+
+    def reconcile(self, days_back: Optional[int] = None, days_ahead: Optional[int] = None,
+                  dry_run: bool = True, now: Optional[datetime] = None) -> ReconcileReport:
+        """
+        Chạy đối chiếu (blocking - gọi qua asyncio.to_thread trong bot)
+
+        Args:
+            days_back (int): Số ngày trước hôm nay cần đối chiếu
+            days_ahead (int): Số ngày sau hôm nay cần đối chiếu
+            dry_run (bool): Chỉ báo cáo, không sửa calendar
+            now (datetime): Thời điểm hiện tại (test)
+
+        Returns:
+            ReconcileReport: Báo cáo chênh lệch và kết quả sửa
+        """
+        days_back = Config.CALENDAR_RECONCILE_DAYS_BACK if days_back is None else days_back
+        days_ahead = Config.CALENDAR_RECONCILE_DAYS_AHEAD if days_ahead is None else days_ahead
+        start, end = self.window(days_back, days_ahead, now)
+        report = ReconcileReport(start.date().isoformat(), (end - timedelta(days=1)).date().isoformat(), dry_run)
+
+        rows = self.manager.get_sheet_data()
+        if not rows:
+            report.errors.append("Google Sheets returned no data - skipped")
+            return report
+        report.sync, _ = self.mirror.sync()
+
+        bookings = self._confirmed_bookings(rows, start, end)
+        events = [event for event in self.mirror.events_between(start, end) if self._is_booking_event(event)]
+        report.confirmed = len(bookings)
+        report.events = len(events)
+
+        missing, orphaned, duplicates = self._diff(bookings, events)
+        report.missing = [_booking_item(booking) for booking in missing]
+        report.orphaned = [_event_item(event, reason) for event, reason in orphaned]
+        report.duplicates = [_event_item(event, 'duplicate') for event in duplicates]
+
+        if not dry_run and not report.in_sync:
+            report.created = self._insert_events(missing, report.errors)
+            report.deleted = self._delete_events([event for event, _ in orphaned] + duplicates, report.errors)
+
+        log = logger.info if report.in_sync else logger.warning
+        log("Calendar reconcile (%s): %s confirmed, %s events, %s missing, %s orphaned, %s duplicates",
+            'dry-run' if dry_run else 'apply', report.confirmed, report.events,
+            len(missing), len(orphaned), len(duplicates))
+        return report
+
+    def _confirmed_bookings(self, rows: List[list], start: datetime, end: datetime) -> List[Booking]:
+        first_day, last_day = start.date(), (end - timedelta(days=1)).date()
+        bookings = []
+        for row_number, row in enumerate(rows[1:], start=2):
+            if len(row) <= 10 or str(row[10]).strip() != CONFIRMED_STATUS:
+                continue
+            booking = Booking.from_sheet_row(row, row_number)
+            if booking.booking_date and first_day <= booking.booking_date <= last_day and booking.has_valid_times:
+                bookings.append(booking)
+        return bookings
+
+    @staticmethod
+    def _is_booking_event(event: dict) -> bool:
+        row_number, _ = event_booking_ref(event)
+        return row_number is not None or event.get('summary', '').startswith(LEGACY_SUMMARY_PREFIX)
+
+    def _booking_start(self, booking: Booking) -> datetime:
+        base = datetime.combine(booking.booking_date, datetime.min.time())
+        return self.timezone.localize(base + timedelta(minutes=booking.start_minutes))
+
+    def _diff(self, bookings: List[Booking], events: List[dict]):
+        """
+        Returns:
+            tuple: (booking thiếu event, [(event mồ côi, lý do)], event trùng)
+        """
+        by_row: Dict[int, List[dict]] = {}
+        legacy: Dict[Tuple[str, datetime], List[dict]] = {}
+        for event in sorted(events, key=lambda e: e.get('created', '')):
+            row_number, _ = event_booking_ref(event)
+            if row_number is not None:
+                by_row.setdefault(row_number, []).append(event)
+            else:
+                description = event.get('description', '').lower()
+                email = description.split('email:', 1)[1].split('\n', 1)[0].strip() if 'email:' in description else ''
+                legacy.setdefault((email, event_start(event)), []).append(event)
+
+        matched = set()
+        missing: List[Booking] = []
+        duplicates: List[dict] = []
+        for booking in bookings:
+            email = booking.email.lower()
+            start = self._booking_start(booking)
+            candidates = [event for event in by_row.get(booking.row_number, [])
+                          if event_booking_ref(event)[1] in ('', email) and event_start(event) == start]
+            candidates += legacy.get((email, start), [])
+            candidates = [event for event in candidates if event.get('id') not in matched]
+            if not candidates:
+                missing.append(booking)
+                continue
+            matched.add(candidates[0].get('id'))
+            for extra in candidates[1:]:
+                matched.add(extra.get('id'))
+                duplicates.append(extra)
+
+        confirmed_rows = {booking.row_number for booking in bookings}
+        orphaned = []
+        for event in events:
+            if event.get('id') in matched:
+                continue
+            row_number, _ = event_booking_ref(event)
+            if row_number in confirmed_rows:
+                reason = 'time or email differs from sheet'
+            elif row_number is not None:
+                reason = f'row {row_number} not confirmed'
+            else:
+                reason = 'no confirmed booking matches'
+            orphaned.append((event, reason))
+        return missing, orphaned, duplicates
+
+    def _execute_batch(self, requests: List[Tuple[str, object]]) -> Dict[str, Tuple[object, Optional[Exception]]]:
+        """Chạy các request Google API theo batch, trả về {request_id: (response, exception)}"""
+        results: Dict[str, Tuple[object, Optional[Exception]]] = {}
+
+        def callback(request_id, response, exception):
+            results[request_id] = (response, exception)
+
+        service = self.manager.calendar_service
+        for index in range(0, len(requests), self.batch_size):
+            batch = service.new_batch_http_request(callback=callback)
+            for request_id, request in requests[index:index + self.batch_size]:
+                batch.add(request, request_id=request_id)
+            batch.execute()
+        return results
+
+    def _insert_events(self, bookings: List[Booking], errors: List[str]) -> int:
+        events = self.manager.calendar_service.events()
+        requests = []
+        for booking in bookings:
+            body = self.manager.build_calendar_event(booking)
+            if body is None:
+                errors.append(f"row {booking.row_number}: invalid date/time, event not created")
+                continue
+            requests.append((str(booking.row_number), events.insert(calendarId=self.mirror.calendar_id, body=body)))
+        created = 0
+        for request_id, (response, exception) in self._execute_batch(requests).items():
+            if exception is not None:
+                errors.append(f"row {request_id}: insert failed: {exception}")
+                continue
+            self.mirror.record(response)
+            created += 1
+        if created:
+            logger.info("Reconcile created %s missing calendar event(s)", created)
+        return created
+
+    def _delete_events(self, to_delete: List[dict], errors: List[str]) -> int:
+        events = self.manager.calendar_service.events()
+        requests = [(event['id'], events.delete(calendarId=self.mirror.calendar_id, eventId=event['id']))
+                    for event in to_delete if event.get('id')]
+        deleted = 0
+        for event_id, (_, exception) in self._execute_batch(requests).items():
+            # 404/410: event đã bị xóa ở nơi khác - coi như đã xử lý
+            status = getattr(getattr(exception, 'resp', None), 'status', None)
+            if exception is not None and status not in (404, 410):
+                errors.append(f"event {event_id}: delete failed: {exception}")
+                continue
+            self.mirror.record({'id': event_id, 'status': 'cancelled'})
+            deleted += 1
+        if deleted:
+            logger.info("Reconcile deleted %s orphaned/duplicate calendar event(s)", deleted)
+        return deleted
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Đối chiếu booking đã xác nhận trên sheet với Google Calendar")
+    parser.add_argument('--apply', action='store_true', help='Sửa calendar (mặc định chỉ dry-run)')
+    parser.add_argument('--days-back', type=int, default=Config.CALENDAR_RECONCILE_DAYS_BACK)
+    parser.add_argument('--days-ahead', type=int, default=Config.CALENDAR_RECONCILE_DAYS_AHEAD)
+    parser.add_argument('--json', action='store_true', help='In báo cáo dạng JSON')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    report = CalendarReconciler(GoogleSheetsManager()).reconcile(args.days_back, args.days_ahead, dry_run=not args.apply)
+    print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2) if args.json else report.format(limit=1000))
+    return 1 if report.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Ingredient Catalog - danh mục tên nguyên liệu (từ kho backend + ledger local) đánh index bằng
+trie (gợi ý theo tiền tố từng từ) và trigram (gợi ý gần đúng khi gõ sai) cho autocomplete
+"""
+
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Discord cho tối đa 25 lựa chọn autocomplete
+MAX_SUGGESTIONS = 25
+# Điểm tương đồng (Dice trên trigram theo từng từ) tối thiểu để coi là gần đúng
+MIN_SIMILARITY = 0.4
+# Số ứng viên (nhiều trigram chung nhất) được chấm điểm chi tiết
+FUZZY_CANDIDATES = 100
+
+_NON_WORD_RE = re.compile(r'[^0-9a-z ]+')
+
+
+def normalize_name(name: str) -> str:
+    """'  Cà  Phê-Rang ' -> 'ca phe rang': bỏ dấu tiếng Việt, không phân biệt hoa/thường"""
+    text = unicodedata.normalize('NFD', str(name).replace('đ', 'd').replace('Đ', 'D'))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return ' '.join(_NON_WORD_RE.sub(' ', text).split())
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a: Set[str], b: Set[str]) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+class IngredientIndex:
+    """
+    Index tên nguyên liệu trong bộ nhớ.
+
+    - Trie trên tên đã chuẩn hóa, chèn từ đầu mỗi từ ('ca phe rang', 'phe rang', 'rang') để gõ
+      'rang' hay 'ca ph' đều ra 'Cà phê rang'; mỗi node giữ luôn tập id nên tra tiền tố là O(len(query)).
+    - Inverted index trigram (theo từng từ) -> id cho gợi ý gần đúng: lọc ứng viên theo số trigram chung,
+      rồi chấm điểm mỗi từ của query với từ giống nhất trong tên (Dice), lấy trung bình.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: List[str] = []
+        self._keys: List[str] = []
+        self._word_grams: List[List[Set[str]]] = []
+        self._by_key: Dict[str, int] = {}
+        self._trie: dict = {}
+        self._gram_index: Dict[str, Set[int]] = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str) -> bool:
+        """Thêm tên (bỏ qua nếu đã có tên cùng khóa chuẩn hóa)"""
+        name = ' '.join(str(name).split())
+        key = normalize_name(name)
+        if not key or key in self._by_key:
+            return False
+        item_id = len(self.names)
+        self.names.append(name)
+        self._keys.append(key)
+        self._by_key[key] = item_id
+
+        words = key.split(' ')
+        for start in range(len(words)):
+            node = self._trie
+            for ch in ' '.join(words[start:]):
+                node = node.setdefault(ch, {})
+                node.setdefault('', set()).add(item_id)
+
+        word_grams = [trigrams(word) for word in words]
+        self._word_grams.append(word_grams)
+        for gram in set().union(*word_grams):
+            self._gram_index.setdefault(gram, set()).add(item_id)
+        return True
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Tên chuẩn trong danh mục nếu trùng sau khi bỏ dấu/hoa thường ('ca phe' -> 'Cà phê')"""
+        item_id = self._by_key.get(normalize_name(name))
+        return self.names[item_id] if item_id is not None else None
+
+    def _prefix_ids(self, query: str) -> Set[int]:
+        node = self._trie
+        for ch in query:
+            node = node.get(ch)
+            if node is None:
+                return set()
+        return node.get('', set())
+
+    def suggest(self, query: str, limit: int = MAX_SUGGESTIONS) -> List[str]:
+        """
+        Gợi ý tên cho chuỗi đang gõ
+
+        Thứ tự: tên bắt đầu bằng query, tên có một từ bắt đầu bằng query, rồi tên gần đúng theo trigram.
+
+        Args:
+            query (str): Chuỗi người dùng đang gõ
+            limit (int): Số gợi ý tối đa
+
+        Returns:
+            list: Tên nguyên liệu
+        """
+        key = normalize_name(query)
+        if not key:
+            return sorted(self.names, key=str.casefold)[:limit]
+
+        keys = self._keys
+        prefix = sorted(self._prefix_ids(key),
+                        key=lambda i: (not keys[i].startswith(key), len(keys[i]), keys[i]))
+        result = prefix[:limit]
+        if len(result) < limit:
+            seen = set(result)
+            query_grams = [trigrams(word) for word in key.split(' ')]
+            shared: Dict[int, int] = {}
+            for gram in set().union(*query_grams):
+                for item_id in self._gram_index.get(gram, ()):
+                    if item_id not in seen:
+                        shared[item_id] = shared.get(item_id, 0) + 1
+            candidates = sorted(shared, key=shared.get, reverse=True)[:FUZZY_CANDIDATES]
+            scored = []
+            for item_id in candidates:
+                word_grams = self._word_grams[item_id]
+                score = sum(max(_dice(q, w) for w in word_grams) for q in query_grams) / len(query_grams)
+                if score >= MIN_SIMILARITY:
+                    scored.append((-score, len(keys[item_id]), keys[item_id], item_id))
+            scored.sort()
+            result.extend(item_id for *_, item_id in scored[:limit - len(result)])
+        return [self.names[item_id] for item_id in result]
+
+
+class IngredientCatalog:
+    """
+    Danh mục nguyên liệu cho autocomplete: tải một lần khi cog load, làm mới định kỳ trên thread
+    (build index mới rồi thay tham chiếu), tên mới từ lệnh kho được thêm ngay vào index hiện tại.
+    """
+
+    def __init__(self, kho_manager, refresh_minutes: Optional[float] = None):
+        """
+        Args:
+            kho_manager (KhoManager): Nguồn danh mục (backend Apps Script + ledger local)
+            refresh_minutes (float): Chu kỳ làm mới, mặc định Config.KHO_CATALOG_REFRESH_MINUTES (0 = không làm mới)
+        """
+        self.kho_manager = kho_manager
+        self.refresh_minutes = Config.KHO_CATALOG_REFRESH_MINUTES if refresh_minutes is None else refresh_minutes
+        self.index = IngredientIndex()
+        self.loaded_at: Optional[float] = None
+        self._recent: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def refresh(self) -> int:
+        """
+        Tải lại danh mục (blocking - gọi qua asyncio.to_thread)
+
+        Returns:
+            int: Số nguyên liệu trong danh mục
+        """
+        self._recent = []
+        index = IngredientIndex(self.kho_manager.danh_sach_nguyen_lieu())
+        # Giữ các tên được thêm trong lúc đang tải
+        for name in list(self._recent):
+            index.add(name)
+        self.index = index
+        self.loaded_at = time.time()
+        logger.info("Ingredient catalog loaded: %s item(s)", len(index))
+        return len(index)
+
+    def add(self, name: str):
+        """Ghi nhận tên nguyên liệu vừa dùng thành công trong lệnh kho"""
+        if name and self.index.add(name):
+            self._recent.append(name)
+
+    def resolve(self, name: str) -> Optional[str]:
+        return self.index.resolve(name)
+
+    def suggest(self, query: str, limit: int = MAX_SUGGESTIONS) -> List[str]:
+        return self.index.suggest(query, limit)
+
+    def start(self):
+        """Tải danh mục và làm mới định kỳ (gọi trong event loop của bot)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.warning("Error loading ingredient catalog: %s", e)
+            if self.refresh_minutes <= 0:
+                return
+            await asyncio.sleep(self.refresh_minutes * 60)
@@ -3,9 +3,11 @@ Discord Commands cho Quản lý Kho
 """
 
 import discord
+from discord import app_commands
 from discord.ext import commands
 import logging
-from typing import Optional
+from typing import List, Optional
+from .catalog import IngredientCatalog, MAX_SUGGESTIONS
 from .kho_manager import KhoManager
 from config import Config
 
@@ -16,11 +18,22 @@ class KhoCommands(commands.Cog):
     Discord Commands cho quản lý kho vật tư/nguyên liệu
     """
     
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, kho_manager: Optional[KhoManager] = None):
         self.bot = bot
-        self.kho_manager = KhoManager()
+        self.kho_manager = kho_manager or KhoManager()
+        self.catalog = IngredientCatalog(self.kho_manager)
         self.allowed_channel = Config.KHO_CHANNEL_NAME
-        logger.info(f"KhoCommands cog initialized - allowed channel: #{self.allowed_channel}")
+        logger.info("KhoCommands cog initialized - allowed channel: #%s", self.allowed_channel)
+    
+    async def cog_load(self):
+        if self.kho_manager.syncer:
+            self.kho_manager.syncer.start()
+        self.catalog.start()
+    
+    async def cog_unload(self):
+        if self.kho_manager.syncer:
+            await self.kho_manager.syncer.stop()
+        await self.catalog.stop()
     
     def _is_allowed_channel(self, ctx: commands.Context) -> bool:
         """
@@ -48,33 +61,181 @@ class KhoCommands(commands.Cog):
         )
         await ctx.send(embed=embed, delete_after=10)
     
-    def _parse_command_args(self, args: str, expected_parts: int) -> Optional[list]:
+    def _parse_command_args(self, args: str, expected_parts: int, min_parts: Optional[int] = None) -> Optional[list]:
         """
         Parse command arguments với format: part1 - part2 - part3
         
         Args:
             args (str): Chuỗi arguments
             expected_parts (int): Số phần mong đợi
+            min_parts (int, optional): Số phần tối thiểu nếu các phần cuối được phép bỏ trống
             
         Returns:
-            list: Danh sách các phần đã parse, hoặc None nếu lỗi
+            list: Danh sách `expected_parts` phần đã parse (phần bỏ trống là None), hoặc None nếu lỗi
         """
         if not args:
             return None
             
         parts = [p.strip() for p in args.split("-")]
-        if len(parts) != expected_parts:
+        if not (min_parts or expected_parts) <= len(parts) <= expected_parts:
             return None
             
-        return parts
+        return parts + [None] * (expected_parts - len(parts))
+    
+    def _ledger_note(self, result: dict) -> str:
+        """Dòng ghi chú cho kết quả ghi vào ledger (điều chỉnh tồn kho, chờ đồng bộ)"""
+        note = ""
+        if result.get("dieu_chinh"):
+            note += f"\n📝 Tồn kho local được điều chỉnh {result['dieu_chinh']:+d} theo số đã nhập"
+        if result.get("queued"):
+            note += "\n⏳ Đang đồng bộ lên Google Sheets"
+        return note
+    
+    def _resolve_ingredient(self, ten_nguyen_lieu: str):
+        """
+        Chuẩn hóa tên theo danh mục ('ca phe' -> 'Cà phê'); tên chưa có trong danh mục thì kèm gợi ý gần nhất
+        
+        Returns:
+            tuple: (tên dùng cho lệnh, ghi chú cảnh báo hoặc "")
+        """
+        known = self.catalog.resolve(ten_nguyen_lieu)
+        if known:
+            return known, ""
+        suggestions = self.catalog.suggest(ten_nguyen_lieu, limit=1)
+        if suggestions:
+            return ten_nguyen_lieu, f"\n⚠️ Nguyên liệu mới - có phải ý bạn là **{suggestions[0]}**?"
+        return ten_nguyen_lieu, ""
+    
+    def _server_error(self, result: dict) -> dict:
+        return {"content": f"⚠️ **Lỗi từ server:** {result.get('message', 'Không rõ nguyên nhân')}"}
+    
+    def _nhap_kho_response(self, ten_nguyen_lieu: str, so_luong_nhap: int,
+                           tong_so_luong: Optional[int], username: str) -> dict:
+        """Thực hiện nhập kho, trả về kwargs cho send (dùng chung cho prefix và slash command)"""
+        ten_nguyen_lieu, warning = self._resolve_ingredient(ten_nguyen_lieu)
+        result = self.kho_manager.nhap_kho(
+            ten_nguyen_lieu=ten_nguyen_lieu,
+            so_luong_nhap=so_luong_nhap,
+            tong_so_luong=tong_so_luong,
+            nguoi_nhap=username
+        )
+        if result.get("status") != "success":
+            return self._server_error(result)
+        ten_nguyen_lieu = result.get('ten_nguyen_lieu', ten_nguyen_lieu)
+        self.catalog.add(ten_nguyen_lieu)
+        embed = discord.Embed(
+            title="✅ Nhập Kho Thành Công",
+            color=discord.Color.green(),
+            description=f"**Nguyên liệu:** {ten_nguyen_lieu}\n"
+                       f"**Số lượng nhập:** {so_luong_nhap}\n"
+                       f"**Tổng số lượng:** {result.get('ton_kho', tong_so_luong)}\n"
+                       f"**Người nhập:** {username}"
+                       f"{warning}{self._ledger_note(result)}"
+        )
+        return {"embed": embed}
+    
+    def _xuat_kho_response(self, ten_nguyen_lieu: str, so_luong_xuat: int,
+                           so_luong_con_lai: Optional[int], username: str) -> dict:
+        """Thực hiện xuất kho, trả về kwargs cho send"""
+        ten_nguyen_lieu, warning = self._resolve_ingredient(ten_nguyen_lieu)
+        result = self.kho_manager.xuat_kho(
+            ten_nguyen_lieu=ten_nguyen_lieu,
+            so_luong_xuat=so_luong_xuat,
+            so_luong_con_lai=so_luong_con_lai,
+            nguoi_xuat=username
+        )
+        if result.get("status") != "success":
+            return self._server_error(result)
+        ten_nguyen_lieu = result.get('ten_nguyen_lieu', ten_nguyen_lieu)
+        self.catalog.add(ten_nguyen_lieu)
+        embed = discord.Embed(
+            title="✅ Xuất Kho Thành Công",
+            color=discord.Color.blue(),
+            description=f"**Nguyên liệu:** {ten_nguyen_lieu}\n"
+                       f"**Số lượng xuất:** {so_luong_xuat}\n"
+                       f"**Số lượng còn lại:** {result.get('ton_kho', so_luong_con_lai)}\n"
+                       f"**Người xuất:** {username}"
+                       f"{warning}{self._ledger_note(result)}"
+        )
+        return {"embed": embed}
+    
+    def _che_bien_response(self, ten_nguyen_lieu: str, dung_tich: str, username: str) -> dict:
+        """Ghi nhận chế biến, trả về kwargs cho send"""
+        ten_nguyen_lieu, warning = self._resolve_ingredient(ten_nguyen_lieu)
+        result = self.kho_manager.che_bien(
+            ten_nguyen_lieu=ten_nguyen_lieu,
+            dung_tich=dung_tich,
+            nguoi_che_bien=username
+        )
+        if result.get("status") != "success":
+            return self._server_error(result)
+        ten_nguyen_lieu = result.get('ten_nguyen_lieu', ten_nguyen_lieu)
+        self.catalog.add(ten_nguyen_lieu)
+        embed = discord.Embed(
+            title="✅ Chế Biến Thành Công",
+            color=discord.Color.orange(),
+            description=f"**Nguyên liệu:** {ten_nguyen_lieu}\n"
+                       f"**Dung tích có được:** {dung_tich}\n"
+                       f"**Người chế biến:** {username}"
+                       f"{warning}{self._ledger_note(result)}"
+        )
+        return {"embed": embed}
+    
+    def _huy_nguyen_lieu_response(self, ten_nguyen_lieu: str, so_luong_huy: str, ly_do: str, username: str) -> dict:
+        """Ghi nhận hủy nguyên liệu, trả về kwargs cho send"""
+        ten_nguyen_lieu, warning = self._resolve_ingredient(ten_nguyen_lieu)
+        result = self.kho_manager.huy_nguyen_lieu(
+            ten_nguyen_lieu=ten_nguyen_lieu,
+            so_luong_huy=so_luong_huy,
+            ly_do=ly_do,
+            nguoi_huy=username
+        )
+        if result.get("status") != "success":
+            return self._server_error(result)
+        ten_nguyen_lieu = result.get('ten_nguyen_lieu', ten_nguyen_lieu)
+        self.catalog.add(ten_nguyen_lieu)
+        embed = discord.Embed(
+            title="✅ Hủy Nguyên Liệu Thành Công",
+            color=discord.Color.red(),
+            description=f"**Nguyên liệu:** {ten_nguyen_lieu}\n"
+                       f"**Số lượng hủy:** {so_luong_huy}\n"
+                       f"**Lý do:** {ly_do}\n"
+                       f"**Người hủy:** {username}"
+                       f"{warning}{self._ledger_note(result)}"
+        )
+        return {"embed": embed}
+    
+    def _ton_kho_response(self, ten_nguyen_lieu: str) -> dict:
+        """Tồn kho hiện tại từ ledger, trả về kwargs cho send"""
+        result = self.kho_manager.ton_kho(ten_nguyen_lieu)
+        if result.get("status") != "success":
+            return {"content": f"⚠️ **Lỗi:** {result.get('message', 'Không rõ nguyên nhân')}"}
+        
+        items = result["items"]
+        if not items:
+            return {"content": f"📭 Chưa có tồn kho{f' cho **{ten_nguyen_lieu}**' if ten_nguyen_lieu else ''}"}
+        
+        # Embed description tối đa 4096 ký tự
+        lines = [f"**{item['ten_nguyen_lieu']}:** {item['so_luong']}" for item in items[:60]]
+        if len(items) > 60:
+            lines.append(f"... và {len(items) - 60} nguyên liệu khác")
+        embed = discord.Embed(
+            title="📦 Tồn Kho Hiện Tại",
+            color=discord.Color.teal(),
+            description="\n".join(lines)
+        )
+        pending = self.kho_manager.ledger.pending_sync
+        if pending:
+            embed.set_footer(text=f"⏳ {pending} giao dịch đang chờ đồng bộ lên Google Sheets")
+        return {"embed": embed}
     
     @commands.command(name="nhapkho")
     async def nhap_kho(self, ctx: commands.Context, *, args: str = None):
         """
         Nhập kho nguyên liệu
         
-        Cú pháp: /nhapkho Tên nguyên liệu - SL nhập - Tổng SL
-        Ví dụ: /nhapkho Cà phê - 10 - 50
+        Cú pháp: /nhapkho Tên nguyên liệu - SL nhập [- Tổng SL]
+        Ví dụ: /nhapkho Cà phê - 10 (tổng được tính từ tồn kho)
         """
         # Kiểm tra kênh trước tiên
         if not self._is_allowed_channel(ctx):
@@ -85,7 +246,7 @@ class KhoCommands(commands.Cog):
             embed = discord.Embed(
                 title="⚠️ Sai định dạng!",
                 color=discord.Color.orange(),
-                description="📝 **Cú pháp:** `/nhapkho Tên nguyên liệu - SL nhập - Tổng SL`"
+                description="📝 **Cú pháp:** `/nhapkho Tên nguyên liệu - SL nhập [- Tổng SL]`"
                             "\n"
                            "📋 **Ví dụ:** `/nhapkho Cà phê - 10 - 50`"
             )
@@ -93,51 +254,31 @@ class KhoCommands(commands.Cog):
             return
         
         # Parse arguments
-        parts = self._parse_command_args(args, 3)
+        parts = self._parse_command_args(args, 3, min_parts=2)
         if not parts:
             embed = discord.Embed(
                 title="⚠️ Sai định dạng!",
                 color=discord.Color.orange(),
-                description="📝 **Cú pháp:** `/nhapkho Tên nguyên liệu - SL nhập - Tổng SL`\n"
+                description="📝 **Cú pháp:** `/nhapkho Tên nguyên liệu - SL nhập [- Tổng SL]`\n"
                            "📋 **Ví dụ:** `/nhapkho Cà phê - 10 - 50`"
             )
             await ctx.send(embed=embed)
             return
         
         try:
-            ten_nguyen_lieu, so_luong_nhap_str, tong_so_luong = parts
+            ten_nguyen_lieu, so_luong_nhap_str, tong_so_luong_str = parts
             so_luong_nhap = int(so_luong_nhap_str)  # Validate số nguyên
+            tong_so_luong = int(tong_so_luong_str) if tong_so_luong_str else None
             
             # Lấy username
             username = ctx.author.display_name or ctx.author.name
             
-            # Gửi request đến backend
-            result = self.kho_manager.nhap_kho(
-                ten_nguyen_lieu=ten_nguyen_lieu,
-                so_luong_nhap=so_luong_nhap,
-                tong_so_luong=tong_so_luong,
-                nguoi_nhap=username
-            )
-            
-            # Xử lý response
-            if result.get("status") == "success":
-                embed = discord.Embed(
-                    title="✅ Nhập Kho Thành Công",
-                    color=discord.Color.green(),
-                    description=f"**Nguyên liệu:** {ten_nguyen_lieu}\n"
-                               f"**Số lượng nhập:** {so_luong_nhap}\n"
-                               f"**Tổng số lượng:** {tong_so_luong}\n"
-                               f"**Người nhập:** {username}"
-                )
-                await ctx.send(embed=embed)
-            else:
-                error_msg = result.get('message', 'Không rõ nguyên nhân')
-                await ctx.send(f"⚠️ **Lỗi từ server:** {error_msg}")
+            await ctx.send(**self._nhap_kho_response(ten_nguyen_lieu, so_luong_nhap, tong_so_luong, username))
                 
         except ValueError:
-            await ctx.send("⚠️ **Lỗi:** Số lượng nhập phải là số nguyên!")
+            await ctx.send("⚠️ **Lỗi:** Số lượng nhập và tổng số lượng phải là số nguyên!")
         except Exception as e:
-            logger.error(f"Error in nhap_kho command: {e}")
+            logger.error("Error in nhap_kho command: %s", e)
             await ctx.send(f"❌ **Lỗi xử lý nhập kho:** {str(e)}")
     
     @commands.command(name="xuatkho")
@@ -145,8 +286,8 @@ class KhoCommands(commands.Cog):
         """
         Xuất kho nguyên liệu
         
-        Cú pháp: /xuatkho Tên nguyên liệu - SL xuất - SL còn lại
-        Ví dụ: /xuatkho Cà phê - 5 - 45
+        Cú pháp: /xuatkho Tên nguyên liệu - SL xuất [- SL còn lại]
+        Ví dụ: /xuatkho Cà phê - 5 (số còn lại được tính từ tồn kho)
         """
         # Kiểm tra kênh trước tiên
         if not self._is_allowed_channel(ctx):
@@ -157,19 +298,19 @@ class KhoCommands(commands.Cog):
             embed = discord.Embed(
                 title="⚠️ Sai định dạng!",
                 color=discord.Color.orange(),
-                description="📝 **Cú pháp:** `/xuatkho Tên nguyên liệu - SL xuất - SL còn lại`\n"
+                description="📝 **Cú pháp:** `/xuatkho Tên nguyên liệu - SL xuất [- SL còn lại]`\n"
                            "📋 **Ví dụ:** `/xuatkho Cà phê - 5 - 45`"
             )
             await ctx.send(embed=embed)
             return
         
         # Parse arguments
-        parts = self._parse_command_args(args, 3)
+        parts = self._parse_command_args(args, 3, min_parts=2)
         if not parts:
             embed = discord.Embed(
                 title="⚠️ Sai định dạng!",
                 color=discord.Color.orange(),
-                description="📝 **Cú pháp:** `/xuatkho Tên nguyên liệu - SL xuất - SL còn lại`\n"
+                description="📝 **Cú pháp:** `/xuatkho Tên nguyên liệu - SL xuất [- SL còn lại]`\n"
                            "📋 **Ví dụ:** `/xuatkho Cà phê - 5 - 45`"
             )
             await ctx.send(embed=embed)
@@ -178,38 +319,17 @@ class KhoCommands(commands.Cog):
         try:
             ten_nguyen_lieu, so_luong_xuat_str, so_luong_con_lai_str = parts
             so_luong_xuat = int(so_luong_xuat_str)
-            so_luong_con_lai = int(so_luong_con_lai_str)
+            so_luong_con_lai = int(so_luong_con_lai_str) if so_luong_con_lai_str else None
             
             # Lấy username
             username = ctx.author.display_name or ctx.author.name
             
-            # Gửi request đến backend
-            result = self.kho_manager.xuat_kho(
-                ten_nguyen_lieu=ten_nguyen_lieu,
-                so_luong_xuat=so_luong_xuat,
-                so_luong_con_lai=so_luong_con_lai,
-                nguoi_xuat=username
-            )
-            
-            # Xử lý response
-            if result.get("status") == "success":
-                embed = discord.Embed(
-                    title="✅ Xuất Kho Thành Công",
-                    color=discord.Color.blue(),
-                    description=f"**Nguyên liệu:** {ten_nguyen_lieu}\n"
-                               f"**Số lượng xuất:** {so_luong_xuat}\n"
-                               f"**Số lượng còn lại:** {so_luong_con_lai}\n"
-                               f"**Người xuất:** {username}"
-                )
-                await ctx.send(embed=embed)
-            else:
-                error_msg = result.get('message', 'Không rõ nguyên nhân')
-                await ctx.send(f"⚠️ **Lỗi từ server:** {error_msg}")
+            await ctx.send(**self._xuat_kho_response(ten_nguyen_lieu, so_luong_xuat, so_luong_con_lai, username))
                 
         except ValueError:
             await ctx.send("⚠️ **Lỗi:** Số lượng xuất và còn lại phải là số nguyên!")
         except Exception as e:
-            logger.error(f"Error in xuat_kho command: {e}")
+            logger.error("Error in xuat_kho command: %s", e)
             await ctx.send(f"❌ **Lỗi xử lý xuất kho:** {str(e)}")
     
     @commands.command(name="chebien")
@@ -253,29 +373,10 @@ class KhoCommands(commands.Cog):
             # Lấy username
             username = ctx.author.display_name or ctx.author.name
             
-            # Gửi request đến backend
-            result = self.kho_manager.che_bien(
-                ten_nguyen_lieu=ten_nguyen_lieu,
-                dung_tich=dung_tich,
-                nguoi_che_bien=username
-            )
-            
-            # Xử lý response
-            if result.get("status") == "success":
-                embed = discord.Embed(
-                    title="✅ Chế Biến Thành Công",
-                    color=discord.Color.orange(),
-                    description=f"**Nguyên liệu:** {ten_nguyen_lieu}\n"
-                               f"**Dung tích có được:** {dung_tich}\n"
-                               f"**Người chế biến:** {username}"
-                )
-                await ctx.send(embed=embed)
-            else:
-                error_msg = result.get('message', 'Không rõ nguyên nhân')
-                await ctx.send(f"⚠️ **Lỗi từ server:** {error_msg}")
+            await ctx.send(**self._che_bien_response(ten_nguyen_lieu, dung_tich, username))
                 
         except Exception as e:
-            logger.error(f"Error in che_bien command: {e}")
+            logger.error("Error in che_bien command: %s", e)
             await ctx.send(f"❌ **Lỗi xử lý chế biến:** {str(e)}")
     
     @commands.command(name="huynguyenlieu")
@@ -319,33 +420,27 @@ class KhoCommands(commands.Cog):
             # Lấy username
             username = ctx.author.display_name or ctx.author.name
             
-            # Gửi request đến backend
-            result = self.kho_manager.huy_nguyen_lieu(
-                ten_nguyen_lieu=ten_nguyen_lieu,
-                so_luong_huy=so_luong_huy,
-                ly_do=ly_do,
-                nguoi_huy=username
-            )
-            
-            # Xử lý response
-            if result.get("status") == "success":
-                embed = discord.Embed(
-                    title="✅ Hủy Nguyên Liệu Thành Công",
-                    color=discord.Color.red(),
-                    description=f"**Nguyên liệu:** {ten_nguyen_lieu}\n"
-                               f"**Số lượng hủy:** {so_luong_huy}\n"
-                               f"**Lý do:** {ly_do}\n"
-                               f"**Người hủy:** {username}"
-                )
-                await ctx.send(embed=embed)
-            else:
-                error_msg = result.get('message', 'Không rõ nguyên nhân')
-                await ctx.send(f"⚠️ **Lỗi từ server:** {error_msg}")
+            await ctx.send(**self._huy_nguyen_lieu_response(ten_nguyen_lieu, so_luong_huy, ly_do, username))
                 
         except Exception as e:
-            logger.error(f"Error in huy_nguyen_lieu command: {e}")
+            logger.error("Error in huy_nguyen_lieu command: %s", e)
             await ctx.send(f"❌ **Lỗi xử lý hủy nguyên liệu:** {str(e)}")
     
+    @commands.command(name="tonkho")
+    async def ton_kho(self, ctx: commands.Context, *, args: str = ''):
+        """
+        Xem tồn kho hiện tại (từ ledger local, không cần mở sheet)
+        
+        Cú pháp: /tonkho [Tên nguyên liệu]
+        Ví dụ: /tonkho Cà phê
+        """
+        # Kiểm tra kênh trước tiên
+        if not self._is_allowed_channel(ctx):
+            await self._send_channel_error(ctx)
+            return
+        
+        await ctx.send(**self._ton_kho_response((args or '').strip()))
+    
     @commands.command(name="khostatus")
     async def kho_status(self, ctx: commands.Context):
         """
@@ -388,6 +483,17 @@ class KhoCommands(commands.Cog):
             inline=True
         )
         
+        if status['ledger']:
+            last_synced = status['last_synced_at']
+            embed.add_field(
+                name="📒 Ledger kho",
+                value=f"{status['items']} nguyên liệu\n"
+                      f"⏳ Chờ đồng bộ: {status['pending_sync']}\n"
+                      f"❌ Đồng bộ lỗi: {status['failed_sync']}\n"
+                      f"🕐 Lần đồng bộ cuối: {f'<t:{int(last_synced)}:R>' if last_synced else 'chưa có'}",
+                inline=False
+            )
+        
         await ctx.send(embed=embed)
     
     @commands.command(name="khohelp")
@@ -409,17 +515,17 @@ class KhoCommands(commands.Cog):
         
         embed.add_field(
             name="📥 `/nhapkho`",
-            value="**Cú pháp:** `Tên nguyên liệu - SL nhập - Tổng SL`"
+            value="**Cú pháp:** `Tên nguyên liệu - SL nhập [- Tổng SL]`"
             "\n"
-                  "**Ví dụ:** `/nhapkho Cà phê - 10 - 50`",
+                  "**Ví dụ:** `/nhapkho Cà phê - 10` (tổng tự tính từ tồn kho)",
             inline=False
         )
         
         embed.add_field(
             name="📤 `/xuatkho`",
-            value="**Cú pháp:** `Tên nguyên liệu - SL xuất - SL còn lại`"
+            value="**Cú pháp:** `Tên nguyên liệu - SL xuất [- SL còn lại]`"
             "\n"
-                  "**Ví dụ:** `/xuatkho Cà phê - 5 - 45`",
+                  "**Ví dụ:** `/xuatkho Cà phê - 5` (số còn lại tự tính)",
             inline=False
         )
         
@@ -439,6 +545,14 @@ class KhoCommands(commands.Cog):
             inline=False
         )
         
+        embed.add_field(
+            name="📦 `/tonkho`",
+            value="**Cú pháp:** `[Tên nguyên liệu]`"
+            "\n"
+                  "**Ví dụ:** `/tonkho Cà phê`",
+            inline=False
+        )
+        
         embed.add_field(
             name="📊 `/khostatus`",
             value="Kiểm tra trạng thái cấu hình hệ thống kho",
@@ -451,10 +565,80 @@ class KhoCommands(commands.Cog):
             inline=False
         )
         
-        embed.set_footer(text="💡 Lưu ý: Sử dụng dấu '-' để phân tách các phần trong lệnh")
+        embed.set_footer(text="💡 Lưu ý: Sử dụng dấu '-' để phân tách các phần trong lệnh, "
+                              "hoặc chọn lệnh slash để được gợi ý tên nguyên liệu")
         
         await ctx.send(embed=embed)
 
+    # ===== Slash commands (autocomplete tên nguyên liệu từ danh mục) =====
+    
+    async def ingredient_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        """Gợi ý tên nguyên liệu - tra index trong bộ nhớ, không gọi backend"""
+        return [
+            app_commands.Choice(name=name[:100], value=name[:100])
+            for name in self.catalog.suggest(current, MAX_SUGGESTIONS)
+        ]
+    
+    async def _run_slash(self, interaction: discord.Interaction, action: str, handler, *args):
+        """Kiểm tra kênh, defer rồi gửi kết quả của handler (kwargs cho send) qua followup"""
+        if not self._is_allowed_channel(interaction):
+            await interaction.response.send_message(
+                f"🚫 Lệnh quản lý kho chỉ có thể sử dụng trong kênh **#{self.allowed_channel}**", ephemeral=True
+            )
+            return
+        
+        await interaction.response.defer()
+        try:
+            await interaction.followup.send(**handler(*args))
+        except Exception as e:
+            logger.error("Error in %s slash command: %s", action, e)
+            await interaction.followup.send(f"❌ **Lỗi xử lý {action}:** {str(e)}")
+    
+    @staticmethod
+    def _interaction_username(interaction: discord.Interaction) -> str:
+        return interaction.user.display_name or interaction.user.name
+    
+    @app_commands.command(name="nhapkho", description="Nhập kho nguyên liệu")
+    @app_commands.describe(ten_nguyen_lieu="Tên nguyên liệu", so_luong_nhap="Số lượng nhập",
+                           tong_so_luong="Tổng số lượng sau khi nhập (bỏ trống để tự tính)")
+    @app_commands.autocomplete(ten_nguyen_lieu=ingredient_autocomplete)
+    async def nhap_kho_slash(self, interaction: discord.Interaction, ten_nguyen_lieu: str,
+                             so_luong_nhap: app_commands.Range[int, 1],
+                             tong_so_luong: Optional[app_commands.Range[int, 0]] = None):
+        await self._run_slash(interaction, "nhập kho", self._nhap_kho_response,
+                              ten_nguyen_lieu, so_luong_nhap, tong_so_luong, self._interaction_username(interaction))
+    
+    @app_commands.command(name="xuatkho", description="Xuất kho nguyên liệu")
+    @app_commands.describe(ten_nguyen_lieu="Tên nguyên liệu", so_luong_xuat="Số lượng xuất",
+                           so_luong_con_lai="Số lượng còn lại (bỏ trống để tự tính)")
+    @app_commands.autocomplete(ten_nguyen_lieu=ingredient_autocomplete)
+    async def xuat_kho_slash(self, interaction: discord.Interaction, ten_nguyen_lieu: str,
+                             so_luong_xuat: app_commands.Range[int, 1],
+                             so_luong_con_lai: Optional[app_commands.Range[int, 0]] = None):
+        await self._run_slash(interaction, "xuất kho", self._xuat_kho_response,
+                              ten_nguyen_lieu, so_luong_xuat, so_luong_con_lai, self._interaction_username(interaction))
+    
+    @app_commands.command(name="chebien", description="Chế biến nguyên liệu")
+    @app_commands.describe(ten_nguyen_lieu="Tên nguyên liệu", dung_tich="Dung tích có được (VD: 2 lít)")
+    @app_commands.autocomplete(ten_nguyen_lieu=ingredient_autocomplete)
+    async def che_bien_slash(self, interaction: discord.Interaction, ten_nguyen_lieu: str, dung_tich: str):
+        await self._run_slash(interaction, "chế biến", self._che_bien_response,
+                              ten_nguyen_lieu, dung_tich, self._interaction_username(interaction))
+    
+    @app_commands.command(name="huynguyenlieu", description="Hủy nguyên liệu")
+    @app_commands.describe(ten_nguyen_lieu="Tên nguyên liệu", so_luong_huy="Số lượng/trọng lượng hủy", ly_do="Lý do hủy")
+    @app_commands.autocomplete(ten_nguyen_lieu=ingredient_autocomplete)
+    async def huy_nguyen_lieu_slash(self, interaction: discord.Interaction, ten_nguyen_lieu: str,
+                                    so_luong_huy: str, ly_do: str):
+        await self._run_slash(interaction, "hủy nguyên liệu", self._huy_nguyen_lieu_response,
+                              ten_nguyen_lieu, so_luong_huy, ly_do, self._interaction_username(interaction))
+    
+    @app_commands.command(name="tonkho", description="Xem tồn kho hiện tại")
+    @app_commands.describe(ten_nguyen_lieu="Lọc theo tên nguyên liệu (tùy chọn)")
+    @app_commands.autocomplete(ten_nguyen_lieu=ingredient_autocomplete)
+    async def ton_kho_slash(self, interaction: discord.Interaction, ten_nguyen_lieu: Optional[str] = None):
+        await self._run_slash(interaction, "tồn kho", self._ton_kho_response, (ten_nguyen_lieu or '').strip())
+
 # Setup function để load cog
 async def setup(bot):
     await bot.add_cog(KhoCommands(bot))
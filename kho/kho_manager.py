@@ -4,8 +4,10 @@ Kho Manager - Quản lý giao tiếp với Google Apps Script backend cho chức
 
 import requests
 import logging
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 from config import Config
+from monitoring.metrics import timed, is_error_status
+from .ledger import KhoLedger, LedgerError, LedgerSyncer
 
 logger = logging.getLogger(__name__)
 
@@ -14,12 +16,14 @@ class KhoManager:
     Quản lý giao tiếp với Google Apps Script backend cho chức năng quản lý kho
     """
     
-    def __init__(self, kho_url: Optional[str] = None):
+    def __init__(self, kho_url: Optional[str] = None, ledger_path: Optional[str] = None):
         """
         Khởi tạo Kho Manager
         
         Args:
             kho_url (str, optional): URL của Apps Script Web App cho kho
+            ledger_path (str, optional): File SQLite của ledger kho, mặc định Config.KHO_LEDGER_PATH
+                ('' = không dùng ledger, gửi thẳng Apps Script)
         """
         self.kho_url = kho_url or getattr(Config, 'KHO_WEB_APP_URL', None)
         
@@ -29,7 +33,36 @@ class KhoManager:
         # Timeout settings
         self.timeout = getattr(Config, 'KHO_TIMEOUT', 30)
         self.max_retries = getattr(Config, 'KHO_MAX_RETRIES', 3)
+        
+        # Ledger local: ghi giao dịch + tính tồn kho ngay, đồng bộ Apps Script chạy nền
+        ledger_path = Config.KHO_LEDGER_PATH if ledger_path is None else ledger_path
+        self.ledger = KhoLedger(ledger_path) if ledger_path else None
+        self.syncer = LedgerSyncer(self.ledger, self.send_kho_request) if self.ledger else None
+    
+    def _record(self, action: str, ten_nguyen_lieu: str, nguoi: str, payload, delta=None, balance=None) -> Dict[str, Any]:
+        """
+        Ghi giao dịch vào ledger và báo syncer (gọi trong event loop của bot). Tên gửi Apps Script
+        là tên đã có trong ledger (cùng khóa không phân biệt hoa/thường, khoảng trắng)
+        
+        Returns:
+            dict: {"status": "success", "transaction_id", "ten_nguyen_lieu", "ton_kho", "dieu_chinh", "queued"}
+                  hoặc {"status": "error", "message"}
+        """
+        try:
+            entry = self.ledger.record(action, ten_nguyen_lieu, nguoi, payload=payload, delta=delta, balance=balance)
+        except LedgerError as e:
+            return {"status": "error", "message": str(e)}
+        self.syncer.notify()
+        return {
+            "status": "success",
+            "transaction_id": entry.id,
+            "ten_nguyen_lieu": entry.item,
+            "ton_kho": entry.balance,
+            "dieu_chinh": entry.adjusted,
+            "queued": True
+        }
     
+    @timed('appscript_kho', 'request', failure=is_error_status)
     def send_kho_request(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Gửi request đến Google Apps Script backend cho kho
@@ -47,7 +80,7 @@ class KhoManager:
             }
         
         try:
-            logger.info(f"Sending kho request: {data}")
+            logger.debug("Sending kho request: %s", data)
             
             response = requests.post(
                 self.kho_url,
@@ -59,84 +92,97 @@ class KhoManager:
             response.raise_for_status()
             result = response.json()
             
-            logger.info(f"Kho response: {result}")
+            logger.debug("Kho response: %s", result)
             return result
             
         except requests.exceptions.Timeout:
-            logger.error(f"Timeout when sending kho request: {data}")
+            logger.error("Timeout when sending kho request: %s", data)
             return {
                 "status": "error",
                 "message": "Request timeout - Apps Script không phản hồi"
             }
             
         except requests.exceptions.RequestException as e:
-            logger.error(f"Request error when sending kho request: {e}")
+            logger.error("Request error when sending kho request: %s", e)
             return {
                 "status": "error",
                 "message": f"Lỗi kết nối: {str(e)}"
             }
             
         except ValueError as e:
-            logger.error(f"JSON parse error from kho response: {e}")
+            logger.error("JSON parse error from kho response: %s", e)
             return {
                 "status": "error",
                 "message": "Response không đúng định dạng JSON"
             }
             
         except Exception as e:
-            logger.error(f"Unexpected error when sending kho request: {e}")
+            logger.error("Unexpected error when sending kho request: %s", e)
             return {
                 "status": "error",
                 "message": f"Lỗi không xác định: {str(e)}"
             }
     
     def nhap_kho(self, ten_nguyen_lieu: str, so_luong_nhap: int, 
-                 tong_so_luong: str, nguoi_nhap: str) -> Dict[str, Any]:
+                 tong_so_luong: Optional[int], nguoi_nhap: str) -> Dict[str, Any]:
         """
         Nhập kho nguyên liệu
         
         Args:
             ten_nguyen_lieu (str): Tên nguyên liệu
             so_luong_nhap (int): Số lượng nhập
-            tong_so_luong (str): Tổng số lượng sau khi nhập
+            tong_so_luong (int, optional): Tổng số lượng sau khi nhập - có ledger thì được tự tính
+                khi bỏ trống, nếu nhập khác số tính được thì tồn kho local được điều chỉnh theo
             nguoi_nhap (str): Người thực hiện nhập kho
             
         Returns:
-            dict: Kết quả từ backend
+            dict: Kết quả từ backend (hoặc từ ledger, kèm "ton_kho")
         """
-        data = {
-            "action": "nhapkho",
-            "ten_nguyen_lieu": ten_nguyen_lieu,
-            "so_luong_nhap": so_luong_nhap,
-            "tong_so_luong": tong_so_luong,
-            "nguoi_nhap": nguoi_nhap
-        }
+        def payload(ten, tong):
+            return {
+                "action": "nhapkho",
+                "ten_nguyen_lieu": ten,
+                "so_luong_nhap": so_luong_nhap,
+                "tong_so_luong": str(tong),
+                "nguoi_nhap": nguoi_nhap
+            }
         
-        return self.send_kho_request(data)
+        if self.ledger:
+            return self._record("nhapkho", ten_nguyen_lieu, nguoi_nhap, payload,
+                                delta=so_luong_nhap, balance=tong_so_luong)
+        if tong_so_luong is None:
+            return {"status": "error", "message": "Thiếu tổng số lượng sau khi nhập"}
+        return self.send_kho_request(payload(ten_nguyen_lieu, tong_so_luong))
     
     def xuat_kho(self, ten_nguyen_lieu: str, so_luong_xuat: int,
-                 so_luong_con_lai: int, nguoi_xuat: str) -> Dict[str, Any]:
+                 so_luong_con_lai: Optional[int], nguoi_xuat: str) -> Dict[str, Any]:
         """
         Xuất kho nguyên liệu
         
         Args:
             ten_nguyen_lieu (str): Tên nguyên liệu
             so_luong_xuat (int): Số lượng xuất
-            so_luong_con_lai (int): Số lượng còn lại
+            so_luong_con_lai (int, optional): Số lượng còn lại - có ledger thì được tự tính khi bỏ trống
             nguoi_xuat (str): Người thực hiện xuất kho
             
         Returns:
-            dict: Kết quả từ backend
+            dict: Kết quả từ backend (hoặc từ ledger, kèm "ton_kho")
         """
-        data = {
-            "action": "xuatkho",
-            "ten_nguyen_lieu": ten_nguyen_lieu,
-            "so_luong_xuat": so_luong_xuat,
-            "so_luong_con_lai": so_luong_con_lai,
-            "nguoi_xuat": nguoi_xuat
-        }
+        def payload(ten, con_lai):
+            return {
+                "action": "xuatkho",
+                "ten_nguyen_lieu": ten,
+                "so_luong_xuat": so_luong_xuat,
+                "so_luong_con_lai": con_lai,
+                "nguoi_xuat": nguoi_xuat
+            }
         
-        return self.send_kho_request(data)
+        if self.ledger:
+            return self._record("xuatkho", ten_nguyen_lieu, nguoi_xuat, payload,
+                                delta=-so_luong_xuat, balance=so_luong_con_lai)
+        if so_luong_con_lai is None:
+            return {"status": "error", "message": "Thiếu số lượng còn lại sau khi xuất"}
+        return self.send_kho_request(payload(ten_nguyen_lieu, so_luong_con_lai))
     
     def che_bien(self, ten_nguyen_lieu: str, dung_tich: str, 
                  nguoi_che_bien: str) -> Dict[str, Any]:
@@ -158,6 +204,10 @@ class KhoManager:
             "nguoi_che_bien": nguoi_che_bien
         }
         
+        if self.ledger:
+            # Dung tích là text tự do (VD: "2 lít") - chỉ ghi log, không ảnh hưởng tồn kho
+            return self._record("chebien", ten_nguyen_lieu, nguoi_che_bien,
+                                lambda ten, _: dict(data, ten_nguyen_lieu=ten))
         return self.send_kho_request(data)
     
     def huy_nguyen_lieu(self, ten_nguyen_lieu: str, so_luong_huy: str,
@@ -182,8 +232,58 @@ class KhoManager:
             "nguoi_huy": nguoi_huy
         }
         
+        if self.ledger:
+            # Chỉ trừ tồn kho khi số lượng hủy là số nguyên và đã biết tồn kho ("1kg" chỉ ghi log)
+            delta = None
+            if so_luong_huy.strip().isdigit() and self.ledger.stock_level(ten_nguyen_lieu):
+                delta = -int(so_luong_huy)
+            return self._record("huynguyenlieu", ten_nguyen_lieu, nguoi_huy,
+                                lambda ten, _: dict(data, ten_nguyen_lieu=ten), delta=delta)
         return self.send_kho_request(data)
     
+    def ton_kho(self, ten_nguyen_lieu: str = '') -> Dict[str, Any]:
+        """
+        Tồn kho hiện tại từ ledger local (không gọi Apps Script)
+        
+        Args:
+            ten_nguyen_lieu (str): Lọc theo tên (chuỗi con, không phân biệt hoa/thường), trống = tất cả
+            
+        Returns:
+            dict: {"status": "success", "items": [{"ten_nguyen_lieu", "so_luong", "cap_nhat"}]}
+        """
+        if not self.ledger:
+            return {"status": "error", "message": "Ledger kho chưa được bật (KHO_LEDGER_PATH)"}
+        return {
+            "status": "success",
+            "items": [
+                {"ten_nguyen_lieu": level.item, "so_luong": level.quantity, "cap_nhat": level.updated_at}
+                for level in self.ledger.stock_levels(ten_nguyen_lieu)
+            ]
+        }
+    
+    def danh_sach_nguyen_lieu(self) -> List[str]:
+        """
+        Danh sách tên nguyên liệu cho autocomplete: từ backend (action "danhsach") và ledger local
+        
+        Backend chưa hỗ trợ action "danhsach" thì chỉ dùng tên trong ledger.
+        
+        Returns:
+            list: Tên nguyên liệu (có thể trùng khác hoa/thường - IngredientIndex tự gộp)
+        """
+        names: List[str] = []
+        if self.ledger:
+            names.extend(level.item for level in self.ledger.stock_levels())
+        if self.kho_url:
+            result = self.send_kho_request({"action": "danhsach"})
+            if result.get("status") == "success":
+                for item in result.get("items", []):
+                    name = item.get("ten_nguyen_lieu") if isinstance(item, dict) else item
+                    if name:
+                        names.append(str(name))
+            else:
+                logger.info("Kho backend ingredient list unavailable: %s", result.get('message'))
+        return names
+    
     def get_status(self) -> Dict[str, Any]:
         """
         Lấy trạng thái cấu hình kho
@@ -191,9 +291,19 @@ class KhoManager:
         Returns:
             dict: Thông tin trạng thái
         """
-        return {
+        status = {
             "kho_url": self.kho_url,
             "kho_configured": bool(self.kho_url),
             "timeout": self.timeout,
-            "max_retries": self.max_retries
+            "max_retries": self.max_retries,
+            "ledger": bool(self.ledger)
         }
+        if self.ledger:
+            status.update({
+                "ledger_path": self.ledger.path,
+                "items": self.ledger.item_count,
+                "pending_sync": self.ledger.pending_sync,
+                "failed_sync": self.ledger.failed_sync,
+                "last_synced_at": self.syncer.last_synced_at
+            })
+        return status
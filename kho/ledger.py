@@ -0,0 +1,360 @@
+"""
+Kho Ledger - sổ giao dịch kho local (SQLite, WAL) chỉ ghi thêm, kèm tồn kho từng nguyên liệu
+được cập nhật cùng transaction và outbox đồng bộ lên Apps Script chạy nền
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from config import Config
+from monitoring.metrics import EXTERNAL_RETRIES
+
+logger = logging.getLogger(__name__)
+
+ADJUSTMENT_ACTION = 'dieuchinh'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    action TEXT NOT NULL,
+    item_key TEXT NOT NULL,
+    item TEXT NOT NULL,
+    delta INTEGER,              -- NULL: không ảnh hưởng tồn kho (chế biến, hủy không định lượng)
+    balance INTEGER,            -- tồn kho sau giao dịch (NULL nếu chưa biết)
+    actor TEXT NOT NULL DEFAULT '',
+    payload TEXT                -- JSON gửi Apps Script, NULL với giao dịch chỉ có ở local
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_item ON transactions (item_key, id);
+
+CREATE TABLE IF NOT EXISTS stock (
+    item_key TEXT PRIMARY KEY,
+    item TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    last_transaction INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS outbox (
+    transaction_id INTEGER PRIMARY KEY REFERENCES transactions (id),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+"""
+
+
+class LedgerError(ValueError):
+    """Giao dịch không hợp lệ với tồn kho hiện tại (message hiển thị được cho người dùng)"""
+
+
+def item_key(name: str) -> str:
+    """Khóa so khớp tên nguyên liệu: bỏ khoảng trắng thừa, không phân biệt hoa/thường"""
+    return ' '.join(str(name).split()).casefold()
+
+
+@dataclass
+class LedgerEntry:
+    """Một giao dịch đã ghi vào ledger"""
+    id: int
+    action: str
+    item: str
+    delta: Optional[int]
+    balance: Optional[int]
+    adjusted: Optional[int] = None  # Chênh lệch đã điều chỉnh khi tổng người dùng nhập khác tồn kho local
+
+
+@dataclass
+class StockLevel:
+    item: str
+    quantity: int
+    updated_at: float
+
+
+class KhoLedger:
+    """
+    Ledger giao dịch kho trên SQLite (WAL).
+
+    - `transactions` chỉ ghi thêm; `stock` là tồn kho materialized, cập nhật trong cùng transaction
+      nên đọc tồn kho chỉ là một lookup theo khóa.
+    - Giao dịch cần gửi Apps Script được ghi vào `outbox` cùng lúc; LedgerSyncer gửi theo thứ tự và
+      xóa khỏi outbox khi thành công.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path (str): File SQLite, mặc định Config.KHO_LEDGER_PATH (':memory:' cho test/benchmark)
+        """
+        self.path = path or Config.KHO_LEDGER_PATH
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        logger.info("Kho ledger opened: %s (%s item(s), %s pending sync)", self.path, self.item_count, self.pending_sync)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record(
+        self,
+        action: str,
+        item: str,
+        actor: str,
+        payload: Optional[Callable[[str, Optional[int]], Dict[str, Any]]] = None,
+        delta: Optional[int] = None,
+        balance: Optional[int] = None
+    ) -> LedgerEntry:
+        """
+        Ghi một giao dịch và cập nhật tồn kho (một SQLite transaction)
+
+        Args:
+            action (str): nhapkho | xuatkho | chebien | huynguyenlieu
+            item (str): Tên nguyên liệu
+            actor (str): Người thực hiện
+            payload: Hàm nhận (tên chuẩn của nguyên liệu, tồn kho sau giao dịch), trả về JSON gửi
+                Apps Script (None = chỉ ghi local)
+            delta (int): Thay đổi tồn kho (+ nhập, - xuất), None nếu không ảnh hưởng tồn kho
+            balance (int): Tồn kho sau giao dịch do người dùng nhập; nếu khác số tính được thì
+                ghi thêm một giao dịch điều chỉnh trước
+
+        Returns:
+            LedgerEntry: Giao dịch đã ghi
+
+        Raises:
+            LedgerError: Chưa có tồn kho của nguyên liệu mà không có số tổng, hoặc tồn kho không đủ
+        """
+        key = item_key(item)
+        name = ' '.join(str(item).split())
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT item, quantity FROM stock WHERE item_key = ?', (key,)).fetchone()
+                current = row['quantity'] if row else None
+                if row:
+                    name = row['item']
+
+                adjusted = None
+                new_balance = current
+                if delta is not None:
+                    if balance is not None:
+                        before = balance - delta
+                        if current != before:
+                            adjusted = before - (current or 0)
+                            self._insert(conn, now, ADJUSTMENT_ACTION, key, name, adjusted, before, actor, None)
+                        new_balance = balance
+                    elif current is None:
+                        raise LedgerError(f"Chưa có tồn kho của '{name}' - lần đầu hãy nhập kèm tổng số lượng")
+                    else:
+                        new_balance = current + delta
+                    if new_balance < 0:
+                        raise LedgerError(f"Không đủ tồn kho '{name}': còn {current}, cần {-delta}")
+
+                body = payload(name, new_balance) if payload else None
+                entry_id = self._insert(conn, now, action, key, name, delta, new_balance, actor, body)
+                if new_balance is not None:
+                    conn.execute(
+                        'INSERT INTO stock (item_key, item, quantity, updated_at, last_transaction) VALUES (?, ?, ?, ?, ?) '
+                        'ON CONFLICT (item_key) DO UPDATE SET quantity = excluded.quantity, '
+                        'updated_at = excluded.updated_at, last_transaction = excluded.last_transaction',
+                        (key, name, new_balance, now, entry_id)
+                    )
+                if body is not None:
+                    conn.execute('INSERT INTO outbox (transaction_id) VALUES (?)', (entry_id,))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return LedgerEntry(entry_id, action, name, delta, new_balance, adjusted)
+
+    @staticmethod
+    def _insert(conn, now, action, key, name, delta, balance, actor, payload) -> int:
+        cursor = conn.execute(
+            'INSERT INTO transactions (created_at, action, item_key, item, delta, balance, actor, payload) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (now, action, key, name, delta, balance, actor,
+             json.dumps(payload, ensure_ascii=False) if payload is not None else None)
+        )
+        return cursor.lastrowid
+
+    def stock_level(self, item: str) -> Optional[StockLevel]:
+        """Tồn kho hiện tại của một nguyên liệu, None nếu chưa có"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT item, quantity, updated_at FROM stock WHERE item_key = ?', (item_key(item),)
+            ).fetchone()
+        return StockLevel(row['item'], row['quantity'], row['updated_at']) if row else None
+
+    def stock_levels(self, contains: str = '') -> List[StockLevel]:
+        """Tồn kho tất cả nguyên liệu (lọc theo chuỗi con của tên), sắp xếp theo tên"""
+        with self._lock:
+            rows = self._conn.execute('SELECT item_key, item, quantity, updated_at FROM stock ORDER BY item_key').fetchall()
+        needle = item_key(contains)
+        return [StockLevel(row['item'], row['quantity'], row['updated_at'])
+                for row in rows if needle in row['item_key']]
+
+    def history(self, item: str, limit: int = 10) -> List[dict]:
+        """Các giao dịch gần nhất của một nguyên liệu (mới nhất trước)"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, created_at, action, delta, balance, actor FROM transactions '
+                'WHERE item_key = ? ORDER BY id DESC LIMIT ?', (item_key(item), limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    @property
+    def item_count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM stock').fetchone()[0]
+
+    @property
+    def pending_sync(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM outbox WHERE failed = 0').fetchone()[0]
+
+    @property
+    def failed_sync(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM outbox WHERE failed = 1').fetchone()[0]
+
+    def pending(self, limit: int = 50) -> List[dict]:
+        """Giao dịch chờ gửi Apps Script theo thứ tự ghi: [{'id', 'payload', 'attempts'}]"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT t.id, t.payload, o.attempts FROM outbox o JOIN transactions t ON t.id = o.transaction_id '
+                'WHERE o.failed = 0 ORDER BY o.transaction_id LIMIT ?', (limit,)
+            ).fetchall()
+        return [{'id': row['id'], 'payload': json.loads(row['payload']), 'attempts': row['attempts']} for row in rows]
+
+    def mark_synced(self, transaction_id: int):
+        with self._lock:
+            self._conn.execute('DELETE FROM outbox WHERE transaction_id = ?', (transaction_id,))
+
+    def mark_attempt(self, transaction_id: int, error: str, failed: bool = False):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE outbox SET attempts = attempts + 1, last_error = ?, failed = ? WHERE transaction_id = ?',
+                (error, int(failed), transaction_id)
+            )
+
+
+class LedgerSyncer:
+    """
+    Gửi outbox của ledger lên Apps Script trong event loop của bot.
+
+    Gửi tuần tự theo thứ tự giao dịch (sheet kho là log theo thời gian); lỗi thì dừng và thử lại
+    với backoff tăng dần. Giao dịch lỗi quá `max_attempts` lần được đánh dấu failed và bỏ qua
+    để không chặn các giao dịch sau.
+    """
+
+    def __init__(
+        self,
+        ledger: KhoLedger,
+        send: Callable[[Dict[str, Any]], Dict[str, Any]],
+        max_attempts: Optional[int] = None,
+        retry_delay: float = 30.0,
+        max_delay: float = 600.0
+    ):
+        """
+        Args:
+            ledger (KhoLedger): Ledger chứa outbox
+            send: Hàm blocking gửi payload, trả về response Apps Script ({'status': 'success'|'error'})
+            max_attempts (int): Số lần thử tối đa mỗi giao dịch, mặc định Config.KHO_SYNC_MAX_ATTEMPTS
+            retry_delay (float): Thời gian chờ lần thử lại đầu tiên (giây), nhân đôi mỗi lần
+            max_delay (float): Thời gian chờ tối đa giữa các lần thử
+        """
+        self.ledger = ledger
+        self.send = send
+        self.max_attempts = max_attempts or Config.KHO_SYNC_MAX_ATTEMPTS
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+        self.synced = 0
+        self.last_synced_at: Optional[float] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Khởi động vòng lặp (gọi trong event loop của bot)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info("Kho ledger sync started (%s pending)", self.ledger.pending_sync)
+
+    async def stop(self):
+        """Dừng vòng lặp"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self):
+        """Có giao dịch mới trong outbox"""
+        self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """
+        Gửi toàn bộ outbox
+
+        Returns:
+            bool: True nếu outbox đã trống, False nếu dừng do lỗi
+        """
+        while True:
+            batch = await asyncio.to_thread(self.ledger.pending)
+            if not batch:
+                return True
+            for entry in batch:
+                if entry['attempts']:
+                    EXTERNAL_RETRIES.inc(service='appscript_kho', operation='sync')
+                try:
+                    # transaction_id để backend bỏ qua bản ghi trùng khi gửi lại sau timeout
+                    result = await asyncio.to_thread(self.send, dict(entry['payload'], transaction_id=entry['id']))
+                except Exception as e:
+                    result = {'status': 'error', 'message': str(e)}
+                if result.get('status') == 'success':
+                    self.ledger.mark_synced(entry['id'])
+                    self.synced += 1
+                    self.last_synced_at = time.time()
+                    continue
+                error = result.get('message', 'Không rõ nguyên nhân')
+                failed = entry['attempts'] + 1 >= self.max_attempts
+                self.ledger.mark_attempt(entry['id'], error, failed=failed)
+                if failed:
+                    logger.error("Kho transaction %s failed %s times, skipped: %s", entry['id'], self.max_attempts, error)
+                    continue
+                logger.warning("Kho transaction %s sync failed (attempt %s): %s", entry['id'], entry['attempts'] + 1, error)
+                return False
+
+    async def _run(self):
+        delay = self.retry_delay
+        while True:
+            self._wakeup.clear()
+            try:
+                done = await self.flush()
+            except Exception as e:
+                logger.error("Kho ledger sync error: %s", e)
+                done = False
+            if done:
+                delay = self.retry_delay
+                await self._wakeup.wait()
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.max_delay)
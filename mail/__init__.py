@@ -1,4 +1,4 @@
 # Mail Module - Google Apps Script Email System
-from .email_manager import EmailManager
+from .email_manager import EmailManager, EmailMessage
 
-__all__ = ['EmailManager']
+__all__ = ['EmailManager', 'EmailMessage']
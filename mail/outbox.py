@@ -0,0 +1,104 @@
+"""
+Email Outbox - gom các email được gửi gần như cùng lúc (VD: nhiều admin xác nhận booking
+liên tiếp) thành một batch POST tới Apps Script
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutbox:
+    """
+    Hàng đợi email với một worker thread.
+
+    - `submit()` trả về Future[bool]; người gọi (thường đang ở asyncio.to_thread) chờ kết quả.
+    - Group commit: worker gửi ngay những gì đang chờ (tối đa `max_batch`) - lúc ít tải
+      email đi ngay, lúc nhiều tải các email tới trong khi request trước còn chạy được gom
+      thành batch kế tiếp. `linger` > 0 cho phép chờ thêm để gom batch lớn hơn.
+    - Một email thì gửi đơn, nhiều email thì gửi batch.
+    """
+
+    def __init__(
+        self,
+        send_one: Callable[[object], bool],
+        send_batch: Callable[[List[object]], List[bool]],
+        max_batch: int = 25,
+        linger: float = 0.0
+    ):
+        """
+        Args:
+            send_one: Hàm gửi một email, trả về True nếu thành công
+            send_batch: Hàm gửi nhiều email, trả về kết quả theo thứ tự
+            max_batch (int): Số email tối đa mỗi batch
+            linger (float): Thời gian chờ thêm để gom email (giây)
+        """
+        self.send_one = send_one
+        self.send_batch = send_batch
+        self.max_batch = max(1, max_batch)
+        self.linger = linger
+        self._pending: Deque[Tuple[object, Future]] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def submit(self, message) -> Future:
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Email outbox is closed")
+            self._pending.append((message, future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='EmailOutbox', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+            self._cond.notify()
+        return future
+
+    def _take_batch(self) -> List[Tuple[object, Future]]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            deadline = time.monotonic() + self.linger
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return  # closed và đã gửi hết
+            messages = [message for message, _ in batch]
+            try:
+                if len(messages) == 1:
+                    results = [self.send_one(messages[0])]
+                else:
+                    logger.debug("Sending %s queued emails as one batch", len(messages))
+                    results = self.send_batch(messages)
+            except Exception as e:
+                logger.error("Email outbox send failed: %s", e)
+                results = [False] * len(messages)
+            for (_, future), ok in zip(batch, results):
+                future.set_result(bool(ok))
+
+    def close(self, timeout: float = 30.0):
+        """Gửi nốt các email đang chờ rồi dừng worker"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
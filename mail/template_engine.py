@@ -0,0 +1,182 @@
+"""
+Email Template Engine - template email được load và biên dịch một lần (theo loại và locale),
+mỗi lần gửi chỉ còn điền các slot vào các đoạn tĩnh đã minify sẵn
+"""
+
+import html
+import json
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+
+from config import Config
+from models.booking import Booking
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = Path(__file__).parent / 'templates'
+TEMPLATE_TYPES = ('confirmation', 'cancellation', 'error', 'reminder')
+NOW_FORMAT = "%d/%m/%Y lúc %H:%M"
+
+_SLOT = re.compile(r'\{\{(\w+)\}\}')
+_TAG_GAP = re.compile(r'>\s*\n\s*<')
+_WHITESPACE_RUN = re.compile(r'\s*\n\s*')
+
+
+def minify_html(source: str) -> str:
+    """
+    Bỏ thụt lề và xuống dòng giữa các thẻ. Chỉ gộp khoảng trắng có chứa xuống dòng,
+    khoảng trắng trong cùng một dòng (VD: `</strong> <span>`) được giữ nguyên.
+    """
+    return _WHITESPACE_RUN.sub(' ', _TAG_GAP.sub('><', source)).strip()
+
+
+class CompiledTemplate:
+    """
+    Template biên dịch sẵn thành một hàm Python (giống cách Jinja biên dịch template):
+    các đoạn tĩnh là hằng số, slot trong `constants` (thông tin công ty) được điền ngay lúc
+    biên dịch, render chỉ còn một lần nối chuỗi - không parse lại template mỗi lần gửi.
+    """
+
+    __slots__ = ('name', 'slots', 'escaped', 'render')
+
+    def __init__(self, name: str, source: str, constants: Dict[str, str], escaped: bool = False):
+        self.name = name
+        self.escaped = escaped
+        namespace: Dict[str, str] = {}
+        pieces: List[str] = []
+        slots: List[str] = []
+        static = ''
+
+        def flush():
+            nonlocal static
+            if static:
+                key = f'_s{len(namespace)}'
+                namespace[key] = static
+                pieces.append('{' + key + '}')
+                static = ''
+
+        position = 0
+        for match in _SLOT.finditer(source):
+            static += source[position:match.start()]
+            slot = match.group(1)
+            if slot in constants:
+                static += html.escape(constants[slot]) if escaped else constants[slot]
+            else:
+                flush()
+                pieces.append('{values[' + repr(slot) + ']}')
+                if slot not in slots:
+                    slots.append(slot)
+            position = match.end()
+        static += source[position:]
+        flush()
+
+        code = f"def render(values):\n    return f{''.join(pieces)!r}\n"
+        exec(compile(code, f'<email template {name}>', 'exec'), namespace)
+        self.slots = tuple(slots)
+        # render(values) -> str; values đã escape nếu là template HTML (xem EmailTemplates.render)
+        self.render = namespace['render']
+
+
+class EmailTemplates:
+    """
+    Bộ template email đã biên dịch cho mọi locale có trong thư mục template
+    (mail/templates/<locale>/{<type>.html, <type>.txt, subjects.json})
+    """
+
+    def __init__(self, directory: Path = TEMPLATE_DIR, default_locale: Optional[str] = None,
+                 timezone: Optional[str] = None):
+        self.directory = Path(directory)
+        self.default_locale = default_locale or Config.EMAIL_LOCALE
+        self.timezone = pytz.timezone(timezone or Config.TIMEZONE)
+        self.constants = {
+            'company_name': Config.COMPANY_NAME,
+            'company_email': Config.COMPANY_EMAIL,
+            'company_phone': Config.COMPANY_PHONE,
+        }
+        # (locale, type) -> (subject, html, text)
+        self._compiled: Dict[Tuple[str, str], Tuple[CompiledTemplate, CompiledTemplate, CompiledTemplate]] = {}
+        self._now_cache: Tuple[int, str] = (-1, '')
+        self._load()
+
+    def _load(self):
+        for locale_dir in sorted(p for p in self.directory.iterdir() if p.is_dir()):
+            locale = locale_dir.name
+            subjects = json.loads((locale_dir / 'subjects.json').read_text(encoding='utf-8'))
+            for template_type in TEMPLATE_TYPES:
+                html_source = (locale_dir / f'{template_type}.html').read_text(encoding='utf-8')
+                text_source = (locale_dir / f'{template_type}.txt').read_text(encoding='utf-8')
+                self._compiled[(locale, template_type)] = (
+                    CompiledTemplate(f'{locale}/{template_type}.subject', subjects[template_type], self.constants),
+                    CompiledTemplate(f'{locale}/{template_type}.html', minify_html(html_source), self.constants,
+                                     escaped=True),
+                    CompiledTemplate(f'{locale}/{template_type}.txt', text_source.strip(), self.constants),
+                )
+        if not any(locale == self.default_locale for locale, _ in self._compiled):
+            raise ValueError(f"No email templates for default locale '{self.default_locale}' in {self.directory}")
+        logger.debug("Compiled %s email templates from %s", len(self._compiled), self.directory)
+
+    @property
+    def locales(self) -> List[str]:
+        return sorted({locale for locale, _ in self._compiled})
+
+    def _formatted_now(self) -> str:
+        """Thời điểm hiện tại theo timezone cấu hình (độ chính xác phút, cache theo phút)"""
+        minute = int(time.time() // 60)
+        cached = self._now_cache
+        if cached[0] != minute:
+            cached = self._now_cache = (minute, datetime.now(self.timezone).strftime(NOW_FORMAT))
+        return cached[1]
+
+    def slot_values(self, booking: Booking, now: Optional[datetime] = None) -> Dict[str, str]:
+        return {
+            'customer_name': booking.name or 'Quý khách',
+            'booking_date': booking.date or '',
+            'booking_time': (booking.time_display if booking.start_time else '') or '',
+            'room': booking.room or '',
+            'formatted_time': now.strftime(NOW_FORMAT) if now else self._formatted_now(),
+        }
+
+    def render(self, template_type: str, booking: Booking, locale: Optional[str] = None,
+               now: Optional[datetime] = None) -> Tuple[str, str, str]:
+        """
+        Render email cho booking
+
+        Args:
+            template_type (str): 'confirmation', 'cancellation', 'error' hoặc 'reminder'
+            booking (Booking): Thông tin booking
+            locale (str, optional): Locale, mặc định Config.EMAIL_LOCALE (fallback nếu không có)
+            now (datetime, optional): Thời điểm hiển thị trong email
+
+        Returns:
+            tuple: (subject, html_body, text_body)
+        """
+        templates = self._compiled.get((locale or self.default_locale, template_type))
+        if templates is None:
+            templates = self._compiled.get((self.default_locale, template_type))
+        if templates is None:
+            raise ValueError(f"Unknown email template type: {template_type}")
+        values = self.slot_values(booking, now)
+        escaped = {slot: html.escape(value) for slot, value in values.items()}
+        subject, html_template, text_template = templates
+        return subject.render(values), html_template.render(escaped), text_template.render(values)
+
+
+_templates: Optional[EmailTemplates] = None
+_templates_lock = threading.Lock()
+
+
+def get_templates() -> EmailTemplates:
+    """Bộ template dùng chung (biên dịch lần đầu được gọi - khi EmailManager khởi tạo)"""
+    global _templates
+    if _templates is None:
+        with _templates_lock:
+            if _templates is None:
+                _templates = EmailTemplates()
+    return _templates
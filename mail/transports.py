@@ -0,0 +1,471 @@
+"""
+Mail Transports - cách gửi email, chọn theo Config.EMAIL_PROVIDER:
+
+    appscript  Google Apps Script Web App qua HTTPS (mặc định, không cần mở port SMTP trên VPS)
+    smtp       SMTP server (pool connection, STARTTLS/SSL)
+    file       Ghi ra Maildir hoặc JSON lines - dùng cho dev, test và benchmark
+
+Mọi transport có cùng interface đồng bộ (send, send_batch, test_connection, close), tự retry
+lỗi tạm thời và an toàn khi gọi từ nhiều thread; phần bất đồng bộ (gom batch, không chặn
+event loop) do EmailOutbox đảm nhận.
+"""
+
+import json
+import logging
+import mailbox
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from monitoring.metrics import EXTERNAL_RETRIES
+from .message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+
+class MailTransport:
+    """Interface chung của các transport"""
+
+    name = 'base'
+
+    def send(self, message: EmailMessage) -> bool:
+        raise NotImplementedError
+
+    def send_batch(self, messages: List[EmailMessage]) -> List[bool]:
+        """Mặc định gửi lần lượt; transport có cách gửi gộp hiệu quả hơn thì override"""
+        return [self.send(message) for message in messages]
+
+    def test_connection(self) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+
+class AppScriptTransport(MailTransport):
+    """Gửi qua Google Apps Script Web App (google_apps_script_email.js)"""
+
+    name = 'appscript'
+
+    HEADERS = {
+        'Content-Type': 'application/json',
+        'User-Agent': 'Discord-Booking-Bot/1.0'
+    }
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        pool_size: int = 4
+    ):
+        self.url = url or getattr(Config, 'APPSCRIPT_WEBHOOK_URL', None)
+        if not self.url:
+            logger.warning("APPSCRIPT_WEBHOOK_URL not configured. Email sending will be disabled.")
+        self.timeout = timeout or getattr(Config, 'APPSCRIPT_TIMEOUT', 30)
+        self.max_retries = max_retries or getattr(Config, 'APPSCRIPT_MAX_RETRIES', 3)
+        self.batch_size = batch_size or getattr(Config, 'EMAIL_BATCH_SIZE', 25)
+        self._batch_supported = True
+
+        # Giữ kết nối TLS tới script.google.com giữa các lần gửi
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def send(self, message: EmailMessage) -> bool:
+        if not self.url:
+            logger.error("AppScript URL not configured. Cannot send email.")
+            return False
+
+        payload = message.to_payload()
+        del payload['id']
+
+        # Thử gửi với retry mechanism
+        for attempt in range(self.max_retries):
+            if attempt > 0:
+                EXTERNAL_RETRIES.inc(service='email', operation='send')
+            try:
+                logger.debug("Sending email to %s via AppScript (attempt %s/%s)", message.to, attempt + 1, self.max_retries)
+
+                response = self.session.post(self.url, json=payload, headers=self.HEADERS, timeout=self.timeout)
+
+                # Kiểm tra response
+                if response.status_code == 200:
+                    response_data = response.json()
+
+                    if response_data.get('success', False):
+                        logger.info("Email sent successfully to %s via AppScript", message.to)
+                        return True
+                    else:
+                        error_msg = response_data.get('error', 'Unknown error from AppScript')
+                        logger.error("AppScript returned error: %s", error_msg)
+
+                else:
+                    logger.error("AppScript request failed with status %s: %s", response.status_code, response.text)
+
+            except requests.exceptions.Timeout:
+                logger.warning("Request to AppScript timed out (attempt %s)", attempt + 1)
+
+            except requests.exceptions.ConnectionError:
+                logger.warning("Connection error to AppScript (attempt %s)", attempt + 1)
+
+            except requests.exceptions.RequestException as e:
+                logger.error("Request error to AppScript: %s", e)
+
+            except Exception as e:
+                logger.error("Unexpected error sending email via AppScript: %s", e)
+
+            # Nếu không phải lần thử cuối, chờ một chút trước khi retry
+            if attempt < self.max_retries - 1:
+                time.sleep(2 ** attempt)  # Exponential backoff
+
+        logger.error("Failed to send email to %s after %s attempts", message.to, self.max_retries)
+        return False
+
+    def send_batch(self, messages: List[EmailMessage]) -> List[bool]:
+        """Mỗi POST tối đa `batch_size` email; tự chuyển về gửi từng email nếu script chưa hỗ trợ batch"""
+        if not self.url:
+            logger.error("AppScript URL not configured. Cannot send email.")
+            return [False] * len(messages)
+
+        results: List[bool] = []
+        for start in range(0, len(messages), self.batch_size):
+            chunk = messages[start:start + self.batch_size]
+            chunk_results = self._post_batch(chunk) if self._batch_supported and len(chunk) > 1 else None
+            if chunk_results is None:
+                chunk_results = [self.send(message) for message in chunk]
+            results.extend(chunk_results)
+        return results
+
+    def _post_batch(self, chunk: List[EmailMessage]) -> Optional[List[bool]]:
+        """
+        POST một batch
+
+        Returns:
+            Optional[List[bool]]: Kết quả từng email, None nếu Apps Script chưa hỗ trợ batch
+        """
+        payload = {'messages': [message.to_payload() for message in chunk]}
+        # MailApp gửi tuần tự trong Apps Script: cho thêm thời gian theo số email
+        timeout = self.timeout + len(chunk)
+
+        for attempt in range(self.max_retries):
+            if attempt > 0:
+                EXTERNAL_RETRIES.inc(service='email', operation='send_batch')
+            try:
+                logger.debug("Sending batch of %s emails via AppScript (attempt %s/%s)", len(chunk), attempt + 1, self.max_retries)
+                response = self.session.post(self.url, json=payload, headers=self.HEADERS, timeout=timeout)
+
+                if response.status_code == 200:
+                    response_data = response.json()
+                    if 'results' not in response_data:
+                        logger.warning("AppScript does not support batch emails (redeploy google_apps_script_email.js); "
+                                       "falling back to one request per email")
+                        self._batch_supported = False
+                        return None
+
+                    by_id = {result.get('id'): result for result in response_data['results']}
+                    results = []
+                    for message in chunk:
+                        result = by_id.get(message.id) or {}
+                        if not result.get('success'):
+                            logger.error("AppScript failed to send email to %s: %s", message.to, result.get('error', 'no result'))
+                        results.append(bool(result.get('success')))
+                    return results
+
+                logger.error("AppScript batch request failed with status %s: %s", response.status_code, response.text)
+
+            # Retry an toàn: Apps Script bỏ qua các message id đã gửi
+            except requests.exceptions.Timeout:
+                logger.warning("Batch request to AppScript timed out (attempt %s)", attempt + 1)
+
+            except requests.exceptions.ConnectionError:
+                logger.warning("Connection error to AppScript (attempt %s)", attempt + 1)
+
+            except requests.exceptions.RequestException as e:
+                logger.error("Request error to AppScript: %s", e)
+
+            except Exception as e:
+                logger.error("Unexpected error sending email batch via AppScript: %s", e)
+
+            if attempt < self.max_retries - 1:
+                time.sleep(2 ** attempt)  # Exponential backoff
+
+        logger.error("Failed to send batch of %s emails after %s attempts", len(chunk), self.max_retries)
+        return [False] * len(chunk)
+
+    def test_connection(self) -> bool:
+        """Test kết nối đến Apps Script Web App"""
+        if not self.url:
+            logger.error("AppScript URL not configured")
+            return False
+
+        test_payload = {
+            'to': 'test@example.com',
+            'subject': 'Test Email Connection',
+            'body': 'This is a test email to verify Apps Script connection.',
+            'test': True  # Flag để Apps Script biết đây là test, không gửi email thật
+        }
+
+        try:
+            response = self.session.post(self.url, json=test_payload, headers=self.HEADERS, timeout=self.timeout)
+
+            if response.status_code == 200:
+                logger.info("Apps Script connection test successful")
+                return True
+            else:
+                logger.error("Apps Script connection test failed: %s", response.status_code)
+                return False
+
+        except Exception as e:
+            logger.error("Apps Script connection test error: %s", e)
+            return False
+
+    def close(self):
+        self.session.close()
+
+
+class SMTPTransport(MailTransport):
+    """
+    Gửi qua SMTP với pool tối đa `pool_size` connection; connection được giữ lại giữa các
+    lần gửi và tạo lại khi server đã đóng (idle timeout)
+    """
+
+    name = 'smtp'
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: Optional[bool] = None,
+        use_ssl: Optional[bool] = None,
+        from_addr: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        pool_size: Optional[int] = None
+    ):
+        self.host = host or Config.SMTP_HOST
+        self.port = port or Config.SMTP_PORT
+        self.username = username if username is not None else Config.SMTP_USERNAME
+        self.password = password if password is not None else Config.SMTP_PASSWORD
+        self.use_tls = Config.SMTP_USE_TLS if use_tls is None else use_tls
+        self.use_ssl = Config.SMTP_USE_SSL if use_ssl is None else use_ssl
+        self.from_addr = from_addr or Config.SMTP_FROM or self.username or Config.COMPANY_EMAIL
+        self.timeout = timeout or getattr(Config, 'APPSCRIPT_TIMEOUT', 30)
+        self.max_retries = max_retries or getattr(Config, 'APPSCRIPT_MAX_RETRIES', 3)
+        pool_size = pool_size or Config.SMTP_POOL_SIZE
+        self._idle: 'queue.LifoQueue[smtplib.SMTP]' = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _connect(self) -> smtplib.SMTP:
+        context = ssl.create_default_context()
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=context)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                smtp.starttls(context=context)
+        if self.username:
+            smtp.login(self.username, self.password or '')
+        logger.debug("Opened SMTP connection to %s:%s", self.host, self.port)
+        return smtp
+
+    @contextmanager
+    def _connection(self):
+        """Mượn một connection từ pool; connection lỗi bị bỏ, không trả lại pool"""
+        with self._slots:
+            try:
+                smtp = self._idle.get_nowait()
+            except queue.Empty:
+                smtp = self._connect()
+            try:
+                yield smtp
+            except BaseException:
+                self._discard(smtp)
+                raise
+            else:
+                self._idle.put(smtp)
+
+    @staticmethod
+    def _discard(smtp: smtplib.SMTP):
+        try:
+            smtp.close()
+        except Exception:
+            pass
+
+    def _send_with(self, smtp: smtplib.SMTP, message: EmailMessage):
+        smtp.send_message(message.to_mime(self.from_addr), from_addr=self.from_addr, to_addrs=[message.to])
+
+    def _send_chunk(self, messages: List[EmailMessage]) -> List[bool]:
+        """Gửi các message trên cùng một connection, retry phần còn lại khi connection hỏng"""
+        results: List[Optional[bool]] = [None] * len(messages)
+        for attempt in range(self.max_retries):
+            if attempt > 0:
+                EXTERNAL_RETRIES.inc(service='email', operation='send')
+                time.sleep(2 ** (attempt - 1))  # Exponential backoff
+            try:
+                with self._connection() as smtp:
+                    for i, message in enumerate(messages):
+                        if results[i] is not None:
+                            continue
+                        try:
+                            self._send_with(smtp, message)
+                            results[i] = True
+                        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                            # Lỗi vĩnh viễn của riêng message này - không retry
+                            logger.error("SMTP rejected email to %s: %s", message.to, e)
+                            results[i] = False
+                return [bool(result) for result in results]
+            except (smtplib.SMTPException, OSError) as e:
+                logger.warning("SMTP error (attempt %s/%s): %s", attempt + 1, self.max_retries, e)
+
+        logger.error("Failed to send %s emails via SMTP after %s attempts", results.count(None), self.max_retries)
+        return [bool(result) for result in results]
+
+    def send(self, message: EmailMessage) -> bool:
+        return self._send_chunk([message])[0]
+
+    def send_batch(self, messages: List[EmailMessage]) -> List[bool]:
+        return self._send_chunk(messages)
+
+    def test_connection(self) -> bool:
+        try:
+            with self._connection() as smtp:
+                code, _ = smtp.noop()
+            return code == 250
+        except Exception as e:
+            logger.error("SMTP connection test error: %s", e)
+            return False
+
+    def close(self):
+        while True:
+            try:
+                smtp = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                smtp.quit()
+            except Exception:
+                self._discard(smtp)
+
+
+class FileTransport(MailTransport):
+    """
+    Ghi email ra đĩa thay vì gửi: `maildir` (mở được bằng mutt/Thunderbird) hoặc `jsonl`
+    (một dòng JSON mỗi email, nhanh nhất - dùng cho load test)
+    """
+
+    name = 'file'
+
+    def __init__(self, path: Optional[str] = None, fmt: Optional[str] = None, from_addr: Optional[str] = None):
+        self.path = Path(path or Config.EMAIL_FILE_PATH)
+        self.format = (fmt or Config.EMAIL_FILE_FORMAT).lower()
+        self.from_addr = from_addr or Config.SMTP_FROM or Config.COMPANY_EMAIL
+        self._lock = threading.Lock()
+        if self.format == 'maildir':
+            self._maildir = mailbox.Maildir(str(self.path), create=True)
+        elif self.format == 'jsonl':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        else:
+            raise ValueError(f"Unknown EMAIL_FILE_FORMAT: {self.format} (maildir, jsonl)")
+        logger.info("Email file transport writing %s to %s", self.format, self.path)
+
+    def send(self, message: EmailMessage) -> bool:
+        return self.send_batch([message])[0]
+
+    def send_batch(self, messages: List[EmailMessage]) -> List[bool]:
+        try:
+            if self.format == 'maildir':
+                mimes = [message.to_mime(self.from_addr) for message in messages]
+                with self._lock:
+                    for mime in mimes:
+                        self._maildir.add(mime)
+            else:
+                lines = ''.join(json.dumps(message.to_payload(), ensure_ascii=False) + '\n' for message in messages)
+                with self._lock:
+                    self._file.write(lines)
+                    self._file.flush()
+            return [True] * len(messages)
+        except OSError as e:
+            logger.error("Failed to write emails to %s: %s", self.path, e)
+            return [False] * len(messages)
+
+    def close(self):
+        if self.format == 'jsonl':
+            with self._lock:
+                self._file.close()
+
+
+class FailoverTransport(MailTransport):
+    """Gửi bằng transport chính; email gửi lỗi được gửi lại qua transport dự phòng"""
+
+    def __init__(self, primary: MailTransport, fallback: MailTransport):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+
+    def send(self, message: EmailMessage) -> bool:
+        return self.send_batch([message])[0]
+
+    def send_batch(self, messages: List[EmailMessage]) -> List[bool]:
+        results = self.primary.send_batch(messages)
+        failed = [i for i, ok in enumerate(results) if not ok]
+        if failed:
+            logger.warning("%s emails failed via %s, retrying via %s", len(failed), self.primary.name, self.fallback.name)
+            retried = self.fallback.send_batch([messages[i] for i in failed])
+            for i, ok in zip(failed, retried):
+                results[i] = ok
+        return results
+
+    def test_connection(self) -> bool:
+        return self.primary.test_connection() or self.fallback.test_connection()
+
+    def close(self):
+        self.primary.close()
+        self.fallback.close()
+
+
+TRANSPORTS = {
+    'appscript': AppScriptTransport,
+    'smtp': SMTPTransport,
+    'file': FileTransport,
+}
+
+
+def create_transport(provider: Optional[str] = None, appscript_url: Optional[str] = None) -> MailTransport:
+    """
+    Tạo transport theo cấu hình
+
+    Args:
+        provider (str, optional): appscript, smtp hoặc file (mặc định Config.EMAIL_PROVIDER)
+        appscript_url (str, optional): URL Apps Script (ghi đè Config cho transport appscript)
+
+    Returns:
+        MailTransport: Transport (bọc FailoverTransport nếu có EMAIL_FALLBACK_PROVIDER)
+    """
+    def build(name: str) -> MailTransport:
+        name = name.strip().lower()
+        if name not in TRANSPORTS:
+            raise ValueError(f"Unknown EMAIL_PROVIDER: {name} ({', '.join(TRANSPORTS)})")
+        if name == 'appscript':
+            return AppScriptTransport(url=appscript_url)
+        return TRANSPORTS[name]()
+
+    transport = build(provider or Config.EMAIL_PROVIDER)
+    fallback = Config.EMAIL_FALLBACK_PROVIDER if provider is None else None
+    if fallback and fallback.strip().lower() != transport.name:
+        transport = FailoverTransport(transport, build(fallback))
+    return transport
@@ -1,59 +1,104 @@
 import asyncio
 import logging
+import time
+from monitoring.startup import startup
+from monitoring.readiness import readiness
 from config import Config, validate_config
+from monitoring.logging_setup import setup_logging
+
+# Cấu hình logging (ghi file/console trên thread riêng, không block event loop)
+setup_logging()
+startup.mark('logging')
+
 from bot.discord_bot import DiscordBookingBot
 from web.webhook_server import create_app
-
-# Cấu hình logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('booking_system.log'),
-        logging.StreamHandler()
-    ]
-)
+from models.rooms import get_room_catalog
+startup.mark('imports')
 
 logger = logging.getLogger(__name__)
 
+async def warm_up(bot):
+    """
+    Tải trước sheet snapshot, calendar mirror và room catalog (song song, trên thread pool).
+    /health/ready chỉ trả 200 sau khi warm-up xong.
+    """
+    sheets_manager = bot.sheets_manager
+    tasks = {
+        'sheet_snapshot': sheets_manager.preload_sheet,
+        'calendar_mirror': sheets_manager.warm_calendar_mirror,
+        'room_catalog': lambda: len(get_room_catalog().rooms),
+    }
+    readiness.register(*tasks)
+    
+    async def run(name, func):
+        started = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(func)
+            count = len(result) if isinstance(result, list) else result
+            readiness.mark_ready(name, time.perf_counter() - started, items=count)
+        except Exception as e:
+            logger.warning(f"Warm-up {name} failed: {e}")
+            readiness.mark_failed(name, str(e), time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    pending = [asyncio.create_task(run(name, func)) for name, func in tasks.items()]
+    done, not_done = await asyncio.wait(pending, timeout=Config.WARMUP_TIMEOUT)
+    for name, task in zip(tasks, pending):
+        if task in not_done:
+            # Không chờ tiếp - service vẫn ready (degraded), thread warm-up tự kết thúc sau
+            readiness.mark_failed(name, f"timeout after {Config.WARMUP_TIMEOUT}s")
+    
+    startup.record('warm_up', time.perf_counter() - started)
+    logger.info(f"Warm-up finished: {readiness.snapshot()['components']}")
+
 async def main():
     """
     Hàm main để khởi chạy cả Discord bot và Flask webhook server
+    
+    Thứ tự khởi động: mở port webhook -> build Google clients ở thread nền -> kết nối Discord gateway
     """
     try:
         # Validate cấu hình trước khi khởi chạy
         validate_config()
         logger.info("Configuration validated successfully")
         
-        # Tạo Discord bot instance
+        # Load room catalog một lần khi khởi động
+        get_room_catalog()
+        startup.mark('config')
+        
+        # Tạo Discord bot instance (Google clients chưa được build ở đây)
         bot = DiscordBookingBot()
+        startup.mark('bot_init')
         
         # Tạo Flask app
         flask_app = create_app(bot)
         
-        # Khởi chạy Flask server trong thread riêng
+        # Bind port ngay trên thread hiện tại, serve trong thread riêng
         import threading
-        from werkzeug.serving import run_simple
-        
-        def run_flask():
-            run_simple(
-                Config.FLASK_HOST, 
-                Config.FLASK_PORT, 
-                flask_app,
-                use_reloader=False,
-                use_debugger=False,
-                threaded=True
-            )
+        from werkzeug.serving import make_server
         
-        flask_thread = threading.Thread(target=run_flask)
+        server = make_server(Config.FLASK_HOST, Config.FLASK_PORT, flask_app, threaded=True)
+        flask_thread = threading.Thread(target=server.serve_forever, name='WebhookServer')
         flask_thread.daemon = True
         flask_thread.start()
+        startup.mark('webhook_listening')
         
         logger.info(f"Flask webhook server started on {Config.FLASK_HOST}:{Config.FLASK_PORT}")
+        
+        # Build Google clients và warm-up cache song song với kết nối gateway
+        bot.sheets_manager.start_background_build()
+        warm_up_task = asyncio.create_task(warm_up(bot))
+        
         logger.info("Starting Discord bot...")
         
-        # Khởi chạy Discord bot (blocking)
-        await bot.start(Config.DISCORD_BOT_TOKEN)
+        # Khởi chạy Discord bot (blocking); thoát khối async with luôn gọi bot.close() để xả digest/hàng đợi
+        try:
+            async with bot:
+                await bot.start(Config.DISCORD_BOT_TOKEN)
+        finally:
+            # Bot dừng khi warm-up chưa xong (VD: lỗi login): không để task treo lại
+            if not warm_up_task.done():
+                warm_up_task.cancel()
         
     except Exception as e:
         logger.error(f"Error starting booking system: {e}")
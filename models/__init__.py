@@ -0,0 +1,4 @@
+# Models Module
+from .booking import Booking
+
+__all__ = ['Booking']
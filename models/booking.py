@@ -0,0 +1,293 @@
+"""
+Booking model - dữ liệu booking chuẩn hóa dùng chung cho webhook, Discord, email và calendar
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from datetime import date as date_cls, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_PLAIN_TIME_RE = re.compile(r'^(\d{1,2}):(\d{2})(?::(\d{2}))?$')
+_DATE_RE = re.compile(r'^(\d{1,2})/(\d{1,2})/(\d{4})$')
+
+# Timestamp cột A (Google Forms) theo locale của sheet, hoặc ISO từ Apps Script
+TIMESTAMP_FORMATS = ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%Y-%m-%d %H:%M:%S')
+
+REQUIRED_FIELDS = ['email', 'name', 'date', 'startTime', 'endTime', 'room']
+
+
+def parse_time(time_str) -> str:
+    """
+    Parse time từ Google Sheets - xử lý nhiều format khác nhau
+
+    Args:
+        time_str: '21:00', '1899-12-30T21:00:00.000Z' hoặc số decimal (0.875)
+
+    Returns:
+        str: Thời gian dạng HH:MM, hoặc chuỗi gốc nếu không parse được
+    """
+    try:
+        if not time_str:
+            logger.warning("Time is None or empty")
+            return ""
+
+        time_str = str(time_str).strip()
+
+        # Format 1: Plain time string (21:00) - Format mới từ Apps Script
+        if ':' in time_str and 'T' not in time_str:
+            match = _PLAIN_TIME_RE.match(time_str)
+            if match:
+                return f"{int(match.group(1)):02d}:{int(match.group(2)):02d}"
+
+        # Format 2: ISO format từ Google Sheets (1899-12-30T21:00:00.000Z) - Format cũ
+        if 'T' in time_str:
+            dt = datetime.fromisoformat(time_str.replace('Z', ''))
+            # Google Sheets gửi UTC time, cần convert về VN time (+8h theo base time của Sheets)
+            return (dt + timedelta(hours=8)).strftime('%H:%M')
+
+        # Format 3: Số decimal từ Google Sheets (0.875 = 21:00)
+        try:
+            time_float = float(time_str)
+            if 0 <= time_float <= 1:
+                total_minutes = int(time_float * 24 * 60)
+                return f"{total_minutes // 60:02d}:{total_minutes % 60:02d}"
+        except ValueError:
+            pass
+
+        logger.warning("No format matched for time: %s", time_str)
+        return time_str
+
+    except Exception as e:
+        logger.error("Error parsing time %s: %s", time_str, e)
+        return str(time_str)
+
+
+def normalize_date(date_str) -> str:
+    """Normalize date format from d/m/yyyy to dd/mm/yyyy"""
+    date_str = str(date_str or '').strip()
+    match = _DATE_RE.match(date_str)
+    if match:
+        return f"{int(match.group(1)):02d}/{int(match.group(2)):02d}/{match.group(3)}"
+    return date_str
+
+
+def parse_date(date_str) -> Optional[date_cls]:
+    """Parse dd/mm/yyyy thành datetime.date, None nếu không hợp lệ"""
+    match = _DATE_RE.match(str(date_str or '').strip())
+    if not match:
+        return None
+    try:
+        return date_cls(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+    except ValueError:
+        return None
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """
+    Parse timestamp tạo booking (cột A)
+
+    Args:
+        value: '19/10/2026 14:03:22', '2026-10-19 14:03:22' hoặc ISO '2026-10-19T07:03:22.000Z'
+
+    Returns:
+        datetime: Naive (giờ địa phương của sheet) hoặc aware (ISO có timezone), None nếu không parse được
+    """
+    value = str(value or '').strip()
+    if not value:
+        return None
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def parse_time_to_minutes(time_str) -> int:
+    """Convert HH:MM or HH:MM:SS to minutes since midnight, -1 nếu không hợp lệ"""
+    match = _PLAIN_TIME_RE.match(str(time_str or '').strip())
+    if not match:
+        return -1
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    if 0 <= hours <= 23 and 0 <= minutes <= 59:
+        return hours * 60 + minutes
+    return -1
+
+
+def _parse_count(value) -> int:
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return 0
+
+
+@dataclass(slots=True)
+class Booking:
+    """
+    Một booking đã chuẩn hóa. Ngày và giờ được parse một lần khi tạo object
+    (booking_date, start_minutes, end_minutes) để các bước sau không phải parse lại chuỗi.
+    """
+
+    email: str
+    name: str
+    phone: str = ''
+    customer_count: int = 1
+    room: str = ''
+    date: str = ''          # dd/mm/yyyy
+    start_time: str = ''    # HH:MM
+    end_time: str = ''      # HH:MM
+    notes: str = ''
+    row_number: int = 0
+    conflict_message: str = ''
+    calendar_event_id: Optional[str] = None
+    trace_id: str = ''
+    submitted_at: str = ''  # Timestamp cột A (chuỗi gốc)
+    booking_date: Optional[date_cls] = None
+    start_minutes: int = -1
+    end_minutes: int = -1
+
+    def __post_init__(self):
+        if self.booking_date is None:
+            self.booking_date = parse_date(self.date)
+        if self.start_minutes < 0:
+            self.start_minutes = parse_time_to_minutes(self.start_time)
+        if self.end_minutes < 0:
+            self.end_minutes = parse_time_to_minutes(self.end_time)
+
+    @classmethod
+    def from_webhook(cls, data: Dict[str, Any]) -> 'Booking':
+        """
+        Tạo Booking từ payload webhook của Google Apps Script
+
+        Args:
+            data (dict): Payload JSON (email, name, phone, customerCount, date, startTime, endTime, room, notes, rowNumber, timestamp)
+        """
+        return cls(
+            email=str(data.get('email', '')).strip(),
+            name=str(data.get('name', '')).strip(),
+            phone=str(data.get('phone', '')).strip(),
+            customer_count=_parse_count(data.get('customerCount', 1)),
+            room=str(data.get('room', '')).strip(),
+            date=normalize_date(data.get('date', '')),
+            start_time=parse_time(data.get('startTime', '')),
+            end_time=parse_time(data.get('endTime', '')),
+            notes=str(data.get('notes', '')).strip(),
+            row_number=_parse_count(data.get('rowNumber', 0)),
+            submitted_at=str(data.get('timestamp', '') or '').strip(),
+        )
+
+    @classmethod
+    def from_sheet_row(cls, row: List[Any], row_number: int) -> 'Booking':
+        """
+        Tạo Booking từ một dòng Google Sheet
+
+        Cấu trúc sheet: [Timestamp, Name, Phone, CustomerCount, Room, Date, StartTime, EndTime, Notes, Email, Status, ProcessedTime]
+        """
+        def cell(index):
+            return str(row[index]).strip() if len(row) > index else ''
+
+        return cls(
+            email=cell(9),
+            name=cell(1),
+            phone=cell(2),
+            customer_count=_parse_count(cell(3)),
+            room=cell(4),
+            date=normalize_date(cell(5)),
+            start_time=parse_time(cell(6)),
+            end_time=parse_time(cell(7)),
+            notes=cell(8),
+            row_number=row_number,
+            submitted_at=cell(0),
+        )
+
+    @classmethod
+    def coerce(cls, value) -> 'Booking':
+        """
+        Chuyển dict (kể cả key cũ như row_number, note, time) thành Booking
+        """
+        if isinstance(value, cls):
+            return value
+
+        data = dict(value or {})
+        start_time = data.get('startTime') or data.get('start_time') or ''
+        end_time = data.get('endTime') or data.get('end_time') or ''
+        if not start_time and data.get('time'):
+            # Key 'time' cũ có dạng "HH:MM - HH:MM" hoặc "HH:MM"
+            parts = [p.strip(' ()') for p in str(data['time']).split('-')]
+            start_time = parts[0]
+            end_time = end_time or (parts[1] if len(parts) > 1 else '')
+
+        return cls(
+            email=str(data.get('email', '')).strip(),
+            name=str(data.get('name', '')).strip(),
+            phone=str(data.get('phone', '')).strip(),
+            customer_count=_parse_count(data.get('customerCount', data.get('customer_count', 1))),
+            room=str(data.get('room', '')).strip(),
+            date=normalize_date(data.get('date', '')),
+            start_time=parse_time(start_time) if start_time else '',
+            end_time=parse_time(end_time) if end_time else '',
+            notes=str(data.get('notes', data.get('note', '')) or '').strip(),
+            row_number=_parse_count(data.get('rowNumber', data.get('row_number', 0))),
+            conflict_message=data.get('conflictMessage', '') or '',
+            calendar_event_id=data.get('calendar_event_id'),
+            trace_id=str(data.get('traceId', '') or ''),
+            submitted_at=str(data.get('timestamp', data.get('submitted_at', '')) or '').strip(),
+        )
+
+    def validate(self) -> List[str]:
+        """
+        Kiểm tra schema của booking
+
+        Returns:
+            list: Danh sách lỗi, rỗng nếu hợp lệ
+        """
+        errors = []
+        if '@' not in self.email or '.' not in self.email:
+            errors.append('Invalid email format')
+        if self.booking_date is None:
+            logger.warning("Unparsed booking date: %s", self.date)
+        if self.start_minutes < 0 or self.end_minutes < 0:
+            logger.warning("Unparsed booking time: %s - %s", self.start_time, self.end_time)
+        return errors
+
+    @property
+    def has_valid_times(self) -> bool:
+        return self.start_minutes >= 0 and self.end_minutes >= 0
+
+    @property
+    def time_display(self) -> str:
+        """Chuỗi hiển thị thời gian dạng (HH:MM - HH:MM)"""
+        if self.start_time and self.end_time:
+            return f"({self.start_time} - {self.end_time})"
+        return self.start_time or 'N/A'
+
+    @property
+    def iso_date(self) -> str:
+        return self.booking_date.isoformat() if self.booking_date else ''
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Xuất payload với các key camelCase như Apps Script gửi (dùng cho log/JSON)
+        """
+        return {
+            'email': self.email,
+            'name': self.name,
+            'phone': self.phone,
+            'customerCount': self.customer_count,
+            'date': self.date,
+            'startTime': self.start_time,
+            'endTime': self.end_time,
+            'room': self.room,
+            'notes': self.notes,
+            'rowNumber': self.row_number,
+            'conflictMessage': self.conflict_message,
+            'calendar_event_id': self.calendar_event_id,
+            'traceId': self.trace_id,
+            'timestamp': self.submitted_at,
+        }
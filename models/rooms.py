@@ -0,0 +1,173 @@
+"""
+Room Catalog - danh mục phòng (ID chuẩn, alias, sức chứa, giờ mở cửa) load một lần từ file JSON
+"""
+
+import json
+import logging
+import os
+import threading
+import unicodedata
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from .booking import Booking, parse_time_to_minutes
+
+logger = logging.getLogger(__name__)
+
+DAY_MINUTES = 24 * 60
+
+
+@lru_cache(maxsize=1024)
+def fold_room_name(name: str) -> str:
+    """
+    Chuẩn hóa tên phòng để so khớp: bỏ dấu tiếng Việt, lowercase, gộp khoảng trắng
+    ('Phòng  Họp 1' -> 'phong hop 1')
+    """
+    text = str(name or '').replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    return ' '.join(text.lower().split())
+
+
+def parse_hours(value: str) -> Optional[Tuple[int, int]]:
+    """Parse 'HH:MM-HH:MM' thành (open_minutes, close_minutes), None nếu không hợp lệ"""
+    try:
+        start, end = [part.strip() for part in str(value).split('-')]
+    except ValueError:
+        return None
+    open_minutes = parse_time_to_minutes(start)
+    close_minutes = DAY_MINUTES if end == '24:00' else parse_time_to_minutes(end)
+    if 0 <= open_minutes < close_minutes:
+        return open_minutes, close_minutes
+    return None
+
+
+@dataclass(slots=True)
+class Room:
+    """Một phòng trong catalog"""
+
+    id: str
+    name: str
+    capacity: int = 0                       # 0 = không giới hạn
+    hours: Optional[Tuple[int, int]] = None  # None = dùng OPENING_HOURS chung
+    aliases: List[str] = field(default_factory=list)
+    shared: bool = False                    # Không gian chung: nhiều nhóm được trùng giờ trong giới hạn sức chứa
+
+
+class RoomCatalog:
+    """
+    Danh mục phòng dùng để chuẩn hóa tên phòng và kiểm tra sức chứa/giờ mở cửa.
+
+    Mọi tra cứu đều là dict lookup trong bộ nhớ, không gọi API.
+    """
+
+    def __init__(self, rooms: Optional[List[Room]] = None, default_hours: Optional[str] = None):
+        self.default_hours = parse_hours(default_hours or Config.OPENING_HOURS) or (0, DAY_MINUTES)
+        self.rooms: Dict[str, Room] = {}
+        self._aliases: Dict[str, Room] = {}
+        for room in rooms or []:
+            self.add(room)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'RoomCatalog':
+        """
+        Load catalog từ file JSON
+
+        Format:
+            {"rooms": [{"id": "p1", "name": "Phòng 1", "capacity": 6,
+                        "hours": "07:00-22:00", "aliases": ["P1", "Phòng họp 1"], "shared": false}]}
+        """
+        if not os.path.exists(path):
+            logger.warning("Room catalog %s not found - room rules disabled", path)
+            return cls()
+
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+
+        rooms = []
+        for item in data.get('rooms', []):
+            hours = parse_hours(item['hours']) if item.get('hours') else None
+            if item.get('hours') and hours is None:
+                logger.warning("Invalid hours for room %s: %s", item.get('id'), item['hours'])
+            rooms.append(Room(
+                id=str(item['id']),
+                name=item.get('name', item['id']),
+                capacity=int(item.get('capacity', 0) or 0),
+                hours=hours,
+                aliases=list(item.get('aliases', [])),
+                shared=bool(item.get('shared', False)),
+            ))
+
+        catalog = cls(rooms, default_hours=data.get('default_hours'))
+        logger.info("Loaded room catalog with %s rooms from %s", len(catalog.rooms), path)
+        return catalog
+
+    def add(self, room: Room):
+        self.rooms[room.id] = room
+        for alias in [room.id, room.name, *room.aliases]:
+            self._aliases[fold_room_name(alias)] = room
+
+    def resolve(self, name: str) -> Optional[Room]:
+        """Tìm phòng theo tên/alias (không phân biệt hoa thường, dấu)"""
+        return self._aliases.get(fold_room_name(name))
+
+    def key_for(self, name: str) -> str:
+        """Key so khớp phòng: ID chuẩn nếu có trong catalog, ngược lại là tên đã chuẩn hóa"""
+        room = self.resolve(name)
+        return room.id if room else fold_room_name(name)
+
+    def display_name(self, name: str) -> str:
+        room = self.resolve(name)
+        return room.name if room else str(name or '').strip()
+
+    def hours_for(self, name: str) -> Tuple[int, int]:
+        room = self.resolve(name)
+        return room.hours if room and room.hours else self.default_hours
+
+    def evaluate(self, booking: Booking) -> List[str]:
+        """
+        Kiểm tra booking với catalog (sức chứa, giờ mở cửa)
+
+        Returns:
+            list: Danh sách vi phạm (rỗng nếu hợp lệ)
+        """
+        if not self.rooms:
+            return []
+
+        room = self.resolve(booking.room)
+        if room is None:
+            return [f"Phòng '{booking.room}' không có trong danh mục"]
+
+        issues = []
+        if room.capacity and booking.customer_count > room.capacity:
+            issues.append(f"Số khách {booking.customer_count} vượt sức chứa {room.capacity} của {room.name}")
+
+        if booking.has_valid_times:
+            open_minutes, close_minutes = room.hours or self.default_hours
+            end_minutes = booking.end_minutes if booking.end_minutes > booking.start_minutes else booking.end_minutes + DAY_MINUTES
+            if booking.start_minutes < open_minutes or end_minutes > close_minutes:
+                issues.append(
+                    f"Ngoài giờ mở cửa của {room.name} "
+                    f"({open_minutes // 60:02d}:{open_minutes % 60:02d}-{close_minutes // 60:02d}:{close_minutes % 60:02d})"
+                )
+        return issues
+
+
+_catalog: Optional[RoomCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_room_catalog() -> RoomCatalog:
+    """Catalog dùng chung cho cả process, load một lần từ Config.ROOM_CATALOG_PATH"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                try:
+                    _catalog = RoomCatalog.from_file(Config.ROOM_CATALOG_PATH)
+                except Exception as e:
+                    logger.error("Failed to load room catalog: %s", e)
+                    _catalog = RoomCatalog()
+    return _catalog
@@ -0,0 +1,5 @@
+# Monitoring Module
+from .metrics import registry, timed
+from .tracing import span, traced, use_trace
+
+__all__ = ['registry', 'timed', 'span', 'traced', 'use_trace']
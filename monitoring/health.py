@@ -0,0 +1,122 @@
+"""
+Health Probes - kết quả kiểm tra phụ thuộc (Discord gateway, Sheets, Calendar, hàng đợi,
+event loop) được tính định kỳ trên thread nền; /health/ready chỉ đọc snapshot đã cache
+"""
+
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config import Config
+from .metrics import EVENT_LOOP_LAG, EXTERNAL_LAST_ERROR, EXTERNAL_LAST_SUCCESS, QUEUE_DEPTH, latest_by_service
+from .readiness import readiness
+
+logger = logging.getLogger(__name__)
+
+
+class HealthProbes:
+    """
+    Probe chạy mỗi `interval` giây. Ready khi: warm-up xong, Discord gateway đã kết nối
+    và event loop không bị nghẽn. Sheets/Calendar lỗi ở lần gọi gần nhất chỉ làm trạng thái
+    thành 'degraded' (webhook vẫn nhận booking được).
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or Config.HEALTH_PROBE_INTERVAL
+        self.bot = None
+        self._snapshot: Dict[str, Any] = {'ready': False, 'status': 'starting', 'checks': {}}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def attach(self, bot):
+        self.bot = bot
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='HealthProbes', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def snapshot(self) -> Dict[str, Any]:
+        return self._snapshot
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("Health probe failed: %s", e)
+            if self._stop.wait(self.interval):
+                return
+
+    def refresh(self) -> Dict[str, Any]:
+        """Tính lại snapshot (gọi từ thread probe)"""
+        now = time.time()
+        checks = {
+            'warmup': readiness.snapshot(),
+            'discord': self._probe_discord(),
+            'sheets': self._probe_service('sheets', now),
+            'calendar': self._probe_service('calendar', now),
+            'email': self._probe_service('email', now),
+            'queues': {dict(key).get('queue', ''): value for key, value in QUEUE_DEPTH.values().items()},
+            'eventLoop': self._probe_loop(),
+        }
+
+        ready = checks['warmup']['ready'] and checks['discord']['ok'] and checks['eventLoop']['ok']
+        degraded = checks['warmup']['degraded'] or any(
+            checks[name]['status'] == 'failing' for name in ('sheets', 'calendar', 'email')
+        )
+        self._snapshot = {
+            'ready': ready,
+            'status': 'degraded' if ready and degraded else ('ready' if ready else 'not_ready'),
+            'checkedAt': datetime.now().isoformat(),
+            'checks': checks,
+        }
+        return self._snapshot
+
+    def _probe_discord(self) -> Dict[str, Any]:
+        bot = self.bot
+        if bot is None or not hasattr(bot, 'is_ready'):
+            return {'ok': False, 'connected': False, 'reason': 'bot not attached'}
+        connected = bot.is_ready() and not bot.is_closed()
+        latency = bot.latency if connected else None
+        if latency is not None and not math.isfinite(latency):
+            latency = None
+        ok = connected and latency is not None and latency <= Config.HEALTH_MAX_DISCORD_LATENCY
+        return {
+            'ok': ok,
+            'connected': connected,
+            'latencyMs': round(latency * 1000, 1) if latency is not None else None,
+        }
+
+    @staticmethod
+    def _probe_service(service: str, now: float) -> Dict[str, Any]:
+        last_success = latest_by_service(EXTERNAL_LAST_SUCCESS, service)
+        last_error = latest_by_service(EXTERNAL_LAST_ERROR, service)
+        if last_success is None and last_error is None:
+            status = 'unknown'
+        elif last_error is not None and (last_success is None or last_error > last_success):
+            status = 'failing'
+        else:
+            status = 'ok'
+        return {
+            'status': status,
+            'lastSuccessAgeSeconds': round(now - last_success, 1) if last_success else None,
+            'lastErrorAgeSeconds': round(now - last_error, 1) if last_error else None,
+        }
+
+    @staticmethod
+    def _probe_loop() -> Dict[str, Any]:
+        lag = EVENT_LOOP_LAG.value()
+        return {'ok': lag <= Config.HEALTH_MAX_LOOP_LAG, 'lagMs': round(lag * 1000, 1)}
+
+
+probes = HealthProbes()
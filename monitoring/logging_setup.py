@@ -0,0 +1,145 @@
+"""
+Logging Setup - pipeline log bất đồng bộ: QueueHandler ở thread gọi, QueueListener ghi
+ra console/file (có rotation) trên thread riêng, hỗ trợ format JSON và level theo module
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from config import Config
+from .tracing import current_trace_id
+
+# Thuộc tính chuẩn của LogRecord - các field còn lại (truyền qua extra=) được đưa vào JSON
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'trace_id'}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class TraceIdFilter(logging.Filter):
+    """Gắn trace_id hiện tại (nếu có) vào record - chạy ở thread gọi log, nơi có context của trace"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'trace_id'):
+            record.trace_id = current_trace_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Mỗi record là một dòng JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'trace_id', None):
+            payload['trace_id'] = record.trace_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exc_info'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _PassthroughQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler chỉ merge args và exception thành text (rẻ); việc format đầy đủ
+    (timestamp, JSON) được làm trên thread của listener
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_module_levels(value: str) -> Dict[str, int]:
+    """
+    Parse cấu hình level theo module
+
+    Args:
+        value (str): VD 'google_sheets=WARNING,discord=INFO,werkzeug=WARNING'
+
+    Returns:
+        dict: {logger_name: level}
+    """
+    levels = {}
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        name, level = [part.strip() for part in item.split('=', 1)]
+        level_value = logging.getLevelName(level.upper())
+        if name and isinstance(level_value, int):
+            levels[name] = level_value
+    return levels
+
+
+def _build_file_handler(path: str) -> logging.Handler:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if Config.LOG_ROTATION == 'time':
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=Config.LOG_ROTATE_WHEN, backupCount=Config.LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=Config.LOG_MAX_BYTES, backupCount=Config.LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+
+
+def setup_logging(log_file: Optional[str] = None) -> logging.handlers.QueueListener:
+    """
+    Cấu hình logging cho toàn process (gọi một lần khi khởi động)
+
+    Args:
+        log_file (str, optional): Đường dẫn file log, mặc định Config.LOG_FILE ('' = chỉ console)
+
+    Returns:
+        QueueListener: Listener đang chạy (được dừng tự động khi thoát)
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = JsonFormatter() if Config.LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+    path = Config.LOG_FILE if log_file is None else log_file
+    if path:
+        handlers.append(_build_file_handler(path))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = _PassthroughQueueHandler(log_queue)
+    queue_handler.addFilter(TraceIdFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO))
+
+    for name, level in parse_module_levels(Config.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
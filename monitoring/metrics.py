@@ -0,0 +1,284 @@
+"""
+Metrics - registry nhỏ gọn (Counter, Gauge, Histogram) xuất theo format text của Prometheus
+"""
+
+import asyncio
+import bisect
+import functools
+import inspect
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from .profiling import profiler
+
+logger = logging.getLogger(__name__)
+
+# Bucket mặc định cho latency (giây) - từ vài ms tới timeout của Apps Script
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type_name}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterable[str]:
+        return []
+
+
+class Counter(_Metric):
+    """Bộ đếm tăng dần"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(key)} {value}"
+
+
+class Gauge(_Metric):
+    """Giá trị tức thời; có thể gắn callback để đọc giá trị lúc render (VD: độ sâu hàng đợi)"""
+
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelKey, float] = {}
+        self._functions: Dict[LabelKey, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def set_function(self, func: Callable[[], float], **labels):
+        with self._lock:
+            self._functions[_label_key(labels)] = func
+
+    def value(self, **labels) -> float:
+        key = _label_key(labels)
+        func = self._functions.get(key)
+        return float(func()) if func else self._values.get(key, 0.0)
+
+    def values(self) -> Dict[LabelKey, float]:
+        """Tất cả giá trị theo label (kể cả callback)"""
+        with self._lock:
+            items = dict(self._values)
+            functions = dict(self._functions)
+        for key, func in functions.items():
+            try:
+                items[key] = float(func())
+            except Exception as e:
+                logger.debug("Gauge callback %s failed: %s", self.name, e)
+        return items
+
+    def _samples(self):
+        for key, value in self.values().items():
+            yield f"{self.name}{_format_labels(key)} {value}"
+
+
+class Histogram(_Metric):
+    """Histogram với bucket cố định"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelKey, list] = {}
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(_label_key(labels), []))
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}"
+            cumulative += counts[-1]
+            yield f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(key)} {total}"
+            yield f"{self.name}_count{_format_labels(key)} {cumulative}"
+
+
+class MetricsRegistry:
+    """Registry chứa tất cả metrics của process"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str = '') -> Counter:
+        return self._get_or_create(Counter, name, documentation)
+
+    def gauge(self, name: str, documentation: str = '') -> Gauge:
+        return self._get_or_create(Gauge, name, documentation)
+
+    def histogram(self, name: str, documentation: str = '', buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, buckets=buckets)
+
+    def render(self) -> str:
+        """Xuất toàn bộ metrics theo Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+# Metrics dùng chung
+WEBHOOK_LATENCY = registry.histogram('booking_webhook_duration_seconds', 'Thời gian xử lý request webhook')
+EXTERNAL_LATENCY = registry.histogram('booking_external_call_duration_seconds', 'Thời gian gọi dịch vụ bên ngoài (Sheets, Calendar, Apps Script, Discord)')
+EXTERNAL_ERRORS = registry.counter('booking_external_call_errors_total', 'Số lần gọi dịch vụ bên ngoài bị lỗi')
+EXTERNAL_RETRIES = registry.counter('booking_external_call_retries_total', 'Số lần retry khi gọi dịch vụ bên ngoài')
+EXTERNAL_LAST_SUCCESS = registry.gauge('booking_external_call_last_success_timestamp', 'Unix timestamp của lần gọi thành công gần nhất')
+EXTERNAL_LAST_ERROR = registry.gauge('booking_external_call_last_error_timestamp', 'Unix timestamp của lần gọi lỗi gần nhất')
+SHEET_ROWS = registry.histogram('booking_sheet_rows_fetched', 'Số dòng trả về bởi get_sheet_data', buckets=ROW_BUCKETS)
+QUEUE_DEPTH = registry.gauge('booking_queue_depth', 'Số phần tử đang chờ trong hàng đợi')
+QUEUE_WAIT = registry.histogram('booking_queue_wait_seconds', 'Thời gian từ lúc vào hàng đợi tới khi được xử lý (VD: booking -> post Discord)')
+QUEUE_PROCESSED = registry.counter('booking_queue_processed_total', 'Số booking đã xử lý khỏi hàng đợi theo kết quả')
+EVENT_LOOP_LAG = registry.gauge('booking_event_loop_lag_seconds', 'Độ trễ của event loop Discord bot')
+
+
+def timed(service: str, operation: str, failure: Optional[Callable[[object], bool]] = None):
+    """
+    Decorator đo thời gian một lời gọi ra dịch vụ ngoài (hỗ trợ cả sync và async)
+
+    Args:
+        service (str): Tên dịch vụ (sheets, calendar, email, appscript_kho, discord)
+        operation (str): Tên thao tác (get, update, insert, delete, send, ...)
+        failure: Hàm nhận kết quả trả về, True nếu kết quả được coi là thất bại
+                 (các manager trả về False/None thay vì raise)
+    """
+    labels = {'service': service, 'operation': operation}
+
+    def record(started, result=None, error=False):
+        duration = time.perf_counter() - started
+        EXTERNAL_LATENCY.observe(duration, **labels)
+        profiler.record(service, operation, duration)
+        if error or (failure and failure(result)):
+            EXTERNAL_ERRORS.inc(**labels)
+            EXTERNAL_LAST_ERROR.set(time.time(), **labels)
+        else:
+            EXTERNAL_LAST_SUCCESS.set(time.time(), **labels)
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException:
+                    record(started, error=True)
+                    raise
+                record(started, result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                record(started, error=True)
+                raise
+            record(started, result)
+            return result
+        return wrapper
+
+    return decorator
+
+
+def latest_by_service(gauge: Gauge, service: str) -> Optional[float]:
+    """Giá trị lớn nhất của gauge timestamp trên mọi operation của một service, None nếu chưa có"""
+    values = [value for key, value in gauge.values().items() if ('service', service) in key]
+    return max(values) if values else None
+
+
+def is_falsy(result) -> bool:
+    """Kết quả False/None/[] được coi là thất bại"""
+    return not result
+
+
+def is_error_status(result) -> bool:
+    """Response kho dạng {'status': 'error', ...} được coi là thất bại"""
+    return not isinstance(result, dict) or result.get('status') == 'error'
+
+
+async def monitor_event_loop_lag(interval: float = 1.0):
+    """
+    Đo độ trễ event loop: sleep `interval` giây và ghi nhận phần vượt quá vào gauge
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(0.0, loop.time() - started - interval))
@@ -0,0 +1,237 @@
+"""
+Profiling - chế độ profiling opt-in (PROFILING_ENABLED): sampler thống kê theo stack,
+watchdog phát hiện event loop bị block và bộ ghi các lời gọi dịch vụ ngoài chậm
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_DEPTH = 40
+
+
+def _collapse(frame, limit: int = MAX_STACK_DEPTH) -> str:
+    """Stack dạng 'module:function;module:function' (root -> leaf), format của flamegraph"""
+    parts = []
+    while frame is not None and len(parts) < limit:
+        code = frame.f_code
+        parts.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+
+@dataclass(slots=True)
+class SlowOperation:
+    """Một lời gọi vượt ngưỡng"""
+
+    timestamp: float
+    service: str
+    operation: str
+    duration: float
+    stack: str
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'timestamp': self.timestamp,
+            'service': self.service,
+            'operation': self.operation,
+            'durationMs': round(self.duration * 1000, 1),
+            'stack': self.stack,
+        }
+
+
+class SlowOperationRecorder:
+    """
+    Giữ các lời gọi chậm trong cửa sổ thời gian (mặc định 1 giờ) để tổng hợp cho /perf và /debug/profile
+    """
+
+    def __init__(self, threshold: float, window: float = 3600, max_entries: int = 5000):
+        self.threshold = threshold
+        self.window = window
+        self._entries: Deque[SlowOperation] = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def record(self, service: str, operation: str, duration: float, stack: Optional[str] = None, skip: int = 1):
+        """
+        Args:
+            stack (str, optional): Stack đã chụp sẵn; mặc định là stack hiện tại
+            skip (int): Số frame cuối bỏ đi (các frame của recorder/decorator)
+        """
+        if duration < self.threshold:
+            return
+        if stack is None:
+            stack = ''.join(traceback.format_stack(limit=12 + skip)[:-skip])
+        entry = SlowOperation(time.time(), service, operation, duration, stack)
+        with self._lock:
+            self._entries.append(entry)
+        logger.warning("Slow %s.%s: %.0f ms", service, operation, duration * 1000)
+
+    def recent(self, window: Optional[float] = None) -> List[SlowOperation]:
+        cutoff = time.time() - (window or self.window)
+        with self._lock:
+            return [entry for entry in self._entries if entry.timestamp >= cutoff]
+
+    def summary(self, window: Optional[float] = None) -> List[Dict[str, object]]:
+        """
+        Tổng hợp theo (service, operation), sắp xếp theo lời gọi chậm nhất
+
+        Returns:
+            list: [{'service', 'operation', 'count', 'maxMs', 'avgMs'}]
+        """
+        groups: Dict[Tuple[str, str], List[float]] = {}
+        for entry in self.recent(window):
+            groups.setdefault((entry.service, entry.operation), []).append(entry.duration)
+
+        rows = [
+            {
+                'service': service,
+                'operation': operation,
+                'count': len(durations),
+                'maxMs': round(max(durations) * 1000, 1),
+                'avgMs': round(sum(durations) / len(durations) * 1000, 1),
+            }
+            for (service, operation), durations in groups.items()
+        ]
+        return sorted(rows, key=lambda row: row['maxMs'], reverse=True)
+
+
+class StackSampler:
+    """
+    Sampler thống kê: một daemon thread đọc stack của mọi thread mỗi `interval` giây
+    và đếm theo stack. Chi phí cố định theo tần suất lấy mẫu, không phụ thuộc tải.
+    """
+
+    def __init__(self, interval: float = 0.01, max_stacks: int = 2000):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='StackSampler', daemon=True)
+        self._thread.start()
+        logger.info("Stack sampler started (every %g ms)", self.interval * 1000)
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                self.samples += 1
+                for thread_id, frame in frames.items():
+                    if thread_id == own_id:
+                        continue
+                    stack = _collapse(frame)
+                    if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                        self._stacks[stack] += 1
+
+    def top(self, limit: int = 20) -> List[Tuple[str, int]]:
+        with self._lock:
+            return self._stacks.most_common(limit)
+
+    def collapsed(self) -> str:
+        """Xuất theo format collapsed stacks (dùng được với flamegraph.pl / speedscope)"""
+        with self._lock:
+            return '\n'.join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+
+class LoopWatchdog:
+    """
+    Phát hiện event loop bị block: một coroutine cập nhật heartbeat định kỳ, thread
+    watchdog thấy heartbeat quá hạn thì chụp stack của thread event loop (chính là đoạn code đang block)
+    """
+
+    def __init__(self, recorder: SlowOperationRecorder, tick: float = 0.05):
+        self.recorder = recorder
+        self.tick = tick
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+
+    async def run(self):
+        """Chạy trong event loop cần theo dõi"""
+        self._loop_thread_id = threading.get_ident()
+        threading.Thread(target=self._watch, name='LoopWatchdog', daemon=True).start()
+        try:
+            while True:
+                self._heartbeat = time.monotonic()
+                await asyncio.sleep(self.tick)
+        finally:
+            self._stop.set()
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(self.tick):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.tick
+            if blocked < self.recorder.threshold or reported == heartbeat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame, limit=15)) if frame else ''
+            self.recorder.record('event_loop', 'blocked', blocked, stack=stack)
+            reported = heartbeat  # Mỗi lần block chỉ báo một lần
+
+
+class Profiler:
+    """Gom sampler, watchdog và slow-operation recorder của process"""
+
+    def __init__(self, enabled: bool, slow_ms: float, sample_interval: float, window: float = 3600):
+        self.enabled = enabled
+        self.slow_operations = SlowOperationRecorder(slow_ms / 1000, window=window)
+        self.sampler = StackSampler(sample_interval)
+        self.watchdog = LoopWatchdog(self.slow_operations)
+        self.started_at: Optional[float] = None
+
+    def start(self):
+        """Bật sampler (nếu profiling được bật); có thể gọi nhiều lần"""
+        if self.enabled and self.started_at is None:
+            self.started_at = time.time()
+            self.sampler.start()
+
+    def record(self, service: str, operation: str, duration: float):
+        if self.enabled:
+            # Bỏ frame của Profiler.record, SlowOperationRecorder.record và decorator timed (record + wrapper)
+            self.slow_operations.record(service, operation, duration, skip=4)
+
+    def report(self, window: Optional[float] = None, top: int = 20) -> Dict[str, object]:
+        """Snapshot cho /debug/profile"""
+        return {
+            'enabled': self.enabled,
+            'startedAt': self.started_at,
+            'thresholdMs': self.slow_operations.threshold * 1000,
+            'samples': self.sampler.samples,
+            'slowOperations': self.slow_operations.summary(window),
+            'recentSlow': [entry.to_dict() for entry in self.slow_operations.recent(window)[-top:]],
+            'topStacks': [{'stack': stack, 'samples': count} for stack, count in self.sampler.top(top)],
+        }
+
+
+profiler = Profiler(
+    enabled=Config.PROFILING_ENABLED,
+    slow_ms=Config.PROFILING_SLOW_MS,
+    sample_interval=Config.PROFILING_SAMPLE_INTERVAL_MS / 1000,
+)
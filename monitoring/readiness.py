@@ -0,0 +1,65 @@
+"""
+Readiness - trạng thái sẵn sàng nhận traffic (khác liveness): service chỉ "ready" khi các
+thành phần warm-up (sheet snapshot, calendar, room catalog) đã xong
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+PENDING = 'pending'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class Readiness:
+    """
+    Theo dõi các thành phần cần warm-up. Thành phần warm-up lỗi được tính là xong nhưng
+    đánh dấu degraded - service vẫn nhận traffic (fallback gọi API trực tiếp) thay vì không bao giờ ready.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: Dict[str, Dict[str, object]] = {}
+        self.started_at = time.monotonic()
+
+    def register(self, *names: str):
+        with self._lock:
+            for name in names:
+                self._components.setdefault(name, {'status': PENDING})
+
+    def mark_ready(self, name: str, duration: Optional[float] = None, **details):
+        self._set(name, READY, duration, details)
+
+    def mark_failed(self, name: str, error: str, duration: Optional[float] = None):
+        self._set(name, FAILED, duration, {'error': error})
+
+    def _set(self, name: str, status: str, duration: Optional[float], details: Dict[str, object]):
+        entry = {'status': status, **details}
+        if duration is not None:
+            entry['durationMs'] = round(duration * 1000, 1)
+        with self._lock:
+            self._components[name] = entry
+
+    @property
+    def ready(self) -> bool:
+        """True khi mọi thành phần đã warm-up xong (kể cả lỗi)"""
+        with self._lock:
+            return bool(self._components) and all(c['status'] != PENDING for c in self._components.values())
+
+    @property
+    def degraded(self) -> bool:
+        with self._lock:
+            return any(c['status'] == FAILED for c in self._components.values())
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            components = {name: dict(entry) for name, entry in self._components.items()}
+        return {
+            'ready': self.ready,
+            'degraded': self.degraded,
+            'components': components,
+        }
+
+
+readiness = Readiness()
@@ -0,0 +1,60 @@
+"""
+Startup Timer - ghi nhận thời gian từng giai đoạn khởi động (imports, webhook, gateway, Google clients)
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Mốc thời gian khởi động, tính từ lúc module được import (đầu main.py)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self._phases: List[Tuple[str, float, float]] = []  # (phase, duration, elapsed)
+        self._lock = threading.Lock()
+        self.reported = False
+
+    def mark(self, phase: str) -> float:
+        """
+        Kết thúc một giai đoạn
+
+        Returns:
+            float: Thời gian của giai đoạn (giây)
+        """
+        now = time.perf_counter()
+        with self._lock:
+            duration = now - self._last
+            self._last = now
+            self._phases.append((phase, duration, now - self.started))
+        logger.debug("Startup phase %s: %.0f ms", phase, duration * 1000)
+        return duration
+
+    def record(self, phase: str, duration: float):
+        """Ghi một giai đoạn chạy song song (VD: build Google clients ở thread nền)"""
+        with self._lock:
+            self._phases.append((phase, duration, time.perf_counter() - self.started))
+        logger.info("Startup phase %s (background): %.0f ms", phase, duration * 1000)
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {phase: round(duration * 1000, 1) for phase, duration, _ in self._phases}
+
+    def report(self):
+        """Log bảng thời gian khởi động (một lần)"""
+        if self.reported:
+            return
+        self.reported = True
+        with self._lock:
+            phases = list(self._phases)
+        breakdown = ', '.join(f"{phase} {duration * 1000:.0f}ms" for phase, duration, _ in phases)
+        total = max((elapsed for _, _, elapsed in phases), default=0.0)
+        logger.info("Startup completed in %.0f ms: %s", total * 1000, breakdown)
+
+
+startup = StartupTimer()
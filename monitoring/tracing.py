@@ -0,0 +1,286 @@
+"""
+Tracing - gán trace ID cho từng booking và ghi nhận thời gian từng bước (span)
+từ webhook -> Discord -> admin click -> Sheets -> Calendar -> email
+"""
+
+import abc
+import atexit
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_TRACE_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+_current_trace: ContextVar[Optional[str]] = ContextVar('trace_id', default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar('span_id', default=None)
+
+
+@dataclass(slots=True)
+class Span:
+    """Một bước đã hoàn thành trong trace"""
+
+    trace_id: str
+    span_id: str
+    name: str
+    start_ns: int
+    end_ns: int
+    parent_id: Optional[str] = None
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_id,
+            'name': self.name,
+            'start': self.start_ns / 1e9,
+            'durationMs': round(self.duration_ms, 3),
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+
+class SpanExporter(abc.ABC):
+    """
+    Exporter chạy nền: span được đưa vào hàng đợi và ghi theo batch trên một thread riêng,
+    để request/event loop không bao giờ phải chờ I/O của tracing.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 2.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=10000)
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            logger.debug("Span queue full, dropping span")
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        batch: List[Span] = []
+        deadline = None
+        while True:
+            timeout = self.flush_interval if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+
+            if item:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                # Gom batch cho tới khi đủ kích thước hoặc hết flush_interval
+                if len(batch) < self.batch_size and time.monotonic() < deadline:
+                    continue
+
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    logger.warning("Failed to export %s spans: %s", len(batch), e)
+                batch = []
+                deadline = None
+
+            if item is None:
+                return
+
+    @abc.abstractmethod
+    def _write(self, batch: List[Span]):
+        """Ghi một batch span (chạy trên thread của exporter)"""
+
+
+class JsonLinesExporter(SpanExporter):
+    """Ghi mỗi span thành một dòng JSON"""
+
+    def __init__(self, path: str, **kwargs):
+        self.path = path
+        super().__init__(**kwargs)
+
+    def _write(self, batch: List[Span]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for span in batch:
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False) + '\n')
+
+
+class OTLPExporter(SpanExporter):
+    """Gửi span tới OpenTelemetry collector qua OTLP/HTTP (JSON encoding)"""
+
+    def __init__(self, endpoint: str, service_name: str = 'discord-booking-system', **kwargs):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        super().__init__(**kwargs)
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {'key': key, 'value': {'boolValue': value}}
+        if isinstance(value, int):
+            return {'key': key, 'value': {'intValue': str(value)}}
+        if isinstance(value, float):
+            return {'key': key, 'value': {'doubleValue': value}}
+        return {'key': key, 'value': {'stringValue': str(value)}}
+
+    def _write(self, batch: List[Span]):
+        import requests
+
+        spans = []
+        for span in batch:
+            item = {
+                'traceId': span.trace_id,
+                'spanId': span.span_id,
+                'name': span.name,
+                'kind': 1,
+                'startTimeUnixNano': str(span.start_ns),
+                'endTimeUnixNano': str(span.end_ns),
+                'attributes': [self._attribute(k, v) for k, v in span.attributes.items()],
+                'status': {'code': 2, 'message': span.error} if span.error else {'code': 1},
+            }
+            if span.parent_id:
+                item['parentSpanId'] = span.parent_id
+            spans.append(item)
+
+        payload = {
+            'resourceSpans': [{
+                'resource': {'attributes': [self._attribute('service.name', self.service_name)]},
+                'scopeSpans': [{'scope': {'name': __name__}, 'spans': spans}],
+            }]
+        }
+        response = requests.post(self.endpoint, json=payload, timeout=5)
+        response.raise_for_status()
+
+
+_exporter: Optional[SpanExporter] = None
+_exporter_lock = threading.Lock()
+_exporter_ready = False
+
+
+def get_exporter() -> Optional[SpanExporter]:
+    """Exporter theo Config.TRACE_EXPORTER ('none', 'jsonl', 'otlp')"""
+    global _exporter, _exporter_ready
+    if not _exporter_ready:
+        with _exporter_lock:
+            if not _exporter_ready:
+                kind = Config.TRACE_EXPORTER
+                if kind == 'jsonl':
+                    _exporter = JsonLinesExporter(Config.TRACE_JSONL_PATH)
+                elif kind == 'otlp':
+                    _exporter = OTLPExporter(Config.TRACE_OTLP_ENDPOINT)
+                elif kind not in ('', 'none'):
+                    logger.warning("Unknown TRACE_EXPORTER '%s', tracing disabled", kind)
+                _exporter_ready = True
+    return _exporter
+
+
+def new_trace_id() -> str:
+    """Trace ID 128-bit dạng hex (tương thích W3C/OTLP)"""
+    return uuid.uuid4().hex
+
+
+def valid_trace_id(value: Optional[str]) -> str:
+    """Trace ID nhận từ bên ngoài (VD: header X-Trace-Id) nếu đúng 32 ký tự hex thường, ngược lại tạo mới"""
+    return value if value and _TRACE_ID_RE.fullmatch(value) else new_trace_id()
+
+
+def current_trace_id() -> Optional[str]:
+    return _current_trace.get()
+
+
+@contextmanager
+def use_trace(trace_id: Optional[str]):
+    """Đặt trace hiện tại cho các span tạo ra bên trong block"""
+    token = _current_trace.set(trace_id or None)
+    try:
+        yield trace_id
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Ghi nhận một span thuộc trace hiện tại. Không làm gì nếu chưa có trace hoặc tracing tắt.
+
+    Args:
+        name (str): Tên bước (VD: 'sheets.update')
+        **attributes: Thuộc tính đính kèm (VD: row=12, status='confirmed')
+    """
+    trace_id = _current_trace.get()
+    exporter = get_exporter() if trace_id else None
+    if exporter is None:
+        yield attributes
+        return
+
+    span_id = os.urandom(8).hex()
+    parent_id = _current_span.get()
+    token = _current_span.set(span_id)
+    start_ns = time.time_ns()
+    error = None
+    try:
+        yield attributes
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        exporter.export(Span(trace_id, span_id, name, start_ns, time.time_ns(), parent_id, error, attributes))
+
+
+def record_span(name: str, start_ns: int, end_ns: Optional[int] = None, **attributes):
+    """Ghi một span đã biết thời điểm bắt đầu (VD: thời gian chờ admin click)"""
+    trace_id = _current_trace.get()
+    exporter = get_exporter() if trace_id else None
+    if exporter is None:
+        return
+    exporter.export(Span(
+        trace_id, os.urandom(8).hex(), name, start_ns, end_ns or time.time_ns(),
+        _current_span.get(), None, attributes
+    ))
+
+
+def traced(name: str):
+    """Decorator tạo span cho mỗi lời gọi hàm (sync hoặc async)"""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
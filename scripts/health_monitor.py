@@ -2,16 +2,27 @@
 """
 Discord Bot Health Monitoring Script
 Checks bot status, webhook endpoints, and system health
+
+Runs as an asyncio daemon: every tick probes the webhook and systemd services
+concurrently, reads disk usage via os.statvfs, keeps a rolling latency baseline
+for the webhook and routes alerts through pluggable sinks with deduplication.
 """
 
-import requests
-import subprocess
-import sys
-import time
+import argparse
+import asyncio
 import json
 import logging
+import os
+import statistics
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
+from typing import Deque, Dict, List, Optional
+
+import aiohttp
 
 # Configure logging
 logging.basicConfig(
@@ -24,176 +35,390 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+APP_DIR = Path(os.getenv('HEALTH_MONITOR_APP_DIR', '/home/discord-bot/discord-booking-bot'))
+WEBHOOK_BASE_URL = os.getenv('HEALTH_MONITOR_URL', 'http://localhost:5001')
+CHECK_INTERVAL = float(os.getenv('HEALTH_MONITOR_INTERVAL', '15'))
+DISK_USAGE_THRESHOLD = float(os.getenv('HEALTH_MONITOR_DISK_THRESHOLD', '85'))
+ALERT_DISCORD_WEBHOOK_URL = os.getenv('ALERT_DISCORD_WEBHOOK_URL', '')
+ALERT_FILE = os.getenv('ALERT_FILE', str(APP_DIR / 'logs' / 'alerts.jsonl'))
+ALERT_DEDUP_SECONDS = float(os.getenv('ALERT_DEDUP_SECONDS', '900'))
+
+
+@dataclass
+class Alert:
+    key: str
+    message: str
+    severity: str = 'critical'  # critical | warning | resolved
+    details: str = ''
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+
+
+class AlertSink:
+    """Destination for alerts"""
+
+    async def send(self, alert: Alert):
+        raise NotImplementedError
+
+
+class LogSink(AlertSink):
+    async def send(self, alert: Alert):
+        level = logging.INFO if alert.severity == 'resolved' else logging.CRITICAL
+        logger.log(level, f"🚨 ALERT [{alert.severity}] {alert.message}")
+
+
+class FileSink(AlertSink):
+    """Append alerts as JSON lines"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def _write(self, line: str):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open('a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    async def send(self, alert: Alert):
+        line = json.dumps(alert.__dict__, ensure_ascii=False)
+        await asyncio.to_thread(self._write, line)
+
+
+class DiscordWebhookSink(AlertSink):
+    """Post alerts to a Discord channel webhook"""
+
+    ICONS = {'critical': '🚨', 'warning': '⚠️', 'resolved': '✅'}
+
+    def __init__(self, url: str, session: aiohttp.ClientSession):
+        self.url = url
+        self.session = session
+
+    async def send(self, alert: Alert):
+        content = f"{self.ICONS.get(alert.severity, '🚨')} **{alert.message}**"
+        if alert.details:
+            # Discord giới hạn 2000 ký tự/tin nhắn
+            content += f"\n```\n{alert.details[-1500:]}\n```"
+        async with self.session.post(self.url, json={'content': content}) as response:
+            if response.status >= 300:
+                logger.error(f"❌ Discord alert webhook returned {response.status}")
+
+
+class AlertManager:
+    """
+    Deduplicate alerts by key: an active alert is re-sent at most once per
+    `dedup_window` seconds, and a 'resolved' alert is sent when it clears.
+    """
+
+    def __init__(self, sinks: List[AlertSink], dedup_window: float = ALERT_DEDUP_SECONDS):
+        self.sinks = sinks
+        self.dedup_window = dedup_window
+        self._active: Dict[str, float] = {}  # key -> last sent (monotonic)
+
+    async def _dispatch(self, alert: Alert):
+        results = await asyncio.gather(*(sink.send(alert) for sink in self.sinks), return_exceptions=True)
+        for sink, result in zip(self.sinks, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Alert sink {type(sink).__name__} failed: {result}")
+
+    async def fire(self, alert: Alert):
+        now = time.monotonic()
+        last_sent = self._active.get(alert.key)
+        if last_sent is not None and now - last_sent < self.dedup_window:
+            return
+        self._active[alert.key] = now
+        await self._dispatch(alert)
+
+    async def resolve(self, key: str, message: str):
+        if self._active.pop(key, None) is not None:
+            await self._dispatch(Alert(key=key, message=message, severity='resolved'))
+
+    @property
+    def active(self) -> List[str]:
+        return list(self._active)
+
+
+class LatencyBaseline:
+    """
+    Rolling latency baseline; a sample is anomalous when it exceeds
+    mean + `sigmas` * stdev of the window (and an absolute floor, to ignore jitter
+    on a very fast endpoint)
+    """
+
+    def __init__(self, window: int = 120, min_samples: int = 20, sigmas: float = 4.0, floor_ms: float = 250.0):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.sigmas = sigmas
+        self.floor_ms = floor_ms
+
+    def threshold(self) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        mean = statistics.fmean(self.samples)
+        stdev = statistics.pstdev(self.samples)
+        return max(mean + self.sigmas * stdev, self.floor_ms)
+
+    def observe(self, latency_ms: float) -> bool:
+        """Add a sample; return True if it is anomalous (anomalies are kept out of the baseline)"""
+        limit = self.threshold()
+        if limit is not None and latency_ms > limit:
+            return True
+        self.samples.append(latency_ms)
+        return False
+
+
 class HealthMonitor:
-    def __init__(self):
-        self.app_dir = Path('/home/discord-bot/discord-booking-bot')
-        self.webhook_url = 'http://localhost:5001/health'
+    def __init__(self, alerts: AlertManager, session: aiohttp.ClientSession,
+                 base_url: str = WEBHOOK_BASE_URL, failure_threshold: int = 2, restart_cooldown: float = 300.0):
+        self.app_dir = APP_DIR
+        self.live_url = f"{base_url}/health/live"
+        self.ready_url = f"{base_url}/health/ready"
         self.services = ['discord-bot', 'discord-webhook']
-        
-    def check_webhook_health(self):
-        """Check webhook endpoint health"""
+        self.alerts = alerts
+        self.session = session
+        self.failure_threshold = failure_threshold
+        self.restart_cooldown = restart_cooldown
+        self.baseline = LatencyBaseline()
+        self._failures: Dict[str, int] = {}
+        self._last_restart: Dict[str, float] = {}
+        self._last_cleanup = 0.0
+
+    async def _run(self, *cmd: str, timeout: float = 10.0):
+        """Run a command without blocking the loop; returns (returncode, stdout, stderr)"""
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
         try:
-            response = requests.get(self.webhook_url, timeout=10)
-            if response.status_code == 200:
-                logger.info("✅ Webhook endpoint is healthy")
-                return True
-            else:
-                logger.error(f"❌ Webhook returned status {response.status_code}")
-                return False
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+        return proc.returncode, stdout.decode(errors='replace'), stderr.decode(errors='replace')
+
+    async def check_webhook_health(self) -> bool:
+        """Check webhook liveness and track latency against the rolling baseline"""
+        started = time.perf_counter()
+        try:
+            async with self.session.get(self.live_url) as response:
+                await response.read()
+                status = response.status
         except Exception as e:
             logger.error(f"❌ Webhook health check failed: {e}")
             return False
-    
-    def check_service_status(self, service_name):
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        if status != 200:
+            logger.error(f"❌ Webhook returned status {status}")
+            return False
+
+        if self.baseline.observe(latency_ms):
+            await self.alerts.fire(Alert(
+                key='webhook-latency', severity='warning',
+                message=f"Webhook latency {latency_ms:.0f} ms is above baseline "
+                        f"(limit {self.baseline.threshold():.0f} ms)",
+            ))
+        else:
+            await self.alerts.resolve('webhook-latency', f"Webhook latency back to normal ({latency_ms:.0f} ms)")
+        logger.debug(f"✅ Webhook endpoint is healthy ({latency_ms:.1f} ms)")
+        return True
+
+    async def check_readiness(self):
+        """Readiness only alerts (no restart): degraded dependencies are not fixed by restarting"""
+        try:
+            async with self.session.get(self.ready_url) as response:
+                snapshot = await response.json(content_type=None)
+        except Exception as e:
+            logger.debug(f"Readiness probe failed: {e}")
+            return
+        status = snapshot.get('status')
+        if status in ('degraded', 'not_ready'):
+            failing = [
+                name for name, check in snapshot.get('checks', {}).items()
+                if isinstance(check, dict) and (check.get('status') == 'failing' or check.get('ok') is False)
+            ]
+            await self.alerts.fire(Alert(
+                key='webhook-readiness', severity='warning',
+                message=f"Bot is {status}: {', '.join(failing) or 'warming up'}",
+            ))
+        else:
+            await self.alerts.resolve('webhook-readiness', "Bot is ready")
+
+    async def check_service_status(self, service_name: str) -> bool:
         """Check systemd service status"""
         try:
-            result = subprocess.run(
-                ['systemctl', 'is-active', service_name],
-                capture_output=True,
-                text=True
-            )
-            if result.returncode == 0:
-                logger.info(f"✅ Service {service_name} is running")
-                return True
-            else:
-                logger.error(f"❌ Service {service_name} is not running")
-                return False
+            returncode, _, _ = await self._run('systemctl', 'is-active', service_name)
         except Exception as e:
             logger.error(f"❌ Failed to check service {service_name}: {e}")
             return False
-    
-    def restart_service(self, service_name):
-        """Restart a systemd service"""
+        if returncode == 0:
+            logger.debug(f"✅ Service {service_name} is running")
+            return True
+        logger.error(f"❌ Service {service_name} is not running")
+        return False
+
+    async def restart_service(self, service_name: str) -> bool:
+        """Restart a systemd service (at most once per cooldown; recovery is verified on later ticks)"""
+        now = time.monotonic()
+        if now - self._last_restart.get(service_name, float('-inf')) < self.restart_cooldown:
+            return False
+        self._last_restart[service_name] = now
+        logger.info(f"🔄 Restarting service {service_name}")
         try:
-            logger.info(f"🔄 Restarting service {service_name}")
-            result = subprocess.run(
-                ['sudo', 'systemctl', 'restart', service_name],
-                capture_output=True,
-                text=True
-            )
-            if result.returncode == 0:
-                logger.info(f"✅ Service {service_name} restarted successfully")
-                return True
-            else:
-                logger.error(f"❌ Failed to restart {service_name}: {result.stderr}")
-                return False
+            returncode, _, stderr = await self._run('sudo', 'systemctl', 'restart', service_name, timeout=60.0)
         except Exception as e:
             logger.error(f"❌ Error restarting service {service_name}: {e}")
             return False
-    
-    def get_service_logs(self, service_name, lines=10):
+        if returncode == 0:
+            logger.info(f"✅ Service {service_name} restarted successfully")
+            return True
+        logger.error(f"❌ Failed to restart {service_name}: {stderr}")
+        return False
+
+    async def get_service_logs(self, service_name: str, lines: int = 10) -> str:
         """Get recent logs from a service"""
         try:
-            result = subprocess.run(
-                ['journalctl', '-u', service_name, '--no-pager', '-n', str(lines)],
-                capture_output=True,
-                text=True
-            )
-            return result.stdout
+            _, stdout, _ = await self._run('journalctl', '-u', service_name, '--no-pager', '-n', str(lines))
+            return stdout
         except Exception as e:
             logger.error(f"❌ Failed to get logs for {service_name}: {e}")
             return ""
-    
-    def check_disk_space(self):
+
+    def disk_usage_percent(self) -> float:
+        """Disk usage of the app filesystem (same figure as `df`: used / (used + available to users))"""
+        st = os.statvfs(self.app_dir)
+        used = (st.f_blocks - st.f_bfree) * st.f_frsize
+        available = st.f_bavail * st.f_frsize
+        return used / (used + available) * 100 if used + available else 0.0
+
+    async def check_disk_space(self) -> bool:
         """Check available disk space"""
         try:
-            result = subprocess.run(['df', '-h', str(self.app_dir)], capture_output=True, text=True)
-            lines = result.stdout.strip().split('\n')
-            if len(lines) > 1:
-                usage_line = lines[1].split()
-                usage_percent = usage_line[4].replace('%', '')
-                if int(usage_percent) > 85:
-                    logger.warning(f"⚠️ Disk usage is high: {usage_percent}%")
-                    return False
-                else:
-                    logger.info(f"✅ Disk usage is normal: {usage_percent}%")
-                    return True
-        except Exception as e:
+            usage = self.disk_usage_percent()
+        except OSError as e:
             logger.error(f"❌ Failed to check disk space: {e}")
             return False
-    
-    def cleanup_old_logs(self):
-        """Clean up old log files"""
+        if usage > DISK_USAGE_THRESHOLD:
+            await self.alerts.fire(Alert(key='disk', severity='warning', message=f"Disk usage is high: {usage:.0f}%"))
+            return False
+        await self.alerts.resolve('disk', f"Disk usage is normal: {usage:.0f}%")
+        return True
+
+    def _cleanup_old_logs(self):
+        cutoff = time.time() - 7 * 86400
+        for path in (self.app_dir / 'logs').glob('*.log'):
+            stat = path.stat()
+            if stat.st_size > 10 * 1024 * 1024 and stat.st_mtime < cutoff:
+                path.unlink()
+                logger.info(f"🧹 Removed old log file {path.name}")
+
+    async def cleanup_old_logs(self, every: float = 3600.0):
+        """Clean up old log files (at most once per `every` seconds)"""
+        now = time.monotonic()
+        if now - self._last_cleanup < every:
+            return
+        self._last_cleanup = now
         try:
-            logs_dir = self.app_dir / 'logs'
-            if logs_dir.exists():
-                # Keep only last 100MB of logs
-                subprocess.run([
-                    'find', str(logs_dir), '-name', '*.log',
-                    '-size', '+10M', '-mtime', '+7', '-delete'
-                ], capture_output=True)
-                logger.info("🧹 Cleaned up old log files")
+            await asyncio.to_thread(self._cleanup_old_logs)
         except Exception as e:
             logger.error(f"❌ Failed to cleanup logs: {e}")
-    
-    def send_alert(self, message):
-        """Send alert notification"""
-        # You can implement Discord webhook or email alerts here
-        logger.critical(f"🚨 ALERT: {message}")
-    
-    def run_health_check(self):
-        """Run complete health check"""
-        logger.info("🏥 Starting health check...")
-        
-        issues = []
-        
-        # Check webhook
-        if not self.check_webhook_health():
-            issues.append("Webhook endpoint is down")
-            # Try to restart webhook service
-            if self.restart_service('discord-webhook'):
-                time.sleep(10)
-                if self.check_webhook_health():
-                    logger.info("✅ Webhook service recovered after restart")
-                else:
-                    issues.append("Webhook service failed to recover")
-        
-        # Check services
-        for service in self.services:
-            if not self.check_service_status(service):
-                issues.append(f"Service {service} is down")
-                # Try to restart
-                if self.restart_service(service):
-                    time.sleep(5)
-                    if self.check_service_status(service):
-                        logger.info(f"✅ Service {service} recovered after restart")
-                    else:
-                        issues.append(f"Service {service} failed to recover")
-        
-        # Check system resources
-        self.check_disk_space()
-        self.cleanup_old_logs()
-        
-        # Send alerts if there are issues
-        if issues:
-            alert_message = "Bot health issues detected: " + ", ".join(issues)
-            self.send_alert(alert_message)
-            return False
-        else:
-            logger.info("✅ All health checks passed")
+
+    async def _handle_failure(self, key: str, service_name: str, message: str):
+        """Count consecutive failures; alert and restart once the threshold is reached"""
+        failures = self._failures.get(key, 0) + 1
+        self._failures[key] = failures
+        if failures < self.failure_threshold:
+            return
+        restarted = await self.restart_service(service_name)
+        logs = await self.get_service_logs(service_name)
+        suffix = " (restart triggered)" if restarted else ""
+        await self.alerts.fire(Alert(key=key, message=f"{message}{suffix}", details=logs))
+
+    async def _handle_success(self, key: str, message: str):
+        if self._failures.pop(key, 0) >= self.failure_threshold:
+            logger.info(f"✅ {message}")
+        await self.alerts.resolve(key, message)
+
+    async def _webhook_task(self) -> bool:
+        if await self.check_webhook_health():
+            await self._handle_success('webhook', "Webhook endpoint recovered")
+            await self.check_readiness()
+            return True
+        await self._handle_failure('webhook', 'discord-webhook', "Webhook endpoint is down")
+        return False
+
+    async def _service_task(self, service_name: str) -> bool:
+        key = f"service:{service_name}"
+        if await self.check_service_status(service_name):
+            await self._handle_success(key, f"Service {service_name} recovered")
             return True
+        await self._handle_failure(key, service_name, f"Service {service_name} is down")
+        return False
+
+    async def run_health_check(self) -> bool:
+        """Run one round of checks concurrently"""
+        results = await asyncio.gather(
+            self._webhook_task(),
+            *(self._service_task(service) for service in self.services),
+            self.check_disk_space(),
+            self.cleanup_old_logs(),
+            return_exceptions=True,
+        )
+        healthy = True
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"❌ Monitoring error: {result}")
+                healthy = False
+            elif result is False:
+                healthy = False
+        if healthy:
+            logger.debug("✅ All health checks passed")
+        return healthy
+
+    async def run_forever(self, interval: float):
+        """Tick on a fixed schedule; a slow round delays the next one instead of overlapping it"""
+        logger.info(f"🔄 Starting continuous monitoring (every {interval:.0f}s)...")
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            await self.run_health_check()
+            next_tick = max(next_tick + interval, loop.time())
+            await asyncio.sleep(next_tick - loop.time())
+
+
+def build_sinks(session: aiohttp.ClientSession) -> List[AlertSink]:
+    sinks: List[AlertSink] = [LogSink()]
+    if ALERT_FILE:
+        sinks.append(FileSink(ALERT_FILE))
+    if ALERT_DISCORD_WEBHOOK_URL:
+        sinks.append(DiscordWebhookSink(ALERT_DISCORD_WEBHOOK_URL, session))
+    return sinks
+
+
+async def _main(args) -> int:
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        alerts = AlertManager(build_sinks(session))
+        # Chế độ một lần: báo lỗi ngay lần đầu, không chờ nhiều lần thất bại liên tiếp
+        monitor = HealthMonitor(alerts, session, base_url=args.url,
+                                failure_threshold=2 if args.continuous else 1)
+        if args.continuous:
+            await monitor.run_forever(args.interval)
+            return 0
+        return 0 if await monitor.run_health_check() else 1
+
 
 def main():
     """Main function"""
-    monitor = HealthMonitor()
-    
-    if len(sys.argv) > 1 and sys.argv[1] == '--continuous':
-        # Continuous monitoring mode
-        logger.info("🔄 Starting continuous monitoring...")
-        while True:
-            try:
-                monitor.run_health_check()
-                time.sleep(300)  # Check every 5 minutes
-            except KeyboardInterrupt:
-                logger.info("👋 Monitoring stopped by user")
-                break
-            except Exception as e:
-                logger.error(f"❌ Monitoring error: {e}")
-                time.sleep(60)
-    else:
-        # Single check mode
-        success = monitor.run_health_check()
-        sys.exit(0 if success else 1)
+    parser = argparse.ArgumentParser(description='Discord bot health monitor')
+    parser.add_argument('--continuous', action='store_true', help='Run as a daemon')
+    parser.add_argument('--interval', type=float, default=CHECK_INTERVAL, help='Seconds between checks')
+    parser.add_argument('--timeout', type=float, default=5.0, help='HTTP probe timeout (seconds)')
+    parser.add_argument('--url', default=WEBHOOK_BASE_URL, help='Webhook server base URL')
+    args = parser.parse_args()
+
+    try:
+        sys.exit(asyncio.run(_main(args)))
+    except KeyboardInterrupt:
+        logger.info("👋 Monitoring stopped by user")
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
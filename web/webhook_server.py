@@ -1,25 +1,108 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response
+import hmac
 import logging
 import asyncio
 from datetime import datetime
 import json
+import time
+from config import Config
+from models.booking import Booking, REQUIRED_FIELDS, normalize_date, parse_date
+from models.rooms import get_room_catalog
+from monitoring.metrics import registry, WEBHOOK_LATENCY
+from monitoring.tracing import span, use_trace, valid_trace_id
+from monitoring.profiling import profiler
+from monitoring.health import probes
 
 logger = logging.getLogger(__name__)
 
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
 def create_app(discord_bot=None):
     """
     Tạo Flask app có webhook endpoints cho booking Discord.
     """
     app = Flask(__name__)
+    
+    # Probe phụ thuộc chạy nền, endpoint health chỉ đọc kết quả đã cache
+    if discord_bot is not None:
+        probes.attach(discord_bot)
+        probes.start()
+    
+    # Dùng chung một GoogleSheetsManager (của bot nếu có) thay vì tạo mới mỗi request
+    shared = {'sheets_manager': getattr(discord_bot, 'sheets_manager', None)}
+    
+    def get_sheets_manager():
+        if shared['sheets_manager'] is None:
+            from google_sheets.manager import GoogleSheetsManager
+            shared['sheets_manager'] = GoogleSheetsManager()
+        return shared['sheets_manager']
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            WEBHOOK_LATENCY.observe(
+                time.perf_counter() - started,
+                endpoint=request.endpoint or 'unknown',
+                status=str(response.status_code)
+            )
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    @app.route('/debug/profile', methods=['GET'])
+    def debug_profile():
+        """
+        Kết quả profiling: GET /debug/profile?minutes=60&top=20 (format=collapsed để lấy collapsed stacks cho flamegraph)
+        """
+        if not profiler.enabled:
+            return jsonify({'error': 'Profiling is disabled (set PROFILING_ENABLED=true)'}), 404
+        
+        # Stack sample lộ chi tiết nội bộ: cần token, hoặc chỉ cho localhost khi chưa cấu hình token
+        if Config.PROFILING_TOKEN:
+            if not hmac.compare_digest(request.headers.get('X-Debug-Token', ''), Config.PROFILING_TOKEN):
+                return jsonify({'error': 'Invalid debug token'}), 403
+        elif request.remote_addr not in LOOPBACK_ADDRESSES:
+            return jsonify({'error': 'Set PROFILING_TOKEN to access /debug/profile remotely'}), 403
+        
+        if request.args.get('format') == 'collapsed':
+            return Response(profiler.sampler.collapsed(), mimetype='text/plain')
+        
+        minutes = request.args.get('minutes', 60, type=float)
+        top = request.args.get('top', 20, type=int)
+        return jsonify(profiler.report(window=minutes * 60, top=top))
 
     @app.route('/health', methods=['GET'])
     def health_check():
+        """Liveness - process còn chạy; kèm cờ ready để tiện theo dõi"""
         return jsonify({
             'status': 'healthy',
+            'ready': probes.snapshot['ready'],
             'timestamp': datetime.now().isoformat(),
             'service': 'Discord Booking System'
         })
 
+    @app.route('/health/live', methods=['GET'])
+    def health_live():
+        """Liveness - chỉ xác nhận process/Flask còn phản hồi (dùng để quyết định restart)"""
+        return jsonify({'status': 'alive', 'timestamp': datetime.now().isoformat()})
+
+    @app.route('/health/ready', methods=['GET'])
+    def health_ready():
+        """
+        Readiness - đọc snapshot probe đã cache (warm-up, Discord gateway/latency, lần gọi
+        Sheets/Calendar/email thành công gần nhất, độ sâu hàng đợi, event loop lag).
+        200 khi ready (kể cả degraded), 503 nếu chưa.
+        """
+        snapshot = probes.snapshot
+        return jsonify(snapshot), 200 if snapshot['ready'] else 503
+
     @app.route('/webhook/booking', methods=['POST'])
     def webhook_booking():
         """
@@ -31,177 +114,149 @@ def create_app(discord_bot=None):
                 return jsonify({'error': 'Content-Type must be application/json'}), 400
 
             data = request.get_json()
-            logger.info(f"Received booking: {json.dumps(data, ensure_ascii=False)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Received booking: %s", json.dumps(data, ensure_ascii=False))
 
             # Validate field bắt buộc
-            required_fields = ['email', 'name', 'date', 'startTime', 'endTime', 'room']
-            missing_fields = [f for f in required_fields if not data.get(f)]
+            missing_fields = [f for f in REQUIRED_FIELDS if not data.get(f)]
             if missing_fields:
                 return jsonify({'error': f'Missing required fields: {", ".join(missing_fields)}'}), 400
 
-            # Chuẩn hóa dữ liệu
-            def parse_time(time_str):
-                """Parse time từ Google Sheets - xử lý nhiều format khác nhau"""
-                try:
-                    logger.info(f"Parsing time: {time_str} (type: {type(time_str)})")
-                    
-                    # Nếu là None hoặc empty
-                    if not time_str:
-                        logger.warning("Time is None or empty")
-                        return ""
-                    
-                    # Convert to string
-                    time_str = str(time_str).strip()
-                    
-                    # Format 1: Plain time string (21:00) - Format mới từ Apps Script
-                    if ':' in time_str and not 'T' in time_str:
-                        import re
-                        match = re.match(r'^(\d{1,2}):(\d{2})(?::(\d{2}))?$', time_str)
-                        if match:
-                            hours = int(match.group(1))
-                            minutes = int(match.group(2))
-                            result = f"{hours:02d}:{minutes:02d}"
-                            logger.info(f"Plain time format parsed: {result}")
-                            return result
-                    
-                    # Format 2: ISO format từ Google Sheets (1899-12-30T21:00:00.000Z) - Format cũ
-                    if 'T' in time_str:
-                        from datetime import timedelta
-                        if 'Z' in time_str:
-                            time_str = time_str.replace('Z', '')
-                        if '.' in time_str:
-                            # Có milliseconds: 1899-12-30T21:00:00.000
-                            dt = datetime.fromisoformat(time_str)
-                        else:
-                            # Không có milliseconds: 1899-12-30T21:00:00
-                            dt = datetime.fromisoformat(time_str)
-                        
-                        # Google Sheets gửi UTC time, cần convert về VN time
-                        # Thử +8 tiếng thay vì +7 (có thể do daylight saving hoặc base time khác)
-                        vn_time = dt + timedelta(hours=8)
-                        result = vn_time.strftime('%H:%M')
-                        logger.info(f"ISO format parsed (with +8h): {result}")
-                        return result
-                    
-                    # Format 3: Số decimal từ Google Sheets (0.875 = 21:00)
-                    try:
-                        time_float = float(time_str)
-                        if 0 <= time_float <= 1:
-                            # Decimal time (0.875 = 21 giờ)
-                            total_minutes = int(time_float * 24 * 60)
-                            hours = total_minutes // 60
-                            minutes = total_minutes % 60
-                            result = f"{hours:02d}:{minutes:02d}"
-                            logger.info(f"Decimal time format parsed: {result}")
-                            return result
-                    except ValueError:
-                        pass
-                    
-                    # Nếu không match format nào, trả về original
-                    logger.warning(f"No format matched for time: {time_str}")
-                    return str(time_str)
-                    
-                except Exception as e:
-                    logger.error(f"Error parsing time {time_str}: {e}")
-                    return str(time_str)
-            
-            def normalize_date(date_str):
-                """Normalize date format from d/m/yyyy to dd/mm/yyyy"""
+            # Chuẩn hóa dữ liệu một lần thành Booking, dùng lại cho Discord/email/calendar
+            booking = Booking.from_webhook(data)
+
+            errors = booking.validate()
+            if errors:
+                return jsonify({'error': errors[0]}), 400
+            email = booking.email
+
+            # Trace ID đi theo booking tới Discord, admin click, Sheets, Calendar và email
+            booking.trace_id = valid_trace_id(request.headers.get('X-Trace-Id'))
+            with use_trace(booking.trace_id), span('webhook.booking', row=booking.row_number):
+                # Chuẩn hóa tên phòng và kiểm tra sức chứa/giờ mở cửa theo room catalog (in-memory)
+                catalog = get_room_catalog()
+                rule_issues = catalog.evaluate(booking)
+                booking.room = catalog.display_name(booking.room)
+                if rule_issues and Config.ROOM_RULES_MODE == 'reject':
+                    logger.warning("Booking for %s rejected by room rules: %s", email, rule_issues)
+                    return jsonify({'error': 'Booking violates room rules', 'issues': rule_issues}), 422
+
+                # Check conflict sử dụng GoogleSheetsManager
                 try:
-                    date_str = str(date_str).strip()
-                    # Kiểm tra format d/m/yyyy hoặc dd/mm/yyyy
-                    import re
-                    match = re.match(r'^(\d{1,2})/(\d{1,2})/(\d{4})$', date_str)
-                    if match:
-                        day = int(match.group(1))
-                        month = int(match.group(2))
-                        year = int(match.group(3))
-                        result = f"{day:02d}/{month:02d}/{year}"
-                        logger.info(f"Date normalized: {date_str} → {result}")
-                        return result
-                    return date_str
-                except Exception as e:
-                    logger.error(f"Error normalizing date {date_str}: {e}")
-                    return str(date_str)
-            
-            booking_data = {
-                'email': str(data.get('email', '')).strip(),
-                'name': str(data.get('name', '')).strip(),
-                'phone': str(data.get('phone', '')).strip(),
-                'customerCount': str(data.get('customerCount', 1)).strip(),
-                'date': normalize_date(data.get('date', '')),
-                'startTime': parse_time(data.get('startTime', '')),
-                'endTime': parse_time(data.get('endTime', '')),
-                'room': str(data.get('room', '')).strip(),
-                'notes': str(data.get('notes', '')).strip(),
-                'rowNumber': data.get('rowNumber', 0)
-            }
-
-            # Validate email format
-            email = booking_data['email']
-            if '@' not in email or '.' not in email:
-                return jsonify({'error': 'Invalid email format'}), 400
-
-            # Check conflict sử dụng GoogleSheetsManager
-            try:
-                from google_sheets.manager import GoogleSheetsManager
-                sheets_manager = GoogleSheetsManager()
+                    sheets_manager = get_sheets_manager()
                 
-                conflicts = sheets_manager.check_room_conflicts(
-                    date=booking_data['date'],
-                    start_time=booking_data['startTime'], 
-                    end_time=booking_data['endTime'],
-                    room=booking_data['room'],
-                    exclude_row=booking_data.get('rowNumber')
-                )
+                    with span('webhook.conflict_check', room=booking.room) as attrs:
+                        conflicts = sheets_manager.check_room_conflicts(
+                            date=booking.date,
+                            start_time=booking.start_time,
+                            end_time=booking.end_time,
+                            room=booking.room,
+                            exclude_row=booking.row_number,
+                            customer_count=booking.customer_count
+                        )
+                        attrs['conflicts'] = len(conflicts)
                 
-                # Tạo conflict message nếu có
-                conflict_message = sheets_manager.generate_conflict_message(conflicts)
-                booking_data['conflictMessage'] = conflict_message or ''
+                    # Tạo conflict message nếu có
+                    conflict_message = sheets_manager.generate_conflict_message(conflicts)
+                    booking.conflict_message = conflict_message or ''
                 
-                logger.info(f"Conflict check completed. Found {len(conflicts)} conflicts.")
+                    # Booking mới giữ chỗ ngay trong availability index
+                    sheets_manager.availability.add(booking)
                 
-            except Exception as e:
-                logger.warning(f"Could not check conflicts: {e}")
-                booking_data['conflictMessage'] = ''
+                    logger.debug("Conflict check completed. Found %s conflicts.", len(conflicts))
+                
+                except Exception as e:
+                    logger.warning("Could not check conflicts: %s", e)
+                    booking.conflict_message = ''
 
-            # Xử lý booking với Discord bot
-            if discord_bot:
-                try:
-                    # Bắn task async vào event loop bot (KHÔNG tạo loop mới!)
-                    future = asyncio.run_coroutine_threadsafe(
-                        discord_bot.process_new_booking(booking_data),
-                        discord_bot.loop
-                    )
-                    # KHÔNG .result() nếu muốn trả về luôn cho Apps Script (không block)
-                    logger.info(f"Booking for {email} scheduled to Discord bot event loop.")
+                # Vi phạm room rules (mode flag) được hiển thị cùng cảnh báo xung đột
+                if rule_issues:
+                    rules_message = "📏 **Vi phạm quy định phòng:**\n" + "\n".join(f"• {issue}" for issue in rule_issues)
+                    booking.conflict_message = "\n\n".join(filter(None, [booking.conflict_message, rules_message]))
 
-                except Exception as e:
-                    logger.error(f"Error scheduling Discord task: {e}")
-                    # Vẫn trả 200 OK, để Apps Script không bị lỗi, nhưng báo chi tiết lỗi
-                    return jsonify({
-                        'status': 'received',
-                        'message': 'Booking received but Discord processing failed',
-                        'error': str(e)
-                    }), 200
-            else:
-                logger.warning("Discord bot not available – booking not processed.")
-
-            # Trả về thành công cho Apps Script
-            return jsonify({
-                'status': 'success',
-                'message': 'Booking received and scheduled for processing',
-                'rowNumber': booking_data.get('rowNumber'),
-                'timestamp': datetime.now().isoformat()
-            }), 200
+                # Xử lý booking với Discord bot
+                if discord_bot:
+                    try:
+                        # Bắn task async vào event loop bot (KHÔNG tạo loop mới!)
+                        future = asyncio.run_coroutine_threadsafe(
+                            discord_bot.process_new_booking(booking),
+                            discord_bot.loop
+                        )
+                        # KHÔNG .result() nếu muốn trả về luôn cho Apps Script (không block)
+                        logger.info("Booking for %s scheduled to Discord bot event loop.", email)
+
+                    except Exception as e:
+                        logger.error("Error scheduling Discord task: %s", e)
+                        # Vẫn trả 200 OK, để Apps Script không bị lỗi, nhưng báo chi tiết lỗi
+                        return jsonify({
+                            'status': 'received',
+                            'message': 'Booking received but Discord processing failed',
+                            'error': str(e)
+                        }), 200
+                else:
+                    logger.warning("Discord bot not available – booking not processed.")
+
+                # Trả về thành công cho Apps Script
+                return jsonify({
+                    'status': 'success',
+                    'message': 'Booking received and scheduled for processing',
+                    'rowNumber': booking.row_number,
+                    'traceId': booking.trace_id,
+                    'timestamp': datetime.now().isoformat()
+                }), 200
 
         except Exception as e:
-            logger.error(f"Webhook Error: {e}")
+            logger.error("Webhook Error: %s", e)
             return jsonify({
                 'error': 'Internal server error',
                 'message': str(e)
             }), 500
 
+    @app.route('/availability', methods=['GET'])
+    def availability():
+        """
+        Khung giờ trống theo phòng: GET /availability?date=dd/mm/yyyy&room=&time=HH:MM
+        """
+        date = normalize_date(request.args.get('date', ''))
+        if not date:
+            return jsonify({'error': 'Missing required parameter: date'}), 400
+        if parse_date(date) is None:
+            return jsonify({'error': f'Invalid date: {date} (expected dd/mm/yyyy)'}), 400
+        
+        room = request.args.get('room') or None
+        at = request.args.get('time') or None
+        
+        try:
+            rooms = get_sheets_manager().get_availability(date, room=room, at=at)
+            return jsonify({
+                'date': date,
+                'time': at,
+                'rooms': {
+                    name: [{'start': start, 'end': end} for start, end in slots]
+                    for name, slots in rooms.items()
+                },
+                'timestamp': datetime.now().isoformat()
+            })
+        except Exception as e:
+            logger.error("Availability Error: %s", e)
+            return jsonify({'error': 'Internal server error', 'message': str(e)}), 500
+
+    @app.route('/webhook/calendar', methods=['POST'])
+    def webhook_calendar():
+        """
+        Push notification từ Google Calendar (events.watch): chỉ đánh dấu mirror cũ,
+        lần tra cứu sau sẽ incremental sync (body rỗng, thông tin nằm trong header X-Goog-*)
+        """
+        if Config.CALENDAR_PUSH_TOKEN and request.headers.get('X-Goog-Channel-Token') != Config.CALENDAR_PUSH_TOKEN:
+            return jsonify({'error': 'Invalid channel token'}), 403
+
+        state = request.headers.get('X-Goog-Resource-State', '')
+        # 'sync' là notification xác nhận khi mới đăng ký channel, chưa có thay đổi
+        if state != 'sync':
+            get_sheets_manager().calendar_mirror.invalidate()
+        logger.debug("Calendar push notification: %s (channel %s)", state, request.headers.get('X-Goog-Channel-ID'))
+        return '', 204
+
     @app.route('/webhook/test', methods=['GET', 'POST'])
     def webhook_test():
         if request.method == 'GET':
@@ -212,7 +267,7 @@ def create_app(discord_bot=None):
             })
         else:
             data = request.get_json() if request.is_json else {}
-            logger.info(f"Test webhook received: {data}")
+            logger.info("Test webhook received: %s", data)
             return jsonify({
                 'message': 'Test webhook received successfully',
                 'received_data': data,
@@ -229,7 +284,7 @@ def create_app(discord_bot=None):
 
     @app.errorhandler(500)
     def internal_error(error):
-        logger.error(f"Internal server error: {error}")
+        logger.error("Internal server error: %s", error)
         return jsonify({'error': 'Internal server error', 'message': 'An unexpected error occurred'}), 500
 
     return app